@@ -67,6 +67,7 @@ if __name__ == "__main__":
     engine.rootContext().setContextProperty("dipModel", hypervisor.dipModel)
     engine.rootContext().setContextProperty("dipModelMinEnergy", hypervisor.dipModelMinEnergy)
     engine.rootContext().setContextProperty("dipModelMinEnergyMC", hypervisor.dipModelMinEnergyMC)
+    engine.rootContext().setContextProperty("dipModelMinEnergyPT", hypervisor.dipModelMinEnergyPT)
     
     engine.load(os.path.join(os.path.dirname(__file__), "main.qml"))
     if not engine.rootObjects():
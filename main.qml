@@ -167,6 +167,7 @@ ApplicationWindow{
                         property alias initialDipsSelectExport: initialDipsSelectExport.checked
                         property alias minEnDipsSelectExport: minEnDipsSelectExport.checked
                         property alias minEnMCDipsSelectExport: minEnMCDipsSelectExport.checked
+                        property alias minEnPTDipsSelectExport: minEnPTDipsSelectExport.checked
                         property alias saveLocationText: saveLocation.text
                         property alias addDateSelectExportChecked: addDateSelectExport.checked
                     }
@@ -216,6 +217,13 @@ ApplicationWindow{
                             leftPadding: indicator.width
                             ButtonGroup.group: childGroup
                         }
+                        CheckBox{
+                            id: minEnPTDipsSelectExport
+                            padding: 0
+                            text: qsTr("Min Energy P-T")
+                            leftPadding: indicator.width
+                            ButtonGroup.group: childGroup
+                        }
                         TextContainer{
                             padding: 3
                             Layout.fillWidth: true
@@ -259,6 +267,20 @@ ApplicationWindow{
                                 text: ""
                             }
                         }
+                        RowLayout{
+                            Layout.fillWidth: true
+                            TextContainer{
+                                padding: 3
+                                Layout.fillWidth: true
+                                text: "File format:"
+                            }
+                            ComboBox {
+                                Layout.alignment: Qt.AlignRight
+                                model: hypervisor.exportFormatList
+                                onActivated: hypervisor.exportFormatSelected = textAt(currentIndex)
+                                Component.onCompleted: currentIndex = indexOfValue(hypervisor.exportFormatSelected)
+                            }
+                        }
                         CheckBox{
                             id: addDateSelectExport
                             padding: 4
@@ -277,7 +299,7 @@ ApplicationWindow{
                                 text: "Export with chosen parameters"
                             }
                             onClicked: {
-                                var listDipsToExp = [initialDipsSelectExport.checked, minEnDipsSelectExport.checked, minEnMCDipsSelectExport.checked]
+                                var listDipsToExp = [initialDipsSelectExport.checked, minEnDipsSelectExport.checked, minEnMCDipsSelectExport.checked, minEnPTDipsSelectExport.checked]
                                 hypervisor.export(saveLocation.text, listDipsToExp, addDateSelectExport.checked)
                             }
                         }
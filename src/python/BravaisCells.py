@@ -29,6 +29,10 @@ from math import cos, sin, radians, sqrt
 
 from itertools import combinations
 
+import numpy as np
+
+from .LatticeGeneration import LatticeStream, latticeVectors, bravaisCell, basisTranslations
+
 from PySide2.QtCore import QObject, QSettings, Signal, Slot, Property
 from PySide2.QtGui import QVector3D
 
@@ -64,6 +68,8 @@ class PrimCell(QObject):
 
         self.translations = [] if otherTranslations is None else otherTranslations # translations in miller indices stored in QtVector3D
         self.points = []
+        self.nbCandidates = 0 # points generated by the last latticePositions() call
+        self.nbKept = 0 # points kept inside the generation volume by the last latticePositions() call
 
     cellChanged = Signal()
     def generatePrimCell(self, a=None, b=None, c=None, alpha=None, beta=None, gamma=None, resetTranslations=True):
@@ -71,120 +77,13 @@ class PrimCell(QObject):
             self.c = 0
             self.alpha = 0
             self.beta = 0
-            if(self.crystalType != "custom"):
-                if(self.crystalType == "mono"):
-                    self.gamma = 15 if gamma is None else gamma
-                    self.a = 150 if a is None else a
-                    self.b = 200 if b is None else b
-                elif(self.crystalType == "ortho"):
-                    self.gamma = 90
-                    self.a = 300 if a is None else a
-                    self.b = 200 if b is None else b
-                elif(self.crystalType == "tetra"):
-                    self.a = 200 if a is None else a
-                    self.b = self.a
-                    self.gamma = 90
-                elif(self.crystalType == "hex"):
-                    self.gamma = 120
-                    self.a = 300 if a is None else a
-                    self.b = self.a
-
-                if resetTranslations:
-                    self.translations = [QVector3D(0, 0, 0), QVector3D(1, 0, 0), QVector3D(0, 1, 0), QVector3D(1, 1, 0)]
-                else:
-                    self.translations += [QVector3D(0, 0, 0), QVector3D(1, 0, 0), QVector3D(0, 1, 0), QVector3D(1, 1, 0)]
-
-                if(self.crystalFamily != "P"):
-                    if(self.crystalFamily == "A"):
-                        self.translations += [QVector3D(0.5, 0, 0), QVector3D(0.5, 1, 0)]
-                    elif(self.crystalFamily == "B"):
-                        self.translations += [QVector3D(0, 0.5, 0), QVector3D(1, 0.5, 0)]
-                    elif(self.crystalFamily == "I"):
-                        self.translations.append(QVector3D(0.5, 0.5, 0))
-        else: # if 3D
-            if(self.crystalType != "custom"):
-
-                if(self.crystalType == "tri"):
-                    self.gamma = 60. if gamma is None else gamma
-                    self.alpha = 70. if alpha is None else alpha
-                    self.beta = 70. if beta is None else beta
-                    self.a = 200 if a is None else a
-                    self.b = 200 if b is None else b
-                    self.c = 300 if c is None else c
-                elif(self.crystalType == "mono"):
-                    self.gamma = 90.
-                    self.alpha = 90.
-                    self.beta = 70. if beta is None else beta
-                    self.a = 200 if a is None else a
-                    self.b = 200 if b is None else b
-                    self.c = 300 if c is None else c
-                elif(self.crystalType == "ortho"):
-                    self.gamma = 90.
-                    self.alpha = 90.
-                    self.beta = 90.
-                    self.a = 200 if a is None else a
-                    self.b = 250 if b is None else b
-                    self.c = 300 if c is None else c
-                elif(self.crystalType == "tetra"):
-                    self.gamma = 90.
-                    self.alpha = 90.
-                    self.beta = 90.
-                    self.a = 200 if a is None else a
-                    self.b = self.a
-                    self.c = 300 if c is None else c
-                elif(self.crystalType == "hex_rhomb"):
-                    self.gamma = 60. if gamma is None else gamma
-                    self.alpha = self.gamma
-                    self.beta = self.gamma
-                    self.a = 200 if a is None else a
-                    self.b = self.a
-                    self.c = self.a
-                elif(self.crystalType == "hex_hex"):
-                    self.gamma = 120.
-                    self.alpha = 90.
-                    self.beta = 90.
-                    self.a = 200 if a is None else a
-                    self.b = self.a
-                    self.c = 300 if c is None else c
-                elif(self.crystalType == "cub"):
-                    self.gamma = 90.
-                    self.alpha = 90.
-                    self.beta = 90.
-                    self.a = 200 if a is None else a
-                    self.b = self.a
-                    self.c = self.a
-
-
-                if self.crystalType in  ["mono", "ortho", "tetra", "hex_hex", "cub"]: # for all except "hex_rhomb"
-                    self.alpha = 90.
-                    if self.crystalType in  ["ortho", "tetra", "hex_hex", "cub"]:
-                        self.beta = 90.
-                    if self.crystalType in  ["mono", "ortho", "tetra"]:
-                        self.gamma = 90.
-                    if self.crystalType in "hex_hex":
-                        self.gamma = 120.
-                
-                if self.crystalType in ["tetra", "hex_rhomb", "hex_hex", "cub"]:
-                    self.a = self.a
-                    self.b = self.a
-                    if self.crystalType in ["hex_rhomb", "cub"]:
-                        self.c = self.a
-
-                if resetTranslations:
-                    self.translations = [QVector3D(0, 0, 0), QVector3D(1, 0, 0), QVector3D(0, 1, 0), QVector3D(1, 1, 0), QVector3D(0, 0, 1), QVector3D(1, 0, 1), QVector3D(0, 1, 1), QVector3D(1, 1, 1)]
-                else:
-                    self.translations += [QVector3D(0, 0, 0), QVector3D(1, 0, 0), QVector3D(0, 1, 0), QVector3D(1, 1, 0), QVector3D(0, 0, 1), QVector3D(1, 0, 1), QVector3D(0, 1, 1), QVector3D(1, 1, 1)]
-                if(self.crystalFamily != "P"):
-                    if(self.crystalFamily == "A"):
-                        self.translations += [QVector3D(0, 0.5, 0.5), QVector3D(1, 0.5, 0.5)]
-                    elif(self.crystalFamily == "B"):
-                        self.translations += [QVector3D(0.5, 0, 0.5), QVector3D(0.5, 1, 0.5)]
-                    elif(self.crystalFamily == "C"):
-                        self.translations += [QVector3D(0.5, 0.5, 0), QVector3D(0.5, 0.5, 1)]
-                    elif(self.crystalFamily == "F"):
-                        self.translations += [QVector3D(0, 0.5, 0.5), QVector3D(1, 0.5, 0.5), QVector3D(0.5, 0, 0.5), QVector3D(0.5, 1, 0.5), QVector3D(0.5, 0.5, 0), QVector3D(0.5, 0.5, 1)]
-                    elif(self.crystalFamily == "I"):
-                        self.translations.append(QVector3D(0.5, 0.5, 0.5))
+        if(self.crystalType != "custom"):
+            parameters, translations = bravaisCell(self.crystalType, self.crystalFamily, self.is2D, a, b, c, alpha, beta, gamma)
+            for name, value in zip(("a", "b", "c", "alpha", "beta", "gamma"), parameters):
+                if value is not None:
+                    setattr(self, name, value)
+            translations = [QVector3D(*translation) for translation in translations]
+            self.translations = translations if resetTranslations else self.translations + translations
 
         if self.gamma is None:
             self.gamma = -1
@@ -214,6 +113,39 @@ class PrimCell(QObject):
         self.minDist = minComb[0].distanceToPoint(minComb[1])
         self.cellChanged.emit()
 
+    """
+    Returns the (3,3) array of the cell vectors a, b, c (rows), c is zero for a 2D cell.
+    Same projection of b and c as the points of the cell.
+    """
+    def latticeVectors(self):
+        return latticeVectors(self.a, self.b, self.c, self.alpha, self.beta, self.gamma, self.is2D)
+
+    """
+    Returns the (M,3) array of the translations that belong to this cell only (fractional coordinates), points on the
+    outer planes/lines (a coordinate equal to 1) belong to the neighbour cells.
+    """
+    def basisTranslations(self):
+        return basisTranslations([[point.x(), point.y(), point.z()] for point in self.translations])
+
+    """
+    Returns a LatticeStream of the lattice points of this cell inside the generation volume of size maxDist around
+    the origin, in chunks of chunkSize points: sphere of radius maxDist ("round") or cube of half edge maxDist ("square").
+    """
+    def latticeStream(self, maxDist, genType="round", chunkSize=2**20):
+        return LatticeStream(self.latticeVectors(), self.basisTranslations(), maxDist, genType, chunkSize)
+
+    """
+    Returns the (N,3) array of the lattice points of this cell inside the generation volume (see latticeStream()).
+    nbCandidates and nbKept report the points generated and kept by the last call.
+    maxDist: size of the generation (float)
+    genType: round or square (str)
+    """
+    def latticePositions(self, maxDist, genType="round"):
+        stream = self.latticeStream(maxDist, genType)
+        positions = stream.positions()
+        self.nbCandidates, self.nbKept = stream.nbCandidates, stream.nbKept
+        return positions
+
     def isPrimCellALocked(self, is2D, crystalType):
         return False
     
@@ -34,7 +34,10 @@ from PySide2.QtCore import QObject, QAbstractListModel, QRandomGenerator, Signal
 from PySide2.QtGui import QVector3D, QColor
 from PySide2 import QtWidgets
 
+import numpy as np
+
 from .DipSimUtilities import *
+from .DipoleStore import DipoleStore
 """
 Represent a dipole with all important caracteristics.
 position: position in 3D space as a QVector3D with its x, y, z values
@@ -131,8 +134,11 @@ class Dipole(QObject):
 
 """
 Model containing dipoles and interacting with the QML view when data (dipoles) are changed, moved or replaced.
+It is a thin view on a DipoleStore: Qt values of a dipole are only built when the view asks for them.
 self.roles: represent a list of data types to be recognized and passed to QML on demand.
-self.dipoles: dipoles contained by the model.
+self.store: DipoleStore of the dipoles contained by the model.
+self._displayCache: [angles, colors, quaternions (N,4), display colors (N,4)] computed in one call from the arrays
+"angles" and "colors" of the store, rebuilt when the store replaces them (see displayArrays()).
 """
 class DipModel(QAbstractListModel):
     def __init__(self, dipoles, parent=None):
@@ -143,7 +149,15 @@ class DipModel(QAbstractListModel):
             1: "quaternion",
             2: "dipColor",
         }
-        self.dipoles = dipoles
+        self.store = self.toStore(dipoles)
+        self._displayCache = [None, None, None, None]
+
+    """
+    Returns "dipoles" as a DipoleStore, from a DipoleStore (snapshot, no copy) or a list of Dipole.
+    """
+    @staticmethod
+    def toStore(dipoles):
+        return dipoles.snapshot() if isinstance(dipoles, DipoleStore) else dipolesToStore(dipoles)
     
     """
     Empty model and signal it to the view.
@@ -151,51 +165,70 @@ class DipModel(QAbstractListModel):
     @Slot()
     def reset(self):
         self.beginResetModel()
-        self.dipoles = []
+        self.store = DipoleStore()
         self.endResetModel()
     
     """
-    Empty model and add "newDipoles" list. Then signals it to the view.
-    newDipoles: list of new Dipoles.
+    Empty model and add "newDipoles" (DipoleStore or list of Dipole). Then signals it to the view.
     """
     def replaceAllDipoles(self, newDipoles):
-        """ replace dipoles in model by dipoles in argument list """
+        """ replace dipoles in model by dipoles in argument """
         self.beginResetModel()
-        self.dipoles = newDipoles
+        self.store = self.toStore(newDipoles)
         self.endResetModel()
 
     """
-    Get a copy of dipoels inside this instance of model.
+    Get a snapshot of dipoles inside this instance of model (DipoleStore, O(1), later changes of the model are not seen).
     """
     def getDipolesCopy(self):
-        return deepcopy(self.dipoles)
+        return self.store.snapshot()
     
     """
-    Append a Dipole at end of model's list. Then signal it to view.
+    Append dipoles (a Dipole, list of Dipole or DipoleStore) at end of model's list. Then signal it to view.
     """
     def append(self, dipole):
         """Append item to end of model"""
+        newDipoles = self.toStore(dipole if isinstance(dipole, (DipoleStore, list)) else [dipole])
+        if len(newDipoles) == 0:
+            return
         self.beginInsertRows(QtCore.QModelIndex(),
                              self.rowCount(),
-                             self.rowCount())
+                             self.rowCount() + len(newDipoles) - 1)
 
-        self.dipoles.append(dipole)
+        self.store.extend(newDipoles)
         self.endInsertRows()
 
+    """
+    Returns the quaternions (N,4) and RGBA colors (N,4) shown by the view for all dipoles of the store, converted
+    in batch from the angles once per change of the store instead of one QQuaternion/QColor round trip per dipole.
+    """
+    def displayArrays(self):
+        cachedAngles, cachedColors, quaternions, colors = self._displayCache
+        if cachedAngles is not self.store.angles or cachedColors is not self.store.colors:
+            angles = self.store.angles
+            quaternions = anglesToQuaternions(angles[:, 0], angles[:, 1])
+            colors = np.array(self.store.colors)
+            fromAngles = np.isnan(colors[:, 0]) # color correspond to angle
+            colors[fromAngles, :3] = anglesToColors(angles[fromAngles, 0], angles[fromAngles, 1])
+            colors[fromAngles, 3] = 1.0
+            self._displayCache = [self.store.angles, self.store.colors, quaternions, colors]
+        return quaternions, colors
+
     """
     Returns data with the corresponding "index" and "roleID".
     Ex: "index" = 0 for first item in model and "roleID" = position3D to access its corressponding position
     """
     def data(self, index, roleID):
         """Return value of dipole role at index"""
+        row = index.row()
         if(self.roles.get(roleID) == "position3D"): 
-            return self.dipoles[index.row()].position
+            return QVector3D(*self.store.positions[row].tolist())
 
         elif(self.roles.get(roleID) == "quaternion"):
-            return self.dipoles[index.row()].quaternion
+            return QQuaternion(*self.displayArrays()[0][row].tolist())
 
         elif(self.roles.get(roleID) == "dipColor"):
-            return self.dipoles[index.row()].color
+            return QColor.fromRgbF(*self.displayArrays()[1][row].tolist())
 
     """
     Sets data with the corresponding "index" and "roleID" to "value"
@@ -203,16 +236,17 @@ class DipModel(QAbstractListModel):
     """
     def setData(self, index, value, roleID):
         """Set role of dipole at index to `value`"""
+        row = index.row()
         if(self.roles.get(roleID) == "position3D"):
-            self.dipoles[index.row()].position = value
+            self.store.setPositions((value.x(), value.y(), value.z()), row)
             self.dataChanged.emit(index, index)
 
         elif(self.roles.get(roleID) == "quaternion"):
-            self.dipoles[index.row()].quaternion = value
+            self.store.setAngles(quaternionsToAngles(quaternionToArray(value)), row)
             self.dataChanged.emit(index, index)
 
         elif(self.roles.get(roleID) == "dipColor"):
-            self.dipoles[index.row()].color = value
+            self.store.setColors(value.getRgbF(), row)
             self.dataChanged.emit(index, index)
 
         else:
@@ -225,7 +259,7 @@ class DipModel(QAbstractListModel):
     """
     def rowCount(self, parent=QtCore.QModelIndex()):
         """Number of dipoles in model"""
-        return len(self.dipoles)
+        return len(self.store)
 
     """
     Returns list of all role names supported by this model.
@@ -0,0 +1,305 @@
+# This Python file uses the following encoding: utf-8
+
+"""
+MIT License
+
+Copyright (c) 2020 Nils DEYBACH & Léo OUDART
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+"""
+Headless runs of DipSim, without Qt: generation (lattice, random or import), minimization (conjugate gradient or
+Monte-Carlo) and export of the results to files. Used by "python -m dipsim run config.toml" on machines without a
+display, many jobs run one after the other in the same process (imports and kernel cache are shared).
+
+A config file (TOML, or JSON) holds a [defaults] table and a list of [[jobs]] tables, keys of a job override the
+defaults which override jobDefaults. Keys have the names of the SimHypervisor properties, ex:
+
+    [defaults]
+    generateMode = "Lattice"
+    is2D = false
+    crystalType = "cub"
+    genSize = 1000
+    method = "MC"
+
+    [[jobs]]
+    name = "cub_F_4K"
+    crystalFamily = "F"
+    temperatureMC = 4
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .DipSimEnergy import MU_B, pairKernel, supercell
+from .DipoleStore import DipoleStore, saveDipoles, loadDipoles
+from .LatticeGeneration import bravaisCell, basisTranslations, latticeVectors, LatticeStream, randomPositions, readDipolesCSV, exportChunksToCSV
+from .MinEnergySolver import MinEnergySolver, minimizers
+from .MonteCarloChain import MetropolisChain, metropolisChain, runReplica, parallelTempering, simulatedAnnealing
+
+try:
+    import tomllib # python >= 3.11
+except ImportError:
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+"""
+Keys of a job and their default values (same defaults as the GUI).
+method: none (generation only), CG (conjugate gradient), L-BFGS (on unit vectors, historySizeLBFGS corrections kept),
+MC (Metropolis, replicas if nbReplicasMC > 1),
+annealing (MC from temperatureStartMC to temperatureEndMC) or PT (parallel tempering)
+"""
+jobDefaults = {
+    "name": None, # job<index> if None
+    "generateMode": "Lattice", # Lattice, Random or Import
+    "is2D": True,
+    "crystalType": None, # mono in 2D, cub in 3D if None
+    "crystalFamily": "P",
+    "primCellA": None, "primCellB": None, "primCellC": None,
+    "primCellAlpha": None, "primCellBeta": None, "primCellGamma": None,
+    "genSize": 400.0,
+    "genType": "round",
+    "periodic": False,
+    "supercell": [4, 4, 4],
+    "nbDipolesRdm": 500,
+    "minSeparation": 0.0,
+    "importFiles": [],
+    "seed": -1, # negative for an unseeded run
+    "distCoef": -9.0,
+    "cutoffRadius": 0.0,
+    "truncation": "shifted",
+    "energyBackend": "pairs",
+    "barnesHutTheta": 0.5,
+    "tileMemoryMB": 4.0, # memory of a tile of the tiled pair kernel
+    "precision": "float64", # float32 evaluates the exact pair sum in single precision (see TiledPairs)
+    "jit": True, # compiled kernels of DipSimJit if Numba is installed
+    "method": "CG",
+    "lock2D": False,
+    "historySizeLBFGS": 10,
+    "nbIterationsMC": 10000,
+    "temperatureMC": 4.0,
+    "nbReplicasMC": 1,
+    "temperatureStartMC": 50.0,
+    "temperatureEndMC": 1.0,
+    "annealingScheduleMC": "geometric",
+    "temperaturesPT": [1.0, 50.0],
+    "swapIntervalPT": 1000,
+    "exportInitial": True,
+    "outputFormat": "csv", # csv or npz (binary, with the job as metadata)
+}
+
+"""
+Returns the content (dict) of the config file "filePath" (.toml or .json).
+"""
+def readConfigFile(filePath):
+    if filePath.endswith(".json"):
+        with open(filePath, "r", encoding="utf-8") as file:
+            return json.load(file)
+    if tomllib is None:
+        raise ImportError("reading .toml config files needs python >= 3.11 or the tomli package, use a .json config file otherwise")
+    with open(filePath, "rb") as file:
+        return tomllib.load(file)
+
+"""
+Returns the list of jobs (dict) of the config file "filePath" (.toml or .json), see module documentation.
+"""
+def loadConfig(filePath):
+    return jobsFromConfig(readConfigFile(filePath))
+
+"""
+Returns the list of jobs (dict) of a config (dict with "defaults" and "jobs"), unknown keys raise a ValueError.
+"""
+def jobsFromConfig(config):
+    defaults = dict(jobDefaults, **config.get("defaults", {}))
+    jobs = []
+    for index, jobConfig in enumerate(config.get("jobs", [{}])):
+        job = dict(defaults, **jobConfig)
+        unknownKeys = set(job) - set(jobDefaults)
+        if unknownKeys:
+            raise ValueError("unknown keys in job " + str(index) + ": " + ", ".join(sorted(unknownKeys)))
+        job["name"] = "job" + str(index) if job["name"] is None else str(job["name"])
+        jobs.append(job)
+    return jobs
+
+"""
+Returns the keyword arguments of pairKernel() of "job", Ewald summation if dipoles are a periodic supercell.
+Same priority as SimHypervisor.getKernelOptions().
+"""
+def kernelOptions(job, cellVectors=None):
+    if cellVectors is not None:
+        options = {"cellVectors": np.asarray(cellVectors).tolist()}
+    elif job["energyBackend"] == "barnesHut":
+        options = {"backend": "barnesHut", "theta": job["barnesHutTheta"]}
+    elif job["energyBackend"] == "tiled":
+        options = {"backend": "tiled", "memoryBudget": int(job["tileMemoryMB"]*1024**2), "precision": job["precision"]}
+    elif job["cutoffRadius"] > 0:
+        options = {"cutoff": job["cutoffRadius"], "truncation": job["truncation"]}
+    else:
+        options = {"memoryBudget": int(job["tileMemoryMB"]*1024**2), "precision": job["precision"]}
+    options["jit"] = job["jit"]
+    return options
+
+"""
+Returns the dipoles (DipoleStore) of "job" and the cell vectors of the supercell (None if not periodic).
+rng: numpy Generator of the positions and orientations
+"""
+def generateDipoles(job, rng):
+    is2D = job["is2D"]
+    if job["generateMode"] == "Lattice":
+        crystalType = job["crystalType"] or ("mono" if is2D else "cub")
+        parameters, translations = bravaisCell(crystalType, job["crystalFamily"], is2D, job["primCellA"], job["primCellB"], job["primCellC"], job["primCellAlpha"], job["primCellBeta"], job["primCellGamma"])
+        vectors = latticeVectors(*parameters, is2D=is2D)
+        if job["periodic"]:
+            positions, cellVectors = supercell(vectors, basisTranslations(translations), job["supercell"])
+            return DipoleStore.withRandomAngles(positions, is2D=is2D, rng=rng), cellVectors
+        positions = LatticeStream(vectors, basisTranslations(translations), job["genSize"], job["genType"]).positions()
+        return DipoleStore.withRandomAngles(positions, is2D=is2D, rng=rng), None
+    if job["generateMode"] == "Random":
+        positions = randomPositions(job["nbDipolesRdm"], job["genSize"], is2D, job["genType"], rng, job["minSeparation"])
+        return DipoleStore.withRandomAngles(positions, is2D=is2D, rng=rng), None
+    if job["generateMode"] == "Import":
+        csvFiles = [filePath for filePath in job["importFiles"] if not filePath.lower().endswith(".npz")]
+        dipoles = readDipolesCSV(csvFiles) if csvFiles else DipoleStore()
+        for filePath in job["importFiles"]:
+            if filePath not in csvFiles:
+                dipoles.extend(loadDipoles(filePath, mmap=False)[0])
+        return dipoles, None
+    raise ValueError("unknown generateMode: " + str(job["generateMode"]))
+
+"""
+Returns the dipoles of "job" after its minimization method (DipoleStore) and extra results (dict).
+"""
+def minimizeDipoles(job, dipoles, options, rng):
+    method, lock2D, distCoef = job["method"], job["lock2D"], job["distCoef"]
+    if method == "none" or len(dipoles) < 2:
+        return dipoles, {}
+    if method in minimizers:
+        return MinEnergySolver(distCoef, options, method=method, historySize=job["historySizeLBFGS"]).getMinEnergy(dipoles, lock2D, rng), {}
+    phi, theta, intensities = dipoles.angles[:, 0], dipoles.angles[:, 1], dipoles.intensities*MU_B
+    if method == "MC" and job["nbReplicasMC"] > 1:
+        seeds = np.random.SeedSequence(int(rng.integers(2**63))).spawn(job["nbReplicasMC"])
+        with ProcessPoolExecutor(max_workers=job["nbReplicasMC"], mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = [executor.submit(runReplica, dipoles.positions, distCoef, phi, theta, intensities, job["nbIterationsMC"], job["temperatureMC"], lock2D, seed, options) for seed in seeds]
+            results = [future.result() for future in futures]
+        phi, theta, energy, nbAccepted = min(results, key=lambda result: result[2])
+        return dipoles.withAngles(np.stack((phi, theta), axis=-1)), {"acceptanceRate": nbAccepted/max(job["nbIterationsMC"], 1)}
+    kernel = pairKernel(dipoles.positions, distCoef, **options)
+    if method == "MC":
+        phi, theta, energy, nbAccepted = metropolisChain(kernel, phi, theta, intensities, job["nbIterationsMC"], job["temperatureMC"], lock2D, rng)
+        return dipoles.withAngles(np.stack((phi, theta), axis=-1)), {"acceptanceRate": nbAccepted/max(job["nbIterationsMC"], 1)}
+    if method == "annealing":
+        chain = MetropolisChain(kernel, phi, theta, intensities, lock2D, rng)
+        simulatedAnnealing(chain, job["nbIterationsMC"], job["temperatureStartMC"], job["temperatureEndMC"], job["annealingScheduleMC"])
+        return dipoles.withAngles(np.stack((chain.phi, chain.theta), axis=-1)), {}
+    if method == "PT":
+        lowestState, acceptanceRates, swapRates = parallelTempering(dipoles.positions, distCoef, phi, theta, intensities, job["temperaturesPT"], job["nbIterationsMC"], job["swapIntervalPT"], lock2D, seed=int(rng.integers(2**63)), kernelOptions=options)
+        return dipoles.withAngles(np.stack((lowestState[0], lowestState[1]), axis=-1)), {"acceptanceRates": acceptanceRates, "swapRates": swapRates}
+    raise ValueError("unknown method: " + str(method))
+
+"""
+Writes "dipoles" of "job" in outputDirectory as <name>_<stage>.csv or <name>_<stage>.npz (see outputFormat).
+"""
+def exportJobDipoles(job, dipoles, outputDirectory, stage):
+    filePath = os.path.join(outputDirectory, job["name"] + "_" + stage + "." + job["outputFormat"])
+    if job["outputFormat"] == "npz":
+        saveDipoles(dipoles, filePath, {"distCoef": job["distCoef"], "stage": stage, "job": job})
+    elif job["outputFormat"] == "csv":
+        exportChunksToCSV([dipoles], filePath)
+    else:
+        raise ValueError("unknown outputFormat: " + str(job["outputFormat"]))
+
+"""
+Runs "job" (dict, see jobDefaults) and writes its dipoles in outputDirectory: <name>_initial.csv (if exportInitial)
+and <name>_final.csv (.npz with outputFormat npz). Returns the row of the job in the results table (dict).
+"""
+def runJob(job, outputDirectory):
+    startTime = time.perf_counter()
+    rng = np.random.default_rng(None if job["seed"] < 0 else job["seed"])
+    dipoles, cellVectors = generateDipoles(job, rng)
+    options = kernelOptions(job, cellVectors)
+    energyComputor = MinEnergySolver(job["distCoef"], options)
+    initialEnergy = energyComputor.computeEnergyDipoles(dipoles)
+    if job["exportInitial"]:
+        exportJobDipoles(job, dipoles, outputDirectory, "initial")
+    resultDipoles, extra = minimizeDipoles(job, dipoles, options, rng)
+    exportJobDipoles(job, resultDipoles, outputDirectory, "final")
+    row = {"name": job["name"], "method": job["method"], "nbDipoles": len(resultDipoles), "initialEnergy (eV)": initialEnergy,
+           "finalEnergy (eV)": energyComputor.computeEnergyDipoles(resultDipoles), "duration (s)": time.perf_counter() - startTime}
+    row.update({key: json.dumps(value) for key, value in extra.items()})
+    return row
+
+"""
+Runs "jobs" one after the other and writes the results table (results.csv) in outputDirectory, a failing job is
+reported in the table and does not stop the others. Returns the rows of the table.
+"""
+def runJobs(jobs, outputDirectory, verbose=True):
+    os.makedirs(outputDirectory, exist_ok=True)
+    rows = []
+    for job in jobs:
+        try:
+            row = runJob(job, outputDirectory)
+        except Exception as error:
+            row = {"name": job["name"], "method": job["method"], "error": repr(error)}
+        rows.append(row)
+        if verbose:
+            print(", ".join(key + ": " + str(value) for key, value in row.items()), flush=True)
+    writeResultsTable(rows, os.path.join(outputDirectory, "results.csv"))
+    return rows
+
+"""
+Writes "rows" (list of dict) in a .csv file, columns are the union of the keys of the rows in order of appearance.
+"""
+def writeResultsTable(rows, filePath):
+    columns = list(dict.fromkeys(key for row in rows for key in row))
+    with open(filePath, "w", encoding="utf-8") as file:
+        file.write(",".join(columns) + "\n")
+        for row in rows:
+            file.write(",".join('"' + str(row.get(column, "")).replace('"', '""') + '"' for column in columns) + "\n")
+
+"""
+Command line entry point:
+"run config [config ...] [-o outputDirectory]": jobs one after the other
+"sweep config [-o outputDirectory] [-j nbWorkers]": parameter sweep in a pool of processes, resumed if interrupted (see DipSimSweep)
+"""
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="dipsim", description="Headless DipSim runs (no GUI).")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    runParser = subparsers.add_parser("run", help="run the jobs of config files (.toml or .json)")
+    runParser.add_argument("configs", nargs="+", help="config files")
+    runParser.add_argument("-o", "--output", default="dipsim_results", help="output directory (default: dipsim_results)")
+    sweepParser = subparsers.add_parser("sweep", help="run the parameter sweep of a config file, resumes an interrupted sweep of the same output directory")
+    sweepParser.add_argument("config", help="config file with a [sweep] table")
+    sweepParser.add_argument("-o", "--output", default="dipsim_sweep", help="output directory (default: dipsim_sweep)")
+    sweepParser.add_argument("-j", "--workers", type=int, default=None, help="number of processes (default: nbWorkers of the config, or all cores)")
+    arguments = parser.parse_args(argv)
+    if arguments.command == "run":
+        jobs = [job for config in arguments.configs for job in loadConfig(config)]
+        rows = runJobs(jobs, arguments.output)
+    else:
+        from .DipSimSweep import runSweepConfig
+        rows = runSweepConfig(arguments.config, arguments.output, arguments.workers)
+    return 1 if any("error" in row for row in rows) else 0
@@ -26,7 +26,7 @@ SOFTWARE.
 
 """
 This class file represent the compute of minimizing energy with a SciPy function : optimize.fmin_cg
-The compute is made in a thread, in background
+The compute is made in a thread, in background (the minimization itself is in MinEnergySolver)
 """
 from PySide2 import QtWidgets
 from PySide2 import QtCore, QtGui
@@ -34,16 +34,11 @@ from PySide2.QtCore import *
 from PySide2.QtGui import *
 from PySide2.QtGui import *
 
-from copy import deepcopy
-from math import cos, sin, radians, degrees
-from scipy.constants import mu_0, pi
-from scipy import optimize
-
-import numpy.matlib 
-import numpy as np 
-
 from .DipSimUtilities import *
 from .DipSim import *
+from .DipSimEnergy import *
+from .MinEnergySolver import MinEnergySolver
+from .SolverControl import CancelToken, Cancelled, ProgressReporter
 
 """ lunch the minimizing function in a thread """
 class DipSimComputor(QObject):
@@ -53,157 +48,102 @@ class DipSimComputor(QObject):
         self._workerThreadMinEn = WorkerMinEnergy(self)
 
 
-class WorkerMinEnergy(QThread):
-    resultDips = Signal(list)
+class WorkerMinEnergy(QThread, MinEnergySolver):
+    resultDips = Signal(object)
     resultEnergy = Signal(float)
+    progressReport = Signal(float, float, float, float, float) # iteration (float, not bound to 2^31), energy (eV), acceptance rate (-1 for CG), remaining time (s), fraction done (-1 if unknown)
+    cancelled = Signal()
+    kernelInfo = Signal(str) # description of the pair kernel used, ex: tile size of TiledPairs
     error = Signal()
     def __init__(self, parent=None):
         super(WorkerMinEnergy, self).__init__(parent=parent)
         self.dipoles = None
         self.lock2D = False
+        self.distCoef = -9.0
         self.unitCoef=10**-9
+        self.kernelOptions = {}
+        self.cancelToken = CancelToken()
+        self.progress = None
+        self.method = "CG"
+        self.historySize = 10
     
     """
-    dipoles: dipoles list (DipModel)
+    dipoles: snapshot of the dipoles (DipoleStore, see DipModel.getDipolesCopy())
     distCoeff: power of the distance unit, 0 is meter, -9 is nanometer (float)
     lock2D: dipoles are on a 2D plan or 3D (boolean)
+    kernelOptions: keyword arguments of pairKernel(), ex: cutoff (dict)
+    method: minimization method, CG or L-BFGS (see MinEnergySolver)
+    historySize: number of corrections kept by L-BFGS (int)
     """
     @Slot()
-    def compute(self, dipoles, distCoef=0.0, lock2D=False):
+    def compute(self, dipoles, distCoef=0.0, lock2D=False, kernelOptions=None, method="CG", historySize=10):
         self.dipoles = dipoles
+        self.kernelOptions = kernelOptions or {}
+        self.method = method
+        self.historySize = historySize
+        self.distCoef = distCoef
         self.unitCoef=10**distCoef
         self.lock2D = lock2D
+        self.cancelToken = CancelToken()
+        self.progress = ProgressReporter(lambda iteration, energy, acceptanceRate, remainingTime, fraction : self.progressReport.emit(iteration, energy*J_TO_EV, acceptanceRate, remainingTime, fraction))
         self.start()
 
+    def kernelReport(self, description):
+        self.kernelInfo.emit(description)
+
+    """Asks the running minimization to stop after its current iteration (thread safe)"""
+    @Slot()
+    def cancel(self):
+        self.cancelToken.cancel()
+
     def run(self):
         try:
             resDips = self.getMinEnergy(self.dipoles, self.lock2D)
             resEn = self.computeEnergyDipoles(resDips)
             self.resultDips.emit(resDips)
             self.resultEnergy.emit(resEn)
+        except Cancelled:
+            self.cancelled.emit()
         except:
             self.error.emit()
 
     def setDipoles(self, dipoles):
         self.dipoles = dipoles
     
-    """
-    Return the configuration of moments that minimize the total energy(magnetic dipole-dipole interaction) of the dipoles
-    It take two argument: 
-    -dipoles: the list of the dipoles (DipModel)
-    -lock2D: boolean, if true the moments will be on a 2D plan (theta=0)
-    """
-    def getMinEnergy(self, dipoles, lock2D):
-        momentIntensity= 1
-        positions = []
-        angle = []
-        nul= []
-        a=0
-
-        #Find the minimum configuration in 3D
-        if lock2D == False:
-            for i in dipoles:
-                angle.append([anglesQuaternionToSph(Dipole.rndQuaternionGenerator(is2D=True))[0],anglesQuaternionToSph(Dipole.rndQuaternionGenerator(is2D=True))[1]])
-                positions.append([i.position.x(),i.position.y(),i.position.z()]) # [[x1,y1,z1], [x2,y2,z2]]
-                nul.append([0,0])
-            pos=tuple(positions)
-            res1= optimize.fmin_cg(self.computeEnergy,angle,args=pos,maxiter=10000) #Minimize the computeEnergy function, variables are the orientation of the moments (in 3D) 
-            #res1 is a liste of angle : [phi1, theta1, phi2, theta2]
-            for i in dipoles:
-                i.quaternion = anglesSphToQuaternion(degrees(res1[a]),degrees(res1[a+1]))
-                a+=2
-            return(dipoles)
-                
-        elif lock2D == True: #Find the minimum configuration in 2D
-            for i in dipoles:
-                angle.append(anglesQuaternionToSph(Dipole.rndQuaternionGenerator(is2D=True))[0])
-                positions.append([i.position.x(),i.position.y(),i.position.z()]) # [[x1,y1,z1], [x2,y2,z2]]
-                nul.append(0)
-            pos=tuple(positions)
-            res1= optimize.fmin_cg(self.computeEnergy2D,angle,args=pos,maxiter=10000)   #Minimize the computeEnergy function, variables are the orientation of the moments (in 2D)            
-            #res1 is a list of angle: [phi1, phi2, phi3]
-            for i in dipoles:
-                i.quaternion = anglesSphToQuaternion(degrees(res1[a]),90) # change the quaternion to the minimized one
-                a+=1
-            return(dipoles)
 
-    """
-    Compute the total energy (Magnetic dip to dip)
-    It take two argument:
-    -angle: list of angles of each dipole : [[phi1,theta1],[phi2,theta2]]
-    -args: tuple of list of the positions of each dipole: ([[x1,y1,z1],[x2,y2,z2])
-    """
-    def computeEnergy(self, angle,*args): 
-        E=0                              
-        moment=[]
-        for i in range(int(len(angle)/2)):
-                phiI= angle[2*i]
-                thetaI= angle[2*i+1]
-                moment.append([cos(phiI)*sin(thetaI),sin(phiI)*sin(thetaI),cos(thetaI)]) #create al list of all moment: [[m1_x,m1,y,m1_z],[m2_x,m2_y,m2_z]]
-
-        """ Formula of energy of magnetic dipole–dipole interaction """
-        for i in range(len(args)):
-            for j in range(len(args)):
-                if j != i:
-                    vectIJ= np.subtract(args[j],args[i])                    
-                    normIJ= np.linalg.norm(vectIJ)
-                    E+=(np.dot(moment[i],moment[j]))/(normIJ**3) - (3*np.dot(moment[i],vectIJ)*np.dot(moment[j],vectIJ))/(normIJ**5)               
-        return ((E*mu_0/(8*pi))*10**18)
-    
-    """
-    Compute the total energy (Magnetic dip to dip) in J
-    It take two argument:
-    -angle: list of angles of each dipole (in polar coordinate) : [phi1,phi2,phi3] 
-    -args: tuple of list of the positions of each dipole: ([[x1,y1,z1],[x2,y2,z2])
-    """
-    def computeEnergy2D(self, angle,*args): 
-        E=0                                 
-        moment=[]
-        for i in range(len(angle)):
-                phiI= angle[i]
-                thetaI= pi/2
-                moment.append([cos(phiI)*sin(thetaI),sin(phiI)*sin(thetaI),cos(thetaI)]) #create al list of all moment: [[m1_x,m1,y,m1_z],[m2_x,m2_y,m2_z]]
-
-        """ Formula of energy of magnetic dipole–dipole interaction """
-        for i in range(len(args)):
-            for j in range(len(args)):
-                if j != i:
-                    vectIJ= np.subtract(args[j],args[i]) # r_IJ vector                   
-                    normIJ= np.linalg.norm(vectIJ) # ||r_IJ||
-                    E+=(np.dot(moment[i],moment[j]))/(normIJ**3) - (3*np.dot(moment[i],vectIJ)*np.dot(moment[j],vectIJ))/(normIJ**5)               
-        E=(E*mu_0)/(8*pi)
-        return (E*(10**18))
 
+"""
+Runs in a thread a check of the energy kernels too long for the GUI thread (exact sums over all pairs are O(N^2)),
+ex: the truncation error of a cutoff. The check is a function called as check(cancelToken=..., progress=...) which
+returns a list, emitted with the result signal.
+"""
+class WorkerEnergyCheck(QThread):
+    result = Signal(list)
+    progressReport = Signal(float, float, float, float, float) # iteration, energy (-1), acceptance rate (-1), remaining time (s), fraction done (-1 if unknown)
+    cancelled = Signal()
+    error = Signal()
+    def __init__(self, parent=None):
+        super(WorkerEnergyCheck, self).__init__(parent=parent)
+        self.check = None
+        self.cancelToken = CancelToken()
+        self.progress = None
 
-    """
-    Compute the total energy (Magnetic dip to dip) of a dipole configuration in J
-    It take one argument:
-    -dipol: list of all dipoles (DipModel)
-    """
-    def computeEnergyDipoles(self, dipol):
-        positions = []
-        angle = []
-        E=0
-        moment=[]
-        if len(dipol)>1: #if there is only one dipole, the energy is zero
-            for i in dipol:
-                angle.append([anglesQuaternionToSph(i.quaternion)[0],anglesQuaternionToSph(i.quaternion)[1]]) # [[phi1,theta1],[phi2,theta2]]
-                positions.append([i.position.x()*self.unitCoef,i.position.y()*self.unitCoef,i.position.z()*self.unitCoef]) # [[x1,y1,z1], [x2,y2,z2]]
-            
-            for i in range(len(angle)):
-                    MI = dipol[i].moment * 9.27 * 10**-24 #convert the moment intensity of the dipole in J/T (µ_b -> J/T)
-                    phiI= angle[i][0]
-                    thetaI= angle[i][1]
-                    moment.append([cos(phiI)*sin(thetaI)*MI,sin(phiI)*sin(thetaI)*MI,cos(thetaI)*MI]) #create al list of all moment: [[m1_x,m1,y,m1_z],[m2_x,m2_y,m2_z]]
-
-            """ Formula of energy of magnetic dipole–dipole interaction """
-            for i in range(len(positions)):
-                for j in range(len(positions)):
-                    if j != i:
-                        vectIJ= np.subtract(positions[j],positions[i])  # r_IJ vector                   
-                        normIJ= np.linalg.norm(vectIJ)  # ||r_IJ||
-                        E+=(np.dot(moment[i],moment[j]))/(normIJ**3) - (3*np.dot(moment[i],vectIJ)*np.dot(moment[j],vectIJ))/(normIJ**5)
-            E=(E*mu_0/(8*pi))
-            return (E*6.242 * 10**18) #convert E in J to eV
-        else:
-            return(0)
+    @Slot()
+    def compute(self, check):
+        self.check = check
+        self.cancelToken = CancelToken()
+        self.progress = ProgressReporter(lambda *report : self.progressReport.emit(*report))
+        self.start()
+
+    """Asks the running check to stop before its next tile of pairs (thread safe)"""
+    @Slot()
+    def cancel(self):
+        self.cancelToken.cancel()
+
+    def run(self):
+        try:
+            self.result.emit(self.check(cancelToken=self.cancelToken, progress=self.progress))
+        except Cancelled:
+            self.cancelled.emit()
+        except:
+            self.error.emit()
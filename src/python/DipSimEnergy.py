@@ -0,0 +1,829 @@
+# This Python file uses the following encoding: utf-8
+
+"""
+MIT License
+
+Copyright (c) 2020 Nils DEYBACH & Léo OUDART
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+"""
+Energy kernel of the magnetic dipole–dipole interaction shared by every solver (conjugate gradient and Monte-Carlo).
+It only works on NumPy arrays and does not depend on Qt, positions and moments are given as contiguous (N,3) arrays.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from scipy.constants import mu_0, pi
+from scipy.spatial import cKDTree
+from scipy.special import erfc
+
+from . import DipSimJit
+
+MU_B = 9.27 * 10**-24 # bohr magneton in J/T
+J_TO_EV = 6.242 * 10**18 # convert J to eV
+
+"""
+Returns the (N,3) array of moments from spherical angles (physics convention, in radians).
+phi, theta: (N,) arrays of angles
+intensity: moment intensity, scalar or (N,) array
+"""
+def anglesToMoments(phi, theta, intensity=1.0):
+    phi = np.asarray(phi, dtype=np.float64)
+    theta = np.asarray(theta, dtype=np.float64)
+    sinTheta = np.sin(theta)
+    moments = np.stack((np.cos(phi)*sinTheta, np.sin(phi)*sinTheta, np.cos(theta)), axis=-1)
+    return moments*np.reshape(intensity, (-1, 1)) if np.ndim(intensity) else moments*intensity
+
+"""
+Returns the sum over all pairs i<j of (m_i.m_j)/r_ij^3 - 3(m_i.r_ij)(m_j.r_ij)/r_ij^5.
+Each pair is only evaluated once (no double counting).
+positions: (N,3) array of positions
+moments: (N,3) array of moments
+"""
+def pairEnergySum(positions, moments):
+    positions = np.ascontiguousarray(positions, dtype=np.float64)
+    moments = np.ascontiguousarray(moments, dtype=np.float64)
+    if len(positions) < 2:
+        return 0.0
+    i, j = np.triu_indices(len(positions), 1)
+    vectIJ = positions[j] - positions[i] # r_IJ vectors
+    normIJ2 = np.einsum('ij,ij->i', vectIJ, vectIJ) # ||r_IJ||^2
+    invNormIJ3 = normIJ2**-1.5
+    mImJ = np.einsum('ij,ij->i', moments[i], moments[j])
+    mIrIJ = np.einsum('ij,ij->i', moments[i], vectIJ)
+    mJrIJ = np.einsum('ij,ij->i', moments[j], vectIJ)
+    return float(np.sum(invNormIJ3*(mImJ - 3*mIrIJ*mJrIJ/normIJ2)))
+
+"""
+Returns the sum over all pairs (i in A, j in B) of (m_i.m_j)/r_ij^3 - 3(m_i.r_ij)(m_j.r_ij)/r_ij^5, pairs at zero
+distance are skipped (A and B can be the same dipoles, each pair is then counted twice).
+Computed by blocks of rows, memory is O(rowsPerBlock*len(B)).
+positionsA, momentsA, positionsB, momentsB: (N,3) arrays of positions and moments of A and B
+"""
+def crossPairEnergySum(positionsA, momentsA, positionsB, momentsB, rowsPerBlock=256):
+    positionsB = np.ascontiguousarray(positionsB, dtype=np.float64)
+    momentsB = np.ascontiguousarray(momentsB, dtype=np.float64)
+    total = 0.0
+    for start in range(0, len(positionsA), rowsPerBlock):
+        vectIJ = positionsB[None, :, :] - np.asarray(positionsA[start:start + rowsPerBlock], dtype=np.float64)[:, None, :]
+        momentsI = np.asarray(momentsA[start:start + rowsPerBlock], dtype=np.float64)
+        normIJ2 = np.einsum('ijk,ijk->ij', vectIJ, vectIJ)
+        normIJ2[normIJ2 == 0] = np.inf # same dipole
+        mImJ = momentsI @ momentsB.T
+        mIrIJ = np.einsum('ik,ijk->ij', momentsI, vectIJ)
+        mJrIJ = np.einsum('jk,ijk->ij', momentsB, vectIJ)
+        total += float(np.sum(normIJ2**-1.5*(mImJ - 3*mIrIJ*mJrIJ/normIJ2)))
+    return total
+
+"""
+Returns the total magnetic dipole–dipole interaction energy (in J if positions are in m and moments in J/T).
+positions: (N,3) array of positions
+moments: (N,3) array of moments
+"""
+def dipolarEnergy(positions, moments):
+    return pairEnergySum(positions, moments)*mu_0/(4*pi)
+
+"""
+Returns the (N,3) array of the sums over j!=i of m_j/r_ij^3 - 3r_ij(m_j.r_ij)/r_ij^5.
+It is the derivative of pairEnergySum() with respect to each moment (and minus the local dipolar field without mu_0/(4pi)).
+positions: (N,3) array of positions
+moments: (N,3) array of moments
+"""
+def pairFieldSum(positions, moments):
+    positions = np.ascontiguousarray(positions, dtype=np.float64)
+    moments = np.ascontiguousarray(moments, dtype=np.float64)
+    fields = np.zeros_like(moments)
+    if len(positions) < 2:
+        return fields
+    i, j = np.triu_indices(len(positions), 1)
+    vectIJ = positions[j] - positions[i]
+    normIJ2 = np.einsum('ij,ij->i', vectIJ, vectIJ)
+    invNormIJ3 = normIJ2**-1.5
+    mIrIJ = np.einsum('ij,ij->i', moments[i], vectIJ)*3/normIJ2
+    mJrIJ = np.einsum('ij,ij->i', moments[j], vectIJ)*3/normIJ2
+    fieldsOnI = (moments[j] - vectIJ*mJrIJ[:, None])*invNormIJ3[:, None] # contribution of j on i
+    fieldsOnJ = (moments[i] - vectIJ*mIrIJ[:, None])*invNormIJ3[:, None] # contribution of i on j
+    for k in range(3):
+        fields[:, k] = np.bincount(i, weights=fieldsOnI[:, k], minlength=len(positions)) + np.bincount(j, weights=fieldsOnJ[:, k], minlength=len(positions))
+    return fields
+
+"""
+Returns the (N,3) gradient of dipolarEnergy() with respect to each moment.
+positions: (N,3) array of positions
+moments: (N,3) array of moments
+"""
+def dipolarEnergyGradient(positions, moments):
+    return pairFieldSum(positions, moments)*mu_0/(4*pi)
+
+"""
+Chain rule from a gradient with respect to the moments (N,3) to a gradient with respect to their
+spherical angles. Returns an (N,2) array of [dE/dphi, dE/dtheta].
+gradMoments: (N,3) gradient with respect to the moments
+phi, theta: (N,) arrays of angles in radians
+intensity: moment intensity, scalar or (N,) array
+"""
+def momentsGradientToAngles(gradMoments, phi, theta, intensity=1.0):
+    phi = np.asarray(phi, dtype=np.float64)
+    theta = np.asarray(theta, dtype=np.float64)
+    cosPhi, sinPhi = np.cos(phi), np.sin(phi)
+    cosTheta, sinTheta = np.cos(theta), np.sin(theta)
+    gradPhi = (-sinPhi*gradMoments[:, 0] + cosPhi*gradMoments[:, 1])*sinTheta
+    gradTheta = (cosPhi*gradMoments[:, 0] + sinPhi*gradMoments[:, 1])*cosTheta - sinTheta*gradMoments[:, 2]
+    return np.stack((gradPhi, gradTheta), axis=-1)*np.reshape(intensity, (-1, 1))
+
+######## PAIR KERNELS #########
+
+"""
+Pair kernel evaluating directly pairEnergySum() and pairFieldSum() on fixed positions.
+Used when the interaction tensors of the positions can't fit in the cache.
+positions: (N,3) array of positions (already multiplied by the distance unit)
+"""
+class DirectPairs:
+    selfTensors = None # (N,3,3) interaction of each dipole with itself (periodic images), None if there is none
+    jit = False # use the Numba kernels of DipSimJit when they are available, set by pairKernel()
+
+    def __init__(self, positions):
+        self.positions = np.ascontiguousarray(positions, dtype=np.float64)
+
+    """
+    Returns a short description of the kernel, shown to the user (str).
+    """
+    def description(self):
+        return type(self).__name__ + ": " + str(len(self.positions)) + " dipoles" + (", Numba" if self.jit else "")
+
+    def pairEnergySum(self, moments):
+        if self.jit:
+            return float(DipSimJit.pairEnergySum(self.positions, np.ascontiguousarray(moments, dtype=np.float64)))
+        return pairEnergySum(self.positions, moments)
+
+    def pairFieldSum(self, moments):
+        if self.jit:
+            return DipSimJit.pairFieldSum(self.positions, np.ascontiguousarray(moments, dtype=np.float64))
+        return pairFieldSum(self.positions, moments)
+
+    """
+    Returns the (N,3) contribution of "moment" placed on dipole "index" to pairFieldSum() of every dipole, in O(N).
+    Used to update local fields incrementally when a single moment changes.
+    """
+    def pairFieldFrom(self, index, moment):
+        vectIJ = self.positions - self.positions[index]
+        normIJ2 = np.einsum('ij,ij->i', vectIJ, vectIJ)
+        normIJ2[index] = np.inf # no self interaction
+        invNormIJ3 = normIJ2**-1.5
+        mIrIJ = (vectIJ @ moment)*3/normIJ2
+        return (moment[None, :] - vectIJ*mIrIJ[:, None])*invNormIJ3[:, None]
+
+    """
+    Adds pairFieldFrom(index, moment) to "fields" in place.
+    """
+    def addPairFieldFrom(self, fields, index, moment):
+        fields += self.pairFieldFrom(index, moment)
+
+    """
+    Returns the total energy (in J if positions are in m and moments in J/T).
+    """
+    def energy(self, moments):
+        return self.pairEnergySum(moments)*mu_0/(4*pi)
+
+    """
+    Returns the (N,3) gradient of energy() with respect to each moment.
+    """
+    def energyGradient(self, moments):
+        return self.pairFieldSum(moments)*mu_0/(4*pi)
+
+"""
+Interaction tensors of all pairs of fixed positions packed in a dense symmetric (3N,3N) matrix.
+Block (i,j) is (I - 3 r_ij⊗r_ij/r_ij^2)/r_ij^3 and diagonal blocks are zero, so energy and fields
+of any moments configuration are matrix-vector products.
+positions: (N,3) array of positions (already multiplied by the distance unit)
+"""
+class PairTensors(DirectPairs):
+    rowsPerBlock = 256 # rows built at once, bounds temporary memory while building the matrix
+
+    def __init__(self, positions):
+        super(PairTensors, self).__init__(positions)
+        nbDipoles = len(self.positions)
+        self.matrix = np.zeros((nbDipoles, 3, nbDipoles, 3), dtype=np.float64)
+        for start in range(0, nbDipoles, self.rowsPerBlock):
+            stop = min(start + self.rowsPerBlock, nbDipoles)
+            vectIJ = self.positions[None, :, :] - self.positions[start:stop, None, :] # (rows,N,3) r_IJ vectors
+            normIJ2 = np.einsum('ijk,ijk->ij', vectIJ, vectIJ)
+            normIJ2[np.arange(stop - start), np.arange(start, stop)] = np.inf # no self interaction
+            invNormIJ3 = normIJ2**-1.5
+            block = -3*(invNormIJ3/normIJ2)[:, :, None, None]*vectIJ[:, :, :, None]*vectIJ[:, :, None, :] # (rows,N,3,3)
+            block += invNormIJ3[:, :, None, None]*np.eye(3)
+            self.matrix[start:stop] = block.transpose(0, 2, 1, 3)
+        self.matrix = self.matrix.reshape(3*nbDipoles, 3*nbDipoles)
+
+    @property
+    def nbytes(self):
+        return self.matrix.nbytes
+
+    @staticmethod
+    def estimateBytes(nbDipoles):
+        return 9*nbDipoles*nbDipoles*np.dtype(np.float64).itemsize
+
+    def pairEnergySum(self, moments):
+        flatMoments = np.ravel(moments)
+        return 0.5*float(flatMoments @ (self.matrix @ flatMoments))
+
+    def pairFieldSum(self, moments):
+        return (self.matrix @ np.ravel(moments)).reshape(-1, 3)
+
+    def pairFieldFrom(self, index, moment):
+        return (np.asarray(moment, dtype=np.float64) @ self.matrix[3*index:3*index+3]).reshape(-1, 3) # matrix is symmetric, rows are contiguous
+
+defaultMemoryBudget = 4*1024**2 # bytes of temporary arrays of a TiledPairs tile, about the size of a L2/L3 cache
+
+precisions = ["float64", "float32"]
+
+"""
+Pair kernel summing exactly all pairs of fixed positions by square tiles, nothing of size N^2 is ever stored.
+A tile holds the pairs (i,j), i<j, of tileSize dipoles i with tileSize dipoles j and feeds the fields of both ends,
+so each pair is evaluated once. Temporary memory of a tile is bounded by memoryBudget (small tiles stay in cache),
+the kernel itself is O(N).
+Used for systems whose PairTensors do not fit in memory.
+positions: (N,3) array of positions (already multiplied by the distance unit)
+memoryBudget: memory of the temporary arrays of a tile in bytes (int)
+precision: float64, or float32 to evaluate the pairs of a tile in single precision (see relativeErrorBound())
+
+In float32 the distance components of the pairs are computed in float64, divided by the size of the system and only
+then rounded to float32, so close pairs far from the origin keep their accuracy. Moments are divided by the largest
+one (products of SI values would underflow in float32). Sums inside a tile are float32, the sums of the tiles are
+accumulated in float64. Ratios of the system size to the closest pair distance above about 10^7 overflow float32.
+"""
+class TiledPairs(DirectPairs):
+    bytesPerPair = 12*np.dtype(np.float64).itemsize # temporary arrays of a tile per pair
+    castBytesPerPair = np.dtype(np.float64).itemsize # float64 distance component of a tile before its cast to float32
+    operationsPerPair = 15 # rounding errors of the evaluation of a pair term, see relativeErrorBound()
+    cancelToken = None # SolverControl.CancelToken checked before each tile, raises Cancelled once cancelled
+    progress = None # SolverControl.ProgressReporter receiving the number of tiles done (total is set by tiles())
+
+    def __init__(self, positions, memoryBudget=defaultMemoryBudget, precision="float64"):
+        super(TiledPairs, self).__init__(positions)
+        if precision not in precisions:
+            raise ValueError("unknown precision: " + str(precision))
+        self.memoryBudget = memoryBudget
+        self.precision = precision
+        self.dtype = np.dtype(precision)
+        self.tileSize = self.tileSizeFor(len(self.positions), memoryBudget, self.dtype)
+        self.lengthScale = 1.0
+        if self.dtype == np.float32 and len(self.positions) > 1:
+            self.lengthScale = float(np.ptp(self.positions, axis=0).max()) or 1.0
+
+    """
+    Returns the side of the square tiles of "nbDipoles" dipoles fitting in "memoryBudget" bytes (at least 1).
+    """
+    @classmethod
+    def tileSizeFor(cls, nbDipoles, memoryBudget, dtype=np.float64):
+        bytesPerPair = cls.bytesPerPair*np.dtype(dtype).itemsize/np.dtype(np.float64).itemsize + (cls.castBytesPerPair if np.dtype(dtype) != np.float64 else 0)
+        return int(min(max(np.sqrt(memoryBudget/bytesPerPair), 1), max(nbDipoles, 1)))
+
+    @property
+    def tileBytes(self):
+        return int(self.tileSize**2*(self.bytesPerPair*self.dtype.itemsize/np.dtype(np.float64).itemsize + (self.castBytesPerPair if self.dtype != np.float64 else 0)))
+
+    def description(self):
+        if self.jit and self.dtype == np.float64:
+            return "tiled pairs float64: Numba, O(N) memory without tiles"
+        return "tiled pairs " + self.precision + ": " + str(self.tileSize) + "x" + str(self.tileSize) + " tiles (" + str(round(self.tileBytes/1024**2, 1)) + " MB)"
+
+    """
+    Returns the bound of |E - E_float64| / S of the energy E of this kernel, S being the sum of the absolute values of
+    the pair energies (see absolutePairEnergySum()). Distance components are exact differences of float64 positions
+    rounded once to float32, each pair term then carries at most operationsPerPair roundings (the three casts included)
+    and a float32 tile sum at most tileSize more, with unit roundoff u = 2**-24, the float64 sum of the tiles is negligible:
+    |E - E_float64| <= (operationsPerPair + tileSize)*u*S (first order in u). It is a worst case, random rounding
+    errors usually give sqrt of it. Relative to |E| it is larger when the pair energies cancel out (S >> |E|).
+    0 in float64.
+    """
+    def relativeErrorBound(self):
+        if self.dtype == np.float64:
+            return 0.0
+        return (self.operationsPerPair + self.tileSize)*float(np.finfo(np.float32).eps)/2
+
+    """
+    Yields the (startI, stopI, startJ, stopJ) bounds of the tiles covering the pairs i<j, checks cancelToken and
+    reports to progress before each tile (energy unknown: -1).
+    """
+    def tiles(self):
+        nbDipoles = len(self.positions)
+        nbRows = -(-nbDipoles//self.tileSize)
+        if self.progress is not None:
+            self.progress.total = nbRows*(nbRows + 1)//2
+        index = 0
+        for startI in range(0, nbDipoles, self.tileSize):
+            for startJ in range(startI, nbDipoles, self.tileSize):
+                if self.cancelToken is not None:
+                    self.cancelToken.check()
+                if self.progress is not None:
+                    self.progress.report(index, -1.0)
+                yield startI, min(startI + self.tileSize, nbDipoles), startJ, min(startJ + self.tileSize, nbDipoles)
+                index += 1
+
+    """
+    Returns the distance components, 1/r^3 and 3/r^5 of the pairs of a tile in the kernel precision and scaled units
+    (distances divided by lengthScale), pairs j<=i of a diagonal tile are zeroed. Distance components are differences
+    of the float64 positions, rounded to the kernel precision afterwards.
+    """
+    def _tilePairs(self, startI, stopI, startJ, stopJ):
+        positionsI, positionsJ = self.positions[startI:stopI], self.positions[startJ:stopJ]
+        dx, dy, dz = (((positionsJ[None, :, k] - positionsI[:, k, None])/self.lengthScale).astype(self.dtype, copy=False) for k in range(3))
+        normIJ2 = dx*dx + dy*dy + dz*dz
+        if startI == startJ:
+            normIJ2[np.tril_indices(stopI - startI)] = np.inf # pairs j<=i of a diagonal tile
+        invNormIJ3 = 1/(normIJ2*np.sqrt(normIJ2))
+        invNormIJ5x3 = 3*invNormIJ3/normIJ2
+        return dx, dy, dz, invNormIJ3, invNormIJ5x3
+
+    """
+    Returns "moments" in the kernel precision divided by momentScale (largest moment norm) and momentScale.
+    """
+    def _scaledMoments(self, moments):
+        moments = np.ascontiguousarray(moments, dtype=np.float64)
+        if self.dtype == np.float64:
+            return moments, 1.0
+        momentScale = float(np.sqrt(np.einsum('ij,ij->i', moments, moments).max())) if len(moments) else 0.0
+        momentScale = momentScale or 1.0
+        return (moments/momentScale).astype(self.dtype), momentScale
+
+    """
+    Adds to fields[startI:stopI] (float64) the fields of the dipoles startJ:stopJ and, if "both", to fields[startJ:stopJ]
+    the fields of the dipoles startI:stopI, in scaled units. On a diagonal tile only the pairs j>i are summed.
+    """
+    def _addTileFields(self, fields, moments, startI, stopI, startJ, stopJ, both=True):
+        dx, dy, dz, invNormIJ3, invNormIJ5x3 = self._tilePairs(startI, stopI, startJ, stopJ)
+        momentsI, momentsJ = moments[startI:stopI], moments[startJ:stopJ]
+        weights = invNormIJ5x3*(dx*momentsJ[None, :, 0] + dy*momentsJ[None, :, 1] + dz*momentsJ[None, :, 2]) # 3(m_j.r_ij)/r_ij^5
+        fields[startI:stopI] += invNormIJ3 @ momentsJ - np.stack(((weights*dx).sum(axis=1), (weights*dy).sum(axis=1), (weights*dz).sum(axis=1)), axis=-1)
+        if both:
+            weights = invNormIJ5x3*(dx*momentsI[:, 0, None] + dy*momentsI[:, 1, None] + dz*momentsI[:, 2, None]) # 3(m_i.r_ij)/r_ij^5
+            fields[startJ:stopJ] += invNormIJ3.T @ momentsI - np.stack(((weights*dx).sum(axis=0), (weights*dy).sum(axis=0), (weights*dz).sum(axis=0)), axis=-1)
+
+    def pairFieldSum(self, moments):
+        if self.jit and self.dtype == np.float64: # compiled loops need no tiles
+            return DirectPairs.pairFieldSum(self, moments)
+        scaledMoments, momentScale = self._scaledMoments(moments)
+        fields = np.zeros((len(scaledMoments), 3), dtype=np.float64)
+        for tile in self.tiles():
+            self._addTileFields(fields, scaledMoments, *tile)
+        return fields*(momentScale/self.lengthScale**3)
+
+    """
+    Sum over i of m_i.(fields of the dipoles j>i on i), each pair once: only half of the fields of a tile are needed.
+    """
+    def pairEnergySum(self, moments):
+        if self.jit and self.dtype == np.float64:
+            return DirectPairs.pairEnergySum(self, moments)
+        scaledMoments, momentScale = self._scaledMoments(moments)
+        fields = np.zeros((len(scaledMoments), 3), dtype=np.float64)
+        for tile in self.tiles():
+            self._addTileFields(fields, scaledMoments, *tile, both=False)
+        return float(np.sum(scaledMoments*fields))*(momentScale**2/self.lengthScale**3)
+
+    """
+    Returns S, the sum over all pairs of |(m_i.m_j)/r_ij^3 - 3(m_i.r_ij)(m_j.r_ij)/r_ij^5| (no cancellation, so it
+    is accurate in float32 too). Scale of relativeErrorBound().
+    """
+    def absolutePairEnergySum(self, moments):
+        scaledMoments, momentScale = self._scaledMoments(moments)
+        total = 0.0
+        for startI, stopI, startJ, stopJ in self.tiles():
+            dx, dy, dz, invNormIJ3, invNormIJ5x3 = self._tilePairs(startI, stopI, startJ, stopJ)
+            momentsI, momentsJ = scaledMoments[startI:stopI], scaledMoments[startJ:stopJ]
+            mIrIJ = dx*momentsI[:, 0, None] + dy*momentsI[:, 1, None] + dz*momentsI[:, 2, None]
+            mJrIJ = dx*momentsJ[None, :, 0] + dy*momentsJ[None, :, 1] + dz*momentsJ[None, :, 2]
+            total += float(np.abs(invNormIJ3*(momentsI @ momentsJ.T) - invNormIJ5x3*mIrIJ*mJrIJ).sum(dtype=np.float64))
+        return total*(momentScale**2/self.lengthScale**3)
+
+"""
+Returns [measured, bound] relative errors of the float32 energy of TiledPairs against the float64 one (see
+TiledPairs.relativeErrorBound()), [0, 0] if the energy is 0. The three sums are O(N^2) in time, O(N) in memory.
+positions: (N,3) array of positions in distance units
+moments: (N,3) array of moments
+distCoef: power of the distance unit, 0 is meter, -9 is nanometer (float)
+memoryBudget: memory of a tile in bytes (int)
+jit: float64 sum with the Numba kernel of DipSimJit if available (bool)
+cancelToken, progress: see TiledPairs, can be None
+"""
+def precisionError(positions, moments, distCoef=0.0, memoryBudget=defaultMemoryBudget, jit=False, cancelToken=None, progress=None):
+    kernel64 = pairKernel(positions, distCoef, backend="tiled", memoryBudget=memoryBudget, jit=jit)
+    kernel32 = pairKernel(positions, distCoef, backend="tiled", memoryBudget=memoryBudget, precision="float32")
+    for kernel in (kernel64, kernel32):
+        kernel.cancelToken, kernel.progress = cancelToken, progress
+    energy = kernel64.pairEnergySum(moments)
+    if energy == 0:
+        return [0.0, 0.0]
+    bound = kernel32.relativeErrorBound()*kernel32.absolutePairEnergySum(moments)/abs(energy)
+    return [abs(kernel32.pairEnergySum(moments) - energy)/abs(energy), bound]
+
+truncations = ["shifted", "smooth"]
+
+"""
+Pair kernel limited to pairs closer than "cutoff", found once with a k-d tree (scipy.spatial.cKDTree).
+Energy, fields and single moment updates are then O(N) for a fixed density instead of O(N^2).
+The interaction (I/r^3 - 3 r⊗r/r^5) is truncated so it vanishes at the cutoff:
+-shifted: 1/r^3 and 3/r^5 terms are shifted by their value at the cutoff (continuous energy)
+-smooth: both terms are multiplied by a C2 switching function going from 1 at 0.9*cutoff to 0 at cutoff
+
+positions: (N,3) array of positions (already multiplied by the distance unit)
+cutoff: cutoff radius, same unit as positions
+truncation: shifted or smooth
+"""
+class TruncatedPairs(DirectPairs):
+    smoothStart = 0.9 # fraction of the cutoff where the smooth switching starts
+
+    def __init__(self, positions, cutoff, truncation="shifted"):
+        super(TruncatedPairs, self).__init__(positions)
+        if truncation not in truncations:
+            raise ValueError("unknown truncation: " + str(truncation))
+        self.cutoff = cutoff
+        self.truncation = truncation
+        pairs = cKDTree(self.positions).query_pairs(cutoff, output_type='ndarray')
+        source = np.concatenate((pairs[:, 0], pairs[:, 1])) # both directions of each pair
+        target = np.concatenate((pairs[:, 1], pairs[:, 0]))
+        order = np.argsort(source, kind='stable')
+        self.source, self.target = source[order], target[order]
+        self.indptr = np.searchsorted(self.source, np.arange(len(self.positions) + 1)) # neighbours of i are target[indptr[i]:indptr[i+1]]
+        self.vectIJ = self.positions[self.target] - self.positions[self.source]
+        normIJ2 = np.einsum('ij,ij->i', self.vectIJ, self.vectIJ)
+        normIJ = np.sqrt(normIJ2)
+        if truncation == "shifted":
+            self.coefI = normIJ**-3 - cutoff**-3 # coefficient of m_j
+            self.coefR = 3*(normIJ**-5 - cutoff**-5) # coefficient of r_ij(m_j.r_ij)
+        else:
+            x = np.clip((normIJ - self.smoothStart*cutoff)/((1 - self.smoothStart)*cutoff), 0, 1)
+            switch = 1 - 10*x**3 + 15*x**4 - 6*x**5
+            self.coefI = switch*normIJ**-3
+            self.coefR = 3*switch*normIJ**-5
+
+    @property
+    def nbPairs(self):
+        return len(self.source)//2
+
+    def pairFieldSum(self, moments):
+        moments = np.asarray(moments, dtype=np.float64)
+        targetMoments = moments[self.target]
+        contributions = targetMoments*self.coefI[:, None] - self.vectIJ*(np.einsum('ij,ij->i', targetMoments, self.vectIJ)*self.coefR)[:, None]
+        fields = np.empty((len(self.positions), 3), dtype=np.float64)
+        for k in range(3):
+            fields[:, k] = np.bincount(self.source, weights=contributions[:, k], minlength=len(self.positions))
+        return fields
+
+    def pairEnergySum(self, moments):
+        return 0.5*float(np.sum(np.asarray(moments)*self.pairFieldSum(moments)))
+
+    def pairFieldFrom(self, index, moment):
+        fields = np.zeros((len(self.positions), 3), dtype=np.float64)
+        self.addPairFieldFrom(fields, index, moment)
+        return fields
+
+    def addPairFieldFrom(self, fields, index, moment):
+        rows = slice(self.indptr[index], self.indptr[index + 1]) # only the neighbours of "index" are updated
+        vectIJ = self.vectIJ[rows]
+        fields[self.target[rows]] += moment[None, :]*self.coefI[rows, None] - vectIJ*((vectIJ @ moment)*self.coefR[rows])[:, None]
+
+    """
+    Returns [exact, truncated, relative error] of pairEnergySum() of "moments" compared to the exact sum over all pairs.
+    The exact sum is O(N^2) in time, only computed on request, with a TiledPairs kernel of "memoryBudget" bytes.
+    cancelToken, progress: see TiledPairs, can be None
+    """
+    def truncationError(self, moments, memoryBudget=defaultMemoryBudget, cancelToken=None, progress=None):
+        exactKernel = TiledPairs(self.positions, memoryBudget)
+        exactKernel.jit, exactKernel.cancelToken, exactKernel.progress = self.jit, cancelToken, progress
+        exact = exactKernel.pairEnergySum(moments)
+        truncated = self.pairEnergySum(moments)
+        return [exact, truncated, abs(truncated - exact)/abs(exact) if exact != 0 else 0.0]
+
+"""
+Returns the concatenation of the ranges [starts[k], starts[k] + counts[k]) as one array.
+"""
+def raggedRanges(starts, counts):
+    offsets = np.cumsum(counts) - counts
+    return np.repeat(starts - offsets, counts) + np.arange(int(np.sum(counts)))
+
+"""
+Approximate kernel for large systems with a Barnes-Hut octree (O(N log N) per evaluation).
+The tree is built once from the positions. For each dipole, cells seen under an angle smaller than "theta"
+(cell size / distance < theta) are replaced by their dipole expansion: total moment of the cell placed at the
+centroid of its dipoles. Close cells are opened and leaves are summed exactly.
+Smaller theta is more accurate and slower, theta=0 is the exact sum.
+
+positions: (N,3) array of positions (already multiplied by the distance unit)
+theta: opening angle, accuracy parameter (float)
+"""
+class BarnesHutPairs(DirectPairs):
+    maxDepth = 10 # maximum depth of the octree
+    leafSize = 16 # cells with this number of dipoles or less are summed exactly
+    targetsPerChunk = 1024 # dipoles traversing the tree at once, bounds memory
+
+    def __init__(self, positions, theta=0.5):
+        super(BarnesHutPairs, self).__init__(positions)
+        self.theta = theta
+        nbDipoles = len(self.positions)
+        lowCorner = self.positions.min(axis=0)
+        span = max(float(np.max(self.positions.max(axis=0) - lowCorner)), np.finfo(np.float64).tiny)*(1 + 1e-9)
+        cells = np.clip(((self.positions - lowCorner)/span*2**self.maxDepth).astype(np.int64), 0, 2**self.maxDepth - 1)
+        codes = np.zeros(nbDipoles, dtype=np.int64) # morton codes
+        for bit in range(self.maxDepth):
+            for axis in range(3):
+                codes |= ((cells[:, axis] >> bit) & 1) << (3*bit + axis)
+        self.order = np.argsort(codes, kind='stable')
+        self.rank = np.empty(nbDipoles, dtype=np.int64) # position of each dipole in the sorted order
+        self.rank[self.order] = np.arange(nbDipoles)
+        sortedCodes = codes[self.order]
+        sortedPositions = self.positions[self.order]
+        cumPositions = np.concatenate((np.zeros((1, 3)), np.cumsum(sortedPositions, axis=0)))
+
+        starts, ends, sizes, levelKeys = [], [], [], []
+        for level in range(self.maxDepth + 1): # cells of each level are contiguous ranges of the sorted dipoles
+            keys, levelStarts = np.unique(sortedCodes >> (3*(self.maxDepth - level)), return_index=True)
+            levelEnds = np.append(levelStarts[1:], nbDipoles)
+            starts.append(levelStarts)
+            ends.append(levelEnds)
+            sizes.append(np.full(len(keys), span/2**level))
+            levelKeys.append(keys)
+            if np.max(levelEnds - levelStarts) <= self.leafSize:
+                break
+        levelOffsets = np.cumsum([0] + [len(keys) for keys in levelKeys])
+        childStarts, childEnds = [], []
+        for level in range(len(levelKeys)):
+            if level + 1 < len(levelKeys):
+                parentKeys = levelKeys[level + 1] >> 3
+                childStarts.append(np.searchsorted(parentKeys, levelKeys[level], 'left') + levelOffsets[level + 1])
+                childEnds.append(np.searchsorted(parentKeys, levelKeys[level], 'right') + levelOffsets[level + 1])
+            else:
+                childStarts.append(np.zeros(len(levelKeys[level]), dtype=np.int64))
+                childEnds.append(np.zeros(len(levelKeys[level]), dtype=np.int64))
+        self.cellStarts = np.concatenate(starts)
+        self.cellEnds = np.concatenate(ends)
+        self.cellSizes = np.concatenate(sizes)
+        self.childStarts = np.concatenate(childStarts)
+        self.childEnds = np.concatenate(childEnds)
+        self.cellCentroids = (cumPositions[self.cellEnds] - cumPositions[self.cellStarts])/(self.cellEnds - self.cellStarts)[:, None]
+
+    @property
+    def nbCells(self):
+        return len(self.cellStarts)
+
+    """
+    Field sum on "targets" from "moments" placed at "sources" (relative vectors are sources - targets).
+    """
+    @staticmethod
+    def _fieldsFrom(vectIJ, moments):
+        normIJ2 = np.einsum('ij,ij->i', vectIJ, vectIJ)
+        invNormIJ3 = normIJ2**-1.5
+        mJrIJ = np.einsum('ij,ij->i', moments, vectIJ)*3/normIJ2
+        return (moments - vectIJ*mJrIJ[:, None])*invNormIJ3[:, None]
+
+    def pairFieldSum(self, moments):
+        nbDipoles = len(self.positions)
+        sortedMoments = np.asarray(moments, dtype=np.float64)[self.order]
+        cumMoments = np.concatenate((np.zeros((1, 3)), np.cumsum(sortedMoments, axis=0)))
+        cellMoments = cumMoments[self.cellEnds] - cumMoments[self.cellStarts] # dipole expansion of each cell
+        sortedPositions = self.positions[self.order]
+        fields = np.zeros((nbDipoles, 3), dtype=np.float64)
+        contributions = []
+
+        for chunkStart in range(0, nbDipoles, self.targetsPerChunk):
+            targets = np.arange(chunkStart, min(chunkStart + self.targetsPerChunk, nbDipoles)) # in sorted order
+            cells = np.zeros(len(targets), dtype=np.int64) # root cell
+            while len(targets):
+                vectIJ = self.cellCentroids[cells] - sortedPositions[targets]
+                distances = np.sqrt(np.einsum('ij,ij->i', vectIJ, vectIJ))
+                inside = (self.cellStarts[cells] <= targets) & (targets < self.cellEnds[cells])
+                far = ~inside & (self.cellSizes[cells] < self.theta*distances)
+                isLeaf = (self.childEnds[cells] == self.childStarts[cells]) | (self.cellEnds[cells] - self.cellStarts[cells] <= self.leafSize)
+                leaf = ~far & isLeaf
+                opened = ~far & ~isLeaf
+
+                if np.any(far):
+                    contributions.append((targets[far], self._fieldsFrom(vectIJ[far], cellMoments[cells[far]])))
+                if np.any(leaf): # exact sum over the dipoles of the leaf, except the target itself
+                    counts = self.cellEnds[cells[leaf]] - self.cellStarts[cells[leaf]]
+                    sources = raggedRanges(self.cellStarts[cells[leaf]], counts)
+                    leafTargets = np.repeat(targets[leaf], counts)
+                    notSelf = sources != leafTargets
+                    sources, leafTargets = sources[notSelf], leafTargets[notSelf]
+                    contributions.append((leafTargets, self._fieldsFrom(sortedPositions[sources] - sortedPositions[leafTargets], sortedMoments[sources])))
+                counts = self.childEnds[cells[opened]] - self.childStarts[cells[opened]]
+                cells = raggedRanges(self.childStarts[cells[opened]], counts)
+                targets = np.repeat(targets[opened], counts)
+
+            for contributionTargets, values in contributions:
+                for k in range(3):
+                    fields[:, k] += np.bincount(contributionTargets, weights=values[:, k], minlength=nbDipoles)
+            contributions = []
+        unsortedFields = np.empty_like(fields)
+        unsortedFields[self.order] = fields
+        return unsortedFields
+
+    def pairEnergySum(self, moments):
+        return 0.5*float(np.sum(np.asarray(moments)*self.pairFieldSum(moments)))
+
+"""
+Returns the positions of a supercell of "repetitions" = [n_a, n_b, n_c] primitive cells and its (3,3) cell vectors.
+latticeVectors: (3,3) array of the primitive cell vectors a, b, c (rows), c is zero for a 2D cell
+basis: (M,3) array of the dipoles of the primitive cell in fractional coordinates
+repetitions: number of primitive cells along a, b and c (c is ignored for a 2D cell)
+"""
+def supercell(latticeVectors, basis, repetitions):
+    latticeVectors = np.asarray(latticeVectors, dtype=np.float64)
+    repetitions = [int(repetition) for repetition in repetitions]
+    if not np.any(latticeVectors[2]):
+        repetitions[2] = 1
+    indices = np.stack(np.meshgrid(*[np.arange(repetition) for repetition in repetitions], indexing='ij'), axis=-1).reshape(-1, 1, 3)
+    fractional = (indices + np.asarray(basis, dtype=np.float64)[None, :, :]).reshape(-1, 3)
+    return fractional @ latticeVectors, latticeVectors*np.array(repetitions)[:, None]
+
+"""
+Interaction tensors of dipoles repeated periodically along "cellVectors", summed with the Ewald method (tin foil
+boundary conditions), packed in a dense (3N,3N) matrix like PairTensors. Block (i,j) sums the interaction of i with j
+and all its periodic images, diagonal blocks hold the interaction of each dipole with its own images (selfTensors).
+The sum is split in a real space part (erfc screened, up to realCutoff) and a reciprocal space part (up to
+reciprocalCutoff), both chosen from "tolerance" so that the neglected terms are below exp(-s^2) = tolerance.
+The energy is per supercell.
+
+For a 2D cell (third cell vector zero), the plane is repeated along its normal with a vacuum gap of slabVacuum times
+the in-plane size and the Yeh-Berkowitz slab correction 2pi/V*M_z^2 removes the interaction between slabs.
+
+positions: (N,3) array of positions in the supercell (already multiplied by the distance unit)
+cellVectors: (3,3) array of the supercell vectors (rows, same unit as positions)
+tolerance: relative accuracy of the Ewald sum (float)
+alpha: splitting parameter between real and reciprocal sums, chosen from the density if None (float)
+"""
+class EwaldPairs(PairTensors):
+    slabVacuum = 3.0 # vacuum between periodic slabs of a 2D cell, relative to the in-plane size
+
+    def __init__(self, positions, cellVectors, tolerance=1e-8, alpha=None):
+        DirectPairs.__init__(self, positions)
+        cellVectors = np.array(cellVectors, dtype=np.float64)
+        self.is2D = not np.any(cellVectors[2])
+        if self.is2D:
+            normal = np.cross(cellVectors[0], cellVectors[1])
+            cellVectors[2] = normal/np.linalg.norm(normal)*self.slabVacuum*max(np.linalg.norm(cellVectors[0]), np.linalg.norm(cellVectors[1]))
+        self.cellVectors = cellVectors
+        self.volume = abs(np.linalg.det(cellVectors))
+        reciprocalVectors = 2*pi*np.linalg.inv(cellVectors).T # a_i.b_j = 2pi delta_ij
+        nbDipoles = len(self.positions)
+        s = np.sqrt(-np.log(tolerance))
+        self.alpha = np.sqrt(pi)*(nbDipoles/self.volume**2)**(1/6) if alpha is None else alpha # default balances real and reciprocal costs
+        self.realCutoff = s/self.alpha
+        self.reciprocalCutoff = 2*self.alpha*s
+
+        matrix = np.zeros((nbDipoles, 3, nbDipoles, 3), dtype=np.float64)
+        images = self._latticePoints(cellVectors, np.ceil(self.realCutoff*np.linalg.norm(reciprocalVectors, axis=1)/(2*pi)))
+        images = images[np.linalg.norm(images, axis=1) <= self.realCutoff + np.linalg.norm(np.sum(np.abs(cellVectors), axis=0))]
+        for start in range(0, nbDipoles, self.rowsPerBlock):
+            stop = min(start + self.rowsPerBlock, nbDipoles)
+            vectIJ0 = self.positions[None, :, :] - self.positions[start:stop, None, :]
+            for image in images:
+                vectIJ = vectIJ0 + image
+                normIJ2 = np.einsum('ijk,ijk->ij', vectIJ, vectIJ)
+                keep = (normIJ2 > 0) & (normIJ2 <= self.realCutoff**2)
+                if not np.any(keep):
+                    continue
+                rows, columns = np.nonzero(keep)
+                vectors = vectIJ[rows, columns]
+                normIJ = np.sqrt(normIJ2[rows, columns])
+                alphaR = self.alpha*normIJ
+                gaussian = 2*alphaR/np.sqrt(pi)*np.exp(-alphaR**2)
+                coefI = (erfc(alphaR) + gaussian)/normIJ**3
+                coefR = (3*erfc(alphaR) + gaussian*(3 + 2*alphaR**2))/normIJ**5
+                np.add.at(matrix, (rows + start, slice(None), columns), coefI[:, None, None]*np.eye(3) - coefR[:, None, None]*vectors[:, :, None]*vectors[:, None, :])
+        matrix = matrix.reshape(3*nbDipoles, 3*nbDipoles)
+
+        waveVectors = self._latticePoints(reciprocalVectors, np.ceil(self.reciprocalCutoff*np.linalg.norm(cellVectors, axis=1)/(2*pi)))
+        waveNorm2 = np.einsum('ij,ij->i', waveVectors, waveVectors)
+        waveVectors = waveVectors[(waveNorm2 > 0) & (waveNorm2 <= self.reciprocalCutoff**2)]
+        waveNorm2 = np.einsum('ij,ij->i', waveVectors, waveVectors)
+        weights = np.sqrt(4*pi/self.volume*np.exp(-waveNorm2/(4*self.alpha**2))/waveNorm2)
+        for start in range(0, len(waveVectors), self.rowsPerBlock):
+            waves, waveWeights = waveVectors[start:start + self.rowsPerBlock], weights[start:start + self.rowsPerBlock]
+            phases = waves @ self.positions.T # (K,N)
+            for trigonometric in (np.cos, np.sin):
+                factors = ((waveWeights[:, None]*trigonometric(phases))[:, :, None]*waves[:, None, :]).reshape(len(waves), -1)
+                matrix += factors.T @ factors
+        matrix[np.arange(3*nbDipoles), np.arange(3*nbDipoles)] -= 4*self.alpha**3/(3*np.sqrt(pi)) # self energy of the screening gaussian
+        if self.is2D:
+            normal = cellVectors[2]/np.linalg.norm(cellVectors[2])
+            matrix += np.tile(4*pi/self.volume*np.outer(normal, normal), (nbDipoles, nbDipoles))
+        self.matrix = matrix
+        self.selfTensors = np.stack([matrix[3*i:3*i+3, 3*i:3*i+3] for i in range(nbDipoles)]) if nbDipoles else np.zeros((0, 3, 3))
+
+    """
+    Returns the points n_a*a + n_b*b + n_c*c of the lattice "vectors" with |n_i| <= ranges[i].
+    """
+    @staticmethod
+    def _latticePoints(vectors, ranges):
+        indices = np.stack(np.meshgrid(*[np.arange(-int(r), int(r) + 1) for r in ranges], indexing='ij'), axis=-1).reshape(-1, 3)
+        return indices @ vectors
+
+"""
+Keeps the PairTensors of the last lattices computed, keyed by a hash of the positions and distCoef.
+Oldest lattices are evicted when the total size exceeds maxBytes.
+maxBytes: memory ceiling of the cache in bytes
+"""
+class PairTensorCache:
+    def __init__(self, maxBytes=512*1024**2):
+        self.maxBytes = maxBytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(positions, distCoef=0.0):
+        positions = np.ascontiguousarray(positions, dtype=np.float64)
+        return (hashlib.sha1(positions.tobytes()).hexdigest(), positions.shape, float(distCoef))
+
+    @property
+    def nbytes(self):
+        return sum(entry.nbytes for entry in self._entries.values())
+
+    """
+    Returns the PairTensors of "positions" in 10**distCoef m, from cache if already computed.
+    Returns None if the tensors alone exceed the memory ceiling.
+    positions: (N,3) array of positions in distance units
+    distCoef: power of the distance unit, 0 is meter, -9 is nanometer (float)
+    """
+    def get(self, positions, distCoef=0.0):
+        key = self.key(positions, distCoef)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            if PairTensors.estimateBytes(len(positions)) > self.maxBytes:
+                return None
+            tensors = PairTensors(np.asarray(positions, dtype=np.float64)*10**distCoef)
+            self._entries[key] = tensors
+            while self.nbytes > self.maxBytes: # evicts older lattices
+                self._entries.popitem(last=False)
+            return tensors
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+pairTensorCache = PairTensorCache()
+
+energyBackends = ["pairs", "barnesHut", "tiled"]
+
+"""
+Returns the pair kernel to use for "positions".
+With the "pairs" backend: TruncatedPairs if a cutoff is given, otherwise cached PairTensors if they fit in the cache
+and TiledPairs if not. With the "barnesHut" backend: BarnesHutPairs. With the "tiled" backend: TiledPairs (exact sum
+in bounded memory, without cutoff). A float32 precision always uses TiledPairs for the exact sum.
+positions: (N,3) array of positions in distance units
+distCoef: power of the distance unit, 0 is meter, -9 is nanometer (float)
+cutoff: cutoff radius in distance units, no cutoff if None or <= 0 (float)
+truncation: truncation of the interaction at the cutoff, shifted or smooth (str)
+backend: pairs or barnesHut (str)
+theta: opening angle of the Barnes-Hut backend (float)
+cellVectors: (3,3) supercell vectors in distance units, if given the positions are periodic and EwaldPairs is used
+tolerance: accuracy of the Ewald sum (float)
+memoryBudget: memory of a TiledPairs tile in bytes (int)
+precision: float64 or float32, precision of the pair evaluation of TiledPairs (str)
+jit: use the Numba kernels of DipSimJit (exact pair sums, Metropolis steps) if Numba is installed (bool)
+"""
+def pairKernel(positions, distCoef=0.0, cache=pairTensorCache, cutoff=None, truncation="shifted", backend="pairs", theta=0.5, cellVectors=None, tolerance=1e-8, memoryBudget=defaultMemoryBudget, precision="float64", jit=False):
+    kernel = _pairKernel(positions, distCoef, cache, cutoff, truncation, backend, theta, cellVectors, tolerance, memoryBudget, precision)
+    kernel.jit = bool(jit) and DipSimJit.jitAvailable # cached PairTensors are shared, they take the option of the last call
+    return kernel
+
+"""
+Builds the kernel of pairKernel(), without the jit option.
+"""
+def _pairKernel(positions, distCoef, cache, cutoff, truncation, backend, theta, cellVectors, tolerance, memoryBudget, precision):
+    if backend not in energyBackends:
+        raise ValueError("unknown energy backend: " + str(backend))
+    if cellVectors is not None:
+        return EwaldPairs(np.asarray(positions, dtype=np.float64)*10**distCoef, np.asarray(cellVectors, dtype=np.float64)*10**distCoef, tolerance)
+    if backend == "barnesHut":
+        return BarnesHutPairs(np.asarray(positions, dtype=np.float64)*10**distCoef, theta)
+    if backend == "tiled":
+        return TiledPairs(np.asarray(positions, dtype=np.float64)*10**distCoef, memoryBudget, precision)
+    if cutoff is not None and cutoff > 0:
+        return TruncatedPairs(np.asarray(positions, dtype=np.float64)*10**distCoef, cutoff*10**distCoef, truncation)
+    if precision != "float64":
+        return TiledPairs(np.asarray(positions, dtype=np.float64)*10**distCoef, memoryBudget, precision)
+    tensors = cache.get(positions, distCoef)
+    return tensors if tensors is not None else TiledPairs(np.asarray(positions, dtype=np.float64)*10**distCoef, memoryBudget)
@@ -0,0 +1,218 @@
+# This Python file uses the following encoding: utf-8
+
+"""
+MIT License
+
+Copyright (c) 2020 Nils DEYBACH & Léo OUDART
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+"""
+Optional kernels compiled with Numba (nopython mode, without the GIL) for the loops which do not vectorize: exact
+pair sums over all pairs and blocks of Metropolis steps. Numba is not required, jitAvailable is False when it is not
+installed and the callers keep their NumPy code. Compiled code is cached on disk (next to this file, or in the user
+cache directory of Numba if it is read only) so only the first launch pays the compilation.
+Functions only take arrays, positions and moments are contiguous (N,3) float64 arrays.
+"""
+from math import cos, sin, exp, sqrt
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+jitAvailable = numba is not None
+
+"""
+Decorator compiling a function with numba.njit(cache=True, nogil=True, **options), the function is returned as is
+without Numba (it is then never called, see jitAvailable).
+"""
+def _jit(**options):
+    if numba is None:
+        return lambda function: function
+    return numba.njit(cache=True, nogil=True, **options)
+
+prange = numba.prange if numba is not None else range
+
+######## PAIR SUMS #########
+
+"""
+Returns the (N,3) array of the sums over j!=i of m_j/r_ij^3 - 3r_ij(m_j.r_ij)/r_ij^5, one dipole per thread
+(see DipSimEnergy.pairFieldSum()).
+"""
+@_jit(parallel=True)
+def pairFieldSum(positions, moments):
+    nbDipoles = positions.shape[0]
+    fields = np.zeros((nbDipoles, 3))
+    for i in prange(nbDipoles):
+        fieldX, fieldY, fieldZ = 0.0, 0.0, 0.0
+        for j in range(nbDipoles):
+            if j == i:
+                continue
+            dx = positions[j, 0] - positions[i, 0]
+            dy = positions[j, 1] - positions[i, 1]
+            dz = positions[j, 2] - positions[i, 2]
+            normIJ2 = dx*dx + dy*dy + dz*dz
+            invNormIJ3 = 1.0/(normIJ2*sqrt(normIJ2))
+            weight = 3.0*invNormIJ3/normIJ2*(moments[j, 0]*dx + moments[j, 1]*dy + moments[j, 2]*dz)
+            fieldX += invNormIJ3*moments[j, 0] - weight*dx
+            fieldY += invNormIJ3*moments[j, 1] - weight*dy
+            fieldZ += invNormIJ3*moments[j, 2] - weight*dz
+        fields[i, 0], fields[i, 1], fields[i, 2] = fieldX, fieldY, fieldZ
+    return fields
+
+"""
+Returns the sum over all pairs i<j of (m_i.m_j)/r_ij^3 - 3(m_i.r_ij)(m_j.r_ij)/r_ij^5, the pairs of each dipole i
+in a thread (see DipSimEnergy.pairEnergySum()).
+"""
+@_jit(parallel=True)
+def pairEnergySum(positions, moments):
+    nbDipoles = positions.shape[0]
+    partialSums = np.zeros(nbDipoles)
+    for i in prange(nbDipoles):
+        total = 0.0
+        for j in range(i + 1, nbDipoles):
+            dx = positions[j, 0] - positions[i, 0]
+            dy = positions[j, 1] - positions[i, 1]
+            dz = positions[j, 2] - positions[i, 2]
+            normIJ2 = dx*dx + dy*dy + dz*dz
+            invNormIJ3 = 1.0/(normIJ2*sqrt(normIJ2))
+            mImJ = moments[i, 0]*moments[j, 0] + moments[i, 1]*moments[j, 1] + moments[i, 2]*moments[j, 2]
+            mIrIJ = moments[i, 0]*dx + moments[i, 1]*dy + moments[i, 2]*dz
+            mJrIJ = moments[j, 0]*dx + moments[j, 1]*dy + moments[j, 2]*dz
+            total += invNormIJ3*(mImJ - 3.0*mIrIJ*mJrIJ/normIJ2)
+        partialSums[i] = total
+    return partialSums.sum()
+
+######## METROPOLIS STEPS #########
+
+"""
+Trial move of one Metropolis step (see MonteCarloChain.MetropolisChain.run()): writes the moment change in "delta"
+and returns the energy change in J if the move is accepted, NaN if it is rejected.
+selfTensors: (N,3,3) self interaction of periodic kernels, or a (0,3,3) array if there is none
+"""
+@_jit()
+def _trialStep(index, newPhi, newTheta, r, moments, fields, intensities, selfTensors, energyCoef, kbT, delta):
+    intensity = intensities[index]
+    sinTheta = sin(newTheta)
+    delta[0] = cos(newPhi)*sinTheta*intensity - moments[index, 0]
+    delta[1] = sin(newPhi)*sinTheta*intensity - moments[index, 1]
+    delta[2] = cos(newTheta)*intensity - moments[index, 2]
+    deltaEnergy = (delta[0]*fields[index, 0] + delta[1]*fields[index, 1] + delta[2]*fields[index, 2])*energyCoef
+    if selfTensors.shape[0] > 0:
+        selfEnergy = 0.0
+        for k in range(3):
+            for l in range(3):
+                selfEnergy += delta[k]*selfTensors[index, k, l]*delta[l]
+        deltaEnergy += 0.5*selfEnergy*energyCoef
+    if deltaEnergy <= 0 or (kbT > 0 and r < exp(-deltaEnergy/kbT)):
+        return deltaEnergy
+    return np.nan
+
+"""
+Applies an accepted move of dipole "index" to the angles and moments.
+"""
+@_jit()
+def _acceptStep(index, newPhi, newTheta, phi, theta, moments, delta):
+    moments[index, 0] += delta[0]
+    moments[index, 1] += delta[1]
+    moments[index, 2] += delta[2]
+    phi[index] = newPhi
+    theta[index] = newTheta
+
+"""
+Runs the Metropolis steps of one block drawn beforehand ("indices", "newPhis", "newThetas", "randoms") and updates
+phi, theta, moments and fields in place. Returns [number of accepted moves, energy change in J].
+Local fields are updated from the dense (3N,3N) interaction matrix of DipSimEnergy.PairTensors.
+"""
+@_jit()
+def metropolisBlockMatrix(phi, theta, moments, fields, intensities, selfTensors, indices, newPhis, newThetas, randoms, energyCoef, kbT, matrix):
+    delta = np.zeros(3)
+    flatFields = fields.reshape(-1)
+    nbAccepted, energyChange = 0, 0.0
+    for step in range(indices.shape[0]):
+        index = indices[step]
+        deltaEnergy = _trialStep(index, newPhis[step], newThetas[step], randoms[step], moments, fields, intensities, selfTensors, energyCoef, kbT, delta)
+        if np.isnan(deltaEnergy):
+            continue
+        for k in range(3):
+            row = matrix[3*index + k] # matrix is symmetric
+            for column in range(flatFields.shape[0]):
+                flatFields[column] += delta[k]*row[column]
+        _acceptStep(index, newPhis[step], newThetas[step], phi, theta, moments, delta)
+        nbAccepted += 1
+        energyChange += deltaEnergy
+    return nbAccepted, energyChange
+
+"""
+Same as metropolisBlockMatrix(), local fields are updated from the positions (exact sum over all pairs, O(N) per
+accepted move, see DipSimEnergy.DirectPairs.pairFieldFrom()).
+"""
+@_jit()
+def metropolisBlockDirect(phi, theta, moments, fields, intensities, selfTensors, indices, newPhis, newThetas, randoms, energyCoef, kbT, positions):
+    delta = np.zeros(3)
+    nbAccepted, energyChange = 0, 0.0
+    for step in range(indices.shape[0]):
+        index = indices[step]
+        deltaEnergy = _trialStep(index, newPhis[step], newThetas[step], randoms[step], moments, fields, intensities, selfTensors, energyCoef, kbT, delta)
+        if np.isnan(deltaEnergy):
+            continue
+        for j in range(positions.shape[0]):
+            if j == index:
+                continue
+            dx = positions[j, 0] - positions[index, 0]
+            dy = positions[j, 1] - positions[index, 1]
+            dz = positions[j, 2] - positions[index, 2]
+            normIJ2 = dx*dx + dy*dy + dz*dz
+            invNormIJ3 = 1.0/(normIJ2*sqrt(normIJ2))
+            weight = 3.0*invNormIJ3/normIJ2*(delta[0]*dx + delta[1]*dy + delta[2]*dz)
+            fields[j, 0] += invNormIJ3*delta[0] - weight*dx
+            fields[j, 1] += invNormIJ3*delta[1] - weight*dy
+            fields[j, 2] += invNormIJ3*delta[2] - weight*dz
+        _acceptStep(index, newPhis[step], newThetas[step], phi, theta, moments, delta)
+        nbAccepted += 1
+        energyChange += deltaEnergy
+    return nbAccepted, energyChange
+
+"""
+Same as metropolisBlockMatrix(), local fields of the neighbours are updated from the pair lists of
+DipSimEnergy.TruncatedPairs (neighbours of i are target[indptr[i]:indptr[i+1]]).
+"""
+@_jit()
+def metropolisBlockNeighbours(phi, theta, moments, fields, intensities, selfTensors, indices, newPhis, newThetas, randoms, energyCoef, kbT, indptr, target, vectIJ, coefI, coefR):
+    delta = np.zeros(3)
+    nbAccepted, energyChange = 0, 0.0
+    for step in range(indices.shape[0]):
+        index = indices[step]
+        deltaEnergy = _trialStep(index, newPhis[step], newThetas[step], randoms[step], moments, fields, intensities, selfTensors, energyCoef, kbT, delta)
+        if np.isnan(deltaEnergy):
+            continue
+        for pair in range(indptr[index], indptr[index + 1]):
+            j = target[pair]
+            weight = coefR[pair]*(delta[0]*vectIJ[pair, 0] + delta[1]*vectIJ[pair, 1] + delta[2]*vectIJ[pair, 2])
+            fields[j, 0] += coefI[pair]*delta[0] - weight*vectIJ[pair, 0]
+            fields[j, 1] += coefI[pair]*delta[1] - weight*vectIJ[pair, 1]
+            fields[j, 2] += coefI[pair]*delta[2] - weight*vectIJ[pair, 2]
+        _acceptStep(index, newPhis[step], newThetas[step], phi, theta, moments, delta)
+        nbAccepted += 1
+        energyChange += deltaEnergy
+    return nbAccepted, energyChange
@@ -0,0 +1,172 @@
+# This Python file uses the following encoding: utf-8
+
+"""
+MIT License
+
+Copyright (c) 2020 Nils DEYBACH & Léo OUDART
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+"""
+Parameter sweeps without Qt: a grid and/or a list of parameter sets applied on a base job (see DipSimBatch), run
+in a pool of processes. Each completed point is appended to a checkpoint file so an interrupted sweep resumes with
+the remaining points only, all results are collected in one table (sweep_results.csv) with the parameters of each
+point, its energies and the file of its final configuration.
+
+A sweep config is a batch config (see DipSimBatch) with a [sweep] table, ex:
+
+    [defaults]
+    is2D = false
+    method = "MC"
+
+    [sweep]
+    nbWorkers = 4
+
+    [sweep.grid]
+    primCellA = [150, 200, 250]
+    temperatureMC = [1, 4, 10]
+    crystalFamily = ["P", "I", "F"]
+"""
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .DipSimBatch import jobsFromConfig, runJob, writeResultsTable, readConfigFile
+
+checkpointFileName = "sweep_checkpoint.jsonl"
+resultsFileName = "sweep_results.csv"
+
+"""
+Returns the list of parameter sets (dict) of a sweep: each point of "points" (list of dict, one empty point if None)
+combined with each point of the cartesian product of "grid" (dict of parameter name: list of values).
+"""
+def sweepPoints(grid=None, points=None):
+    grid = grid or {}
+    names = list(grid)
+    gridPoints = [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+    return [dict(point, **gridPoint) for point in (points or [{}]) for gridPoint in gridPoints]
+
+"""
+Returns the jobs of a sweep config (dict with "defaults" and "sweep"), named point_<hash of the swept parameters>
+unless the point has a name, and the parameters swept by each job (list of dict). Names do not depend on the order
+of the points, so output files of a point are the same when other points are added or moved.
+"""
+def sweepJobs(config):
+    sweep = config.get("sweep", {})
+    parameterSets = sweepPoints(sweep.get("grid"), sweep.get("points"))
+    jobs = jobsFromConfig({"defaults": config.get("defaults", {}), "jobs": [dict(parameters, name=parameters.get("name", "point_" + parametersHash(parameters)[:12])) for parameters in parameterSets]})
+    return jobs, parameterSets
+
+"""
+Returns the hash (hexadecimal str) of "parameters" (dict), independent of the order of the keys.
+"""
+def parametersHash(parameters):
+    return hashlib.sha1(json.dumps(parameters, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+"""
+Returns the key of "job" in the checkpoint: hash of all its parameters but its name, a point changed since the
+checkpoint is run again, points added, removed or moved in the sweep do not change the key of the others.
+"""
+def jobKey(job):
+    return parametersHash({name: value for name, value in job.items() if name != "name"})
+
+"""
+Returns the rows of the points already completed (dict of job key: row) from the checkpoint of outputDirectory.
+A truncated last line (interrupted write) is ignored.
+"""
+def readCheckpoint(outputDirectory):
+    completed = {}
+    filePath = os.path.join(outputDirectory, checkpointFileName)
+    if os.path.exists(filePath):
+        with open(filePath, "r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                completed[entry["key"]] = entry["row"]
+    return completed
+
+"""
+Ends the checkpoint of outputDirectory with a new line if its last write was interrupted, so the next points are
+not appended to the truncated line.
+"""
+def terminateCheckpoint(outputDirectory):
+    filePath = os.path.join(outputDirectory, checkpointFileName)
+    if os.path.exists(filePath) and os.path.getsize(filePath) > 0:
+        with open(filePath, "rb+") as file:
+            file.seek(-1, os.SEEK_END)
+            if file.read(1) != b"\n":
+                file.write(b"\n")
+
+"""
+Runs the jobs of a sweep in a pool of nbWorkers processes (all cores if None) and writes the results table in
+outputDirectory. Points already in the checkpoint of outputDirectory are not run again (resume), failed points are
+run again on the next resume. Returns the rows of the table, in the order of the jobs.
+jobs: list of jobs (see DipSimBatch.jobsFromConfig())
+parameterSets: parameters swept by each job (list of dict), first columns of the table
+"""
+def runSweep(jobs, parameterSets, outputDirectory, nbWorkers=None, verbose=True):
+    os.makedirs(outputDirectory, exist_ok=True)
+    keys = [jobKey(job) for job in jobs]
+    completed = readCheckpoint(outputDirectory)
+    rows = {key: completed[key] for key in keys if key in completed}
+    pending = [index for index, key in enumerate(keys) if key not in rows]
+    if verbose:
+        print(str(len(jobs) - len(pending)) + " points already completed, " + str(len(pending)) + " to run", flush=True)
+    if pending:
+        terminateCheckpoint(outputDirectory)
+        nbWorkers = max(1, min(nbWorkers or os.cpu_count() or 1, len(pending)))
+        # "spawn" start method: same as the Monte-Carlo pools, forking a process running Qt threads is unsafe
+        with ProcessPoolExecutor(max_workers=nbWorkers, mp_context=multiprocessing.get_context("spawn")) as executor, \
+                open(os.path.join(outputDirectory, checkpointFileName), "a", encoding="utf-8") as checkpoint:
+            futures = {executor.submit(runJob, jobs[index], outputDirectory): index for index in pending}
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    row = future.result()
+                except Exception as error:
+                    row = {"name": jobs[index]["name"], "method": jobs[index]["method"], "error": repr(error)}
+                if "error" not in row: # checkpointed as soon as completed
+                    checkpoint.write(json.dumps({"key": keys[index], "row": row}) + "\n")
+                    checkpoint.flush()
+                    os.fsync(checkpoint.fileno())
+                rows[keys[index]] = row
+                if verbose:
+                    print(", ".join(key + ": " + str(value) for key, value in row.items()), flush=True)
+    table = []
+    for job, parameters, key in zip(jobs, parameterSets, keys):
+        row = dict(parameters, **rows[key])
+        if "error" not in row:
+            row["finalConfiguration"] = job["name"] + "_final." + job["outputFormat"]
+        table.append(row)
+    writeResultsTable(table, os.path.join(outputDirectory, resultsFileName))
+    return table
+
+"""
+Runs the sweep of the config file "filePath" (see module documentation), nbWorkers overrides the one of the config.
+"""
+def runSweepConfig(filePath, outputDirectory, nbWorkers=None, verbose=True):
+    config = readConfigFile(filePath)
+    jobs, parameterSets = sweepJobs(config)
+    return runSweep(jobs, parameterSets, outputDirectory, nbWorkers or config.get("sweep", {}).get("nbWorkers"), verbose)
@@ -29,9 +29,14 @@ It serves as a containers for various utility functions. They can be useful in a
 """
 from math import cos, sin, radians, degrees, acos, atan2, pi
 
+import numpy as np
+
 from PySide2.QtCore import QRandomGenerator
 from PySide2.QtGui import QVector3D, QColor, QQuaternion
 
+from .DipSimEnergy import MU_B, anglesToMoments
+from .DipoleStore import DipoleStore
+
 ######## NUMBER GENERATION #########
 
 """
@@ -62,23 +67,117 @@ a (1,0,0) oriention initialy.
 phi, theta: angles in physics convention in degrees.
 """
 def anglesSphToQuaternion(phi, theta):
-    x = sin(radians(theta))*cos(radians(phi))
-    y = sin(radians(theta))*sin(radians(phi))
-    z = cos(radians(theta))
-    fromVec = QVector3D(1, 0, 0)
-    toVec = QVector3D(x, y, z)
-    return QQuaternion.rotationTo(fromVec, toVec)
+    return QQuaternion(*anglesToQuaternions(radians(phi), radians(theta))[0].tolist())
 
 """
 Returns orientation (following physics convention) to a quaternion representing the rotation
 needed to get a vector to follow the orientation
 """
 def anglesQuaternionToSph(quaternion):
-    fromVect = QVector3D(1, 0, 0)
-    toVect = quaternion.rotatedVector(fromVect)
-    phi = atan2(toVect.y(), toVect.x())
-    theta = acos(toVect.z()/toVect.length())
-    return [phi, theta]
+    return quaternionsToAngles(quaternionToArray(quaternion))[0].tolist()
+
+"""
+Returns the components [scalar, x, y, z] of a QQuaternion as an array (4,), see quaternionsToAngles().
+"""
+def quaternionToArray(quaternion):
+    return np.array((quaternion.scalar(), quaternion.x(), quaternion.y(), quaternion.z()), dtype=np.float64)
+
+######## BATCH ANGLES CONVERTIONS #########
+"""
+Numpy versions of the conversions above for many orientations in one call:
+angles: phi (N,) and theta (N,) in radians (physics convention), or (N,2) [phi, theta] when returned
+quaternions: (N,4) [scalar, x, y, z] (QQuaternion order), rotations bringing (1,0,0) on the orientation
+vectors: (N,3) unit vectors of the orientation
+"""
+
+"""
+Returns the unit vectors (N,3) of orientations "phi", "theta" (N,) in radians.
+"""
+def anglesToVectors(phi, theta):
+    return anglesToMoments(np.atleast_1d(phi), np.atleast_1d(theta))
+
+"""
+Returns the orientations (N,2) [phi, theta] in radians of "vectors" (N,3), which do not need to be normalized.
+"""
+def vectorsToAngles(vectors):
+    vectors = np.asarray(vectors, dtype=np.float64).reshape(-1, 3)
+    lengths = np.linalg.norm(vectors, axis=-1)
+    cosTheta = np.divide(vectors[:, 2], lengths, out=np.ones_like(lengths), where=lengths > 0)
+    return np.stack((np.arctan2(vectors[:, 1], vectors[:, 0]), np.arccos(np.clip(cosTheta, -1, 1))), axis=-1)
+
+"""
+Returns the quaternions (N,4) of the shortest rotations bringing (1,0,0) on "vectors" (N,3), as QQuaternion.rotationTo().
+Opposite vectors get the half turn around (0,0,-1) chosen by Qt.
+"""
+def vectorsToQuaternions(vectors):
+    vectors = np.asarray(vectors, dtype=np.float64).reshape(-1, 3)
+    lengths = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    vectors = np.divide(vectors, lengths, out=np.tile((1.0, 0.0, 0.0), (len(vectors), 1)), where=lengths > 0)
+    # rotation of axis (1,0,0)x(v) by the angle between (1,0,0) and v, from the half angle: [1 + (1,0,0).v, (1,0,0)x(v)]
+    quaternions = np.stack((1 + vectors[:, 0], np.zeros(len(vectors)), -vectors[:, 2], vectors[:, 1]), axis=-1)
+    opposite = quaternions[:, 0] < 1e-12
+    quaternions[opposite] = (0.0, 0.0, 0.0, -1.0)
+    return quaternions/np.linalg.norm(quaternions, axis=-1, keepdims=True)
+
+"""
+Returns the unit vectors (N,3) obtained by rotating (1,0,0) with "quaternions" (N,4), which are normalized first.
+"""
+def quaternionsToVectors(quaternions):
+    quaternions = np.asarray(quaternions, dtype=np.float64).reshape(-1, 4)
+    norms = np.linalg.norm(quaternions, axis=-1, keepdims=True)
+    w, x, y, z = np.divide(quaternions, norms, out=np.tile((1.0, 0.0, 0.0, 0.0), (len(quaternions), 1)), where=norms > 0).T
+    return np.stack((1 - 2*(y*y + z*z), 2*(x*y + w*z), 2*(x*z - w*y)), axis=-1)
+
+"""
+Returns the quaternions (N,4) of orientations "phi", "theta" (N,) in radians.
+"""
+def anglesToQuaternions(phi, theta):
+    return vectorsToQuaternions(anglesToVectors(phi, theta))
+
+"""
+Returns the orientations (N,2) [phi, theta] in radians of "quaternions" (N,4).
+"""
+def quaternionsToAngles(quaternions):
+    return vectorsToAngles(quaternionsToVectors(quaternions))
+
+######## ARRAYS CONVERTIONS #########
+
+"""
+Returns the positions (N,3), spherical angles (N,2) [phi, theta] in radians and moment intensities (N,) in bohr magneton
+arrays of a list of dipoles.
+dipoles: list of dipoles (DipModel)
+unitCoef: coefficient applied to positions, ex: 10**-9 for nanometers
+"""
+def dipolesToAngles(dipoles, unitCoef=1.0):
+    positions = np.empty((len(dipoles), 3), dtype=np.float64)
+    quaternions = np.empty((len(dipoles), 4), dtype=np.float64)
+    intensities = np.empty(len(dipoles), dtype=np.float64)
+    for index, dip in enumerate(dipoles):
+        positions[index] = (dip.position.x(), dip.position.y(), dip.position.z())
+        quaternions[index] = (dip.quaternion.scalar(), dip.quaternion.x(), dip.quaternion.y(), dip.quaternion.z())
+        intensities[index] = dip.moment
+    return positions*unitCoef, quaternionsToAngles(quaternions), intensities
+
+"""
+Returns the positions (N,3) and moments (N,3) arrays in J/T of a list of dipoles, ready for the energy kernel.
+dipoles: list of dipoles (DipModel)
+unitCoef: coefficient applied to positions, ex: 10**-9 for nanometers
+"""
+def dipolesToArrays(dipoles, unitCoef=1.0):
+    positions, angles, intensities = dipolesToAngles(dipoles, unitCoef)
+    return positions, anglesToMoments(angles[:, 0], angles[:, 1], intensities*MU_B)
+
+"""
+Returns a DipoleStore of a list of dipoles (Dipole objects). Colors imposed on dipoles are kept.
+dipoles: list of dipoles
+"""
+def dipolesToStore(dipoles):
+    positions, angles, intensities = dipolesToAngles(dipoles)
+    colors = np.full((len(dipoles), 4), np.nan)
+    for index, dip in enumerate(dipoles):
+        if not dip.colorCorrespondToAngle:
+            colors[index] = dip.color.getRgbF()
+    return DipoleStore(positions, angles, intensities, colors)
 
 ######## COLORS #########
 
@@ -91,7 +190,18 @@ Returns a color from a 3D vector of angles.
 phi, theta: angles in physics convention in radians.
 """
 def angleSphToColor(phi, theta):
-    return QColor.fromHsl(degrees(phi)%360, 255, (degrees(pi - theta)%181)*255/180)
+    return QColor.fromRgbF(*anglesToColors(phi, theta)[0].tolist())
+
+"""
+Returns the RGB colors (N,3) in [0,1] of orientations "phi", "theta" (N,) in radians: hue from phi and lightness
+from theta (white up, black down) at full saturation, the HSL conversion of QColor.fromHsl() done for all dipoles at once.
+"""
+def anglesToColors(phi, theta):
+    hue = np.degrees(np.atleast_1d(np.asarray(phi, dtype=np.float64)))%360
+    lightness = np.minimum((np.degrees(np.pi - np.atleast_1d(np.asarray(theta, dtype=np.float64)))%181)/180, 1.0)
+    chroma = np.minimum(lightness, 1 - lightness)
+    channels = (np.array((0.0, 8.0, 4.0)) + hue[:, None]/30)%12
+    return lightness[:, None] - chroma[:, None]*np.clip(np.minimum(channels - 3, 9 - channels), -1, 1)
 
 """
 Returns a random color.
@@ -0,0 +1,233 @@
+# This Python file uses the following encoding: utf-8
+
+"""
+MIT License
+
+Copyright (c) 2020 Nils DEYBACH & Léo OUDART
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+"""
+Compact storage of dipoles as a structure of arrays, without Qt. DipModel is a view on a DipoleStore and solvers
+work on snapshots of it.
+"""
+import json
+import os
+import struct
+import zipfile
+
+import numpy as np
+
+from .DipSimEnergy import MU_B, anglesToMoments
+
+"""
+Returns a read only array of "values" (arrays of a store are never modified in place, see DipoleStore).
+"""
+def _frozen(values, dtype=np.float64):
+    values = np.array(values, dtype=dtype)
+    values.setflags(write=False)
+    return values
+
+"""
+Returns "angles" (N,2) [phi, theta] in radians brought back to phi in ]-pi,pi] and theta in [0,pi] with the same
+orientations (solvers may return any angle).
+"""
+def normalizedAngles(angles):
+    angles = np.asarray(angles, dtype=np.float64).reshape(-1, 2)
+    directions = anglesToMoments(angles[:, 0], angles[:, 1])
+    return np.stack((np.arctan2(directions[:, 1], directions[:, 0]), np.arccos(np.clip(directions[:, 2], -1, 1))), axis=-1)
+
+"""
+Dipoles stored as arrays:
+positions: (N,3) positions in distance units
+angles: (N,2) orientations [phi, theta] in radians (physics convention)
+intensities: (N,) moment intensities in bohr magneton
+colors: (N,4) RGBA colors in [0,1], rows of NaN are colored from the orientation
+
+Arrays are read only and replaced on every change, so snapshot() is O(1): the snapshot shares the arrays
+of the store at the time it was taken (copy on write).
+"""
+class DipoleStore:
+    defaultIntensity = 50.0 # bohr magneton, same default as Dipole
+
+    def __init__(self, positions=None, angles=None, intensities=None, colors=None):
+        self.positions = _frozen(np.zeros((0, 3)) if positions is None else positions).reshape(-1, 3)
+        nbDipoles = len(self.positions)
+        self.angles = _frozen(np.zeros((nbDipoles, 2)) if angles is None else angles).reshape(-1, 2)
+        self.intensities = _frozen(np.broadcast_to(self.defaultIntensity if intensities is None else intensities, (nbDipoles,)))
+        self.colors = _frozen(np.broadcast_to(np.nan if colors is None else colors, (nbDipoles, 4)))
+        if len(self.angles) != nbDipoles:
+            raise ValueError("positions and angles must have the same number of dipoles")
+
+    def __len__(self):
+        return len(self.positions)
+
+    """
+    Returns a store on already frozen arrays, without copy.
+    """
+    @classmethod
+    def _fromArrays(cls, positions, angles, intensities, colors):
+        store = cls.__new__(cls)
+        store.positions, store.angles, store.intensities, store.colors = positions, angles, intensities, colors
+        return store
+
+    """
+    Returns a store sharing the arrays of this one, later changes of this store are not seen by the snapshot.
+    """
+    def snapshot(self):
+        return DipoleStore._fromArrays(self.positions, self.angles, self.intensities, self.colors)
+
+    """
+    Returns a snapshot with new orientations "angles" (N,2) [phi, theta] in radians, the other arrays are shared.
+    """
+    def withAngles(self, angles):
+        angles = _frozen(normalizedAngles(angles))
+        if len(angles) != len(self):
+            raise ValueError("angles must have one row per dipole")
+        return DipoleStore._fromArrays(self.positions, angles, self.intensities, self.colors)
+
+    """
+    Sets the orientations of dipoles "indices" (all if None) to "angles" [phi, theta] in radians.
+    """
+    def setAngles(self, angles, indices=None):
+        newAngles = np.array(self.angles)
+        newAngles[slice(None) if indices is None else indices] = angles
+        self.angles = _frozen(newAngles)
+
+    """
+    Sets the positions of dipoles "indices" (all if None) to "positions".
+    """
+    def setPositions(self, positions, indices=None):
+        newPositions = np.array(self.positions)
+        newPositions[slice(None) if indices is None else indices] = positions
+        self.positions = _frozen(newPositions)
+
+    """
+    Sets the colors of dipoles "indices" (all if None) to "colors" RGBA in [0,1], NaN to color from the orientation.
+    """
+    def setColors(self, colors, indices=None):
+        newColors = np.array(self.colors)
+        newColors[slice(None) if indices is None else indices] = colors
+        self.colors = _frozen(newColors)
+
+    """
+    Appends the dipoles of "other" (DipoleStore) at the end of this store.
+    """
+    def extend(self, other):
+        self.positions = _frozen(np.concatenate((self.positions, other.positions)))
+        self.angles = _frozen(np.concatenate((self.angles, other.angles)))
+        self.intensities = _frozen(np.concatenate((self.intensities, other.intensities)))
+        self.colors = _frozen(np.concatenate((self.colors, other.colors)))
+
+    """
+    Returns the (N,3) moments in J/T, ready for the energy kernel.
+    """
+    def moments(self):
+        return anglesToMoments(self.angles[:, 0], self.angles[:, 1], self.intensities*MU_B)
+
+    """
+    Returns a store of dipoles at "positions" (N,3) with random orientations (phi in [0,2pi[, theta in [0,pi]
+    or pi/2 if is2D), drawn from "rng" (numpy Generator).
+    """
+    @classmethod
+    def withRandomAngles(cls, positions, is2D=False, rng=None, intensities=None):
+        rng = np.random.default_rng() if rng is None else rng
+        nbDipoles = len(positions)
+        phi = rng.random(nbDipoles)*2*np.pi
+        theta = np.full(nbDipoles, np.pi/2) if is2D else rng.random(nbDipoles)*np.pi
+        return cls(positions, np.stack((phi, theta), axis=-1), intensities)
+
+######## BINARY FILES #########
+
+dipolesFileFormat = "dipsim-dipoles"
+dipolesFileVersion = 1
+
+"""
+Writes "dipoles" (DipoleStore) in a binary .npz file (uncompressed numpy archive, readable with numpy.load()):
+positions (N,3) float64 in distance units
+angles (N,2) float64 [phi, theta] in radians
+intensities (N,) float64 in bohr magneton
+colors (N,4) float64 RGBA in [0,1], NaN rows are colored from the orientation
+header () str, JSON object: format, version, nbDipoles and the entries of "metadata" (dict, ex: distCoef,
+lattice parameters, solver parameters)
+The file is written next to "filePath" then moved over it, a crash never leaves a truncated file.
+"""
+def saveDipoles(dipoles, filePath, metadata=None):
+    header = dict(metadata or {})
+    header.update({"format": dipolesFileFormat, "version": dipolesFileVersion, "nbDipoles": len(dipoles)})
+    temporaryPath = filePath + ".tmp"
+    with open(temporaryPath, "wb") as file:
+        np.savez(file, header=np.array(json.dumps(header)), positions=np.ascontiguousarray(dipoles.positions, dtype=np.float64),
+                 angles=np.ascontiguousarray(dipoles.angles, dtype=np.float64), intensities=np.ascontiguousarray(dipoles.intensities, dtype=np.float64),
+                 colors=np.ascontiguousarray(dipoles.colors, dtype=np.float64))
+    os.replace(temporaryPath, filePath)
+
+"""
+Returns a read only memory map of the array "name" of the .npz archive (zipfile.ZipFile) at "filePath", or None if
+the member is compressed or empty (it must then be read with numpy.load()).
+"""
+def _memoryMappedMember(filePath, archive, name):
+    info = archive.getinfo(name + ".npy")
+    if info.compress_type != zipfile.ZIP_STORED:
+        return None
+    with open(filePath, "rb") as file:
+        file.seek(info.header_offset)
+        localHeader = file.read(30) # zip local file header, followed by the file name and the extra field
+        nameLength, extraLength = struct.unpack("<HH", localHeader[26:30])
+        file.seek(info.header_offset + 30 + nameLength + extraLength)
+        version = np.lib.format.read_magic(file)
+        if version == (1, 0):
+            shape, fortranOrder, dtype = np.lib.format.read_array_header_1_0(file)
+        else:
+            shape, fortranOrder, dtype = np.lib.format.read_array_header_2_0(file)
+        offset = file.tell()
+    if dtype.hasobject or int(np.prod(shape)) == 0:
+        return None
+    return np.memmap(filePath, dtype=dtype, mode="r", offset=offset, shape=shape, order="F" if fortranOrder else "C")
+
+"""
+Reads a .npz file written by saveDipoles() and returns [dipoles (DipoleStore), metadata (dict, the JSON header)].
+mmap: the arrays of the store are memory maps of the file instead of copies in memory (only for uncompressed
+archives, the file must then not be overwritten while the store is used).
+"""
+def loadDipoles(filePath, mmap=True):
+    with zipfile.ZipFile(filePath) as archive:
+        members = {os.path.splitext(name)[0] for name in archive.namelist()}
+        with np.load(filePath, allow_pickle=False) as arrays:
+            metadata = json.loads(str(arrays["header"][()])) if "header" in members else {}
+            if metadata.get("format", dipolesFileFormat) != dipolesFileFormat:
+                raise ValueError("\"" + filePath + "\" is not a dipoles file")
+            columns = {}
+            for name in ("positions", "angles", "intensities", "colors"):
+                if name not in members:
+                    continue
+                values = _memoryMappedMember(filePath, archive, name) if mmap else None
+                if values is None or values.dtype != np.float64:
+                    values = _frozen(arrays[name] if values is None else values)
+                columns[name] = values
+    if "positions" not in columns or "angles" not in columns:
+        raise ValueError("\"" + filePath + "\" has no positions or angles")
+    nbDipoles = len(columns["positions"])
+    positions, angles = columns["positions"].reshape(-1, 3), columns["angles"].reshape(-1, 2)
+    intensities = columns.get("intensities", _frozen(np.full(nbDipoles, DipoleStore.defaultIntensity)))
+    colors = columns.get("colors", _frozen(np.full((nbDipoles, 4), np.nan)))
+    if len(angles) != nbDipoles or intensities.shape != (nbDipoles,) or colors.shape != (nbDipoles, 4):
+        raise ValueError("\"" + filePath + "\" arrays do not have one row per dipole")
+    return [DipoleStore._fromArrays(positions, angles, intensities, colors), metadata]
@@ -0,0 +1,398 @@
+# This Python file uses the following encoding: utf-8
+
+"""
+MIT License
+
+Copyright (c) 2020 Nils DEYBACH & Léo OUDART
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+"""
+Generation of dipoles positions without Qt: Bravais lattices sites, in one array or streamed in fixed size chunks for
+systems too large to be held in memory, consumers of these chunks (export, energy, statistics), and random positions
+with a minimum separation.
+"""
+import os
+from math import cos, sin, radians, sqrt, pi
+
+import numpy as np
+
+from .DipSimEnergy import MU_B, raggedRanges, crossPairEnergySum, mu_0
+from .DipoleStore import DipoleStore, normalizedAngles
+
+"""
+Returns the parameters (a, b, c, alpha, beta, gamma) and the (M,3) translations (fractional coordinates, corners
+included) of a Bravais cell of type crystalType and family crystalFamily, same cells as PrimCell.generatePrimCell().
+Parameters given (not None) are kept unless the type imposes them, the others take the default of the type.
+crystalType: 2D: mono, ortho, tetra, hex ; 3D: tri, mono, ortho, tetra, hex_rhomb, hex_hex, cub
+crystalFamily: P, A, B, C (3D), F (3D) or I
+"""
+def bravaisCell(crystalType, crystalFamily="P", is2D=False, a=None, b=None, c=None, alpha=None, beta=None, gamma=None):
+    if is2D:
+        c, alpha, beta = 0, 0, 0
+        if crystalType == "mono":
+            gamma = 15 if gamma is None else gamma
+            a = 150 if a is None else a
+            b = 200 if b is None else b
+        elif crystalType == "ortho":
+            gamma = 90
+            a = 300 if a is None else a
+            b = 200 if b is None else b
+        elif crystalType == "tetra":
+            a = 200 if a is None else a
+            b, gamma = a, 90
+        elif crystalType == "hex":
+            gamma = 120
+            a = 300 if a is None else a
+            b = a
+        translations = [(0, 0, 0), (1, 0, 0), (0, 1, 0), (1, 1, 0)]
+        centerings = {"A": [(0.5, 0, 0), (0.5, 1, 0)], "B": [(0, 0.5, 0), (1, 0.5, 0)], "I": [(0.5, 0.5, 0)]}
+    else:
+        defaults = {"tri": (200, 200, 300, 70., 70., 60.), "mono": (200, 200, 300, 90., 70., 90.), "ortho": (200, 250, 300, 90., 90., 90.),
+                    "tetra": (200, None, 300, 90., 90., 90.), "hex_rhomb": (200, None, None, None, None, 60.), "hex_hex": (200, None, 300, 90., 90., 120.),
+                    "cub": (200, None, None, 90., 90., 90.)}
+        if crystalType in defaults:
+            aDefault, bDefault, cDefault, alphaDefault, betaDefault, gammaDefault = defaults[crystalType]
+            a = aDefault if a is None else a
+            b = bDefault if b is None else b
+            c = cDefault if c is None else c
+            gamma = gammaDefault if gamma is None or crystalType not in ("tri", "hex_rhomb") else gamma # imposed by the type
+            alpha = alphaDefault if alpha is None or crystalType != "tri" else alpha
+            beta = betaDefault if beta is None or crystalType not in ("tri", "mono") else beta
+            if crystalType == "hex_rhomb":
+                alpha, beta = gamma, gamma
+            if crystalType in ("tetra", "hex_rhomb", "hex_hex", "cub"):
+                b = a
+                if crystalType in ("hex_rhomb", "cub"):
+                    c = a
+        translations = [(0, 0, 0), (1, 0, 0), (0, 1, 0), (1, 1, 0), (0, 0, 1), (1, 0, 1), (0, 1, 1), (1, 1, 1)]
+        centerings = {"A": [(0, 0.5, 0.5), (1, 0.5, 0.5)], "B": [(0.5, 0, 0.5), (0.5, 1, 0.5)], "C": [(0.5, 0.5, 0), (0.5, 0.5, 1)],
+                      "F": [(0, 0.5, 0.5), (1, 0.5, 0.5), (0.5, 0, 0.5), (0.5, 1, 0.5), (0.5, 0.5, 0), (0.5, 0.5, 1)], "I": [(0.5, 0.5, 0.5)]}
+    translations = translations + centerings.get(crystalFamily, [])
+    return (a, b, c, alpha, beta, gamma), np.array(translations, dtype=np.float64)
+
+"""
+Returns the basis of a cell: translations (M,3) that belong to the cell only, points on the outer planes/lines (a
+coordinate equal to 1) belong to the neighbour cells.
+"""
+def basisTranslations(translations):
+    translations = np.asarray(translations, dtype=np.float64).reshape(-1, 3)
+    return translations[np.all(translations != 1, axis=1)]
+
+"""
+Returns the (3,3) array of the cell vectors a, b, c (rows) of a primitive cell, c is zero for a 2D cell.
+a, b, c: lengths of the cell
+alpha, beta, gamma: angles of the cell in degrees
+"""
+def latticeVectors(a, b, c, alpha, beta, gamma, is2D=False):
+    vectors = np.zeros((3, 3), dtype=np.float64)
+    vectors[0] = (a, 0, 0)
+    vectors[1] = (b*cos(radians(gamma)), b*sin(radians(gamma)), 0)
+    if not is2D:
+        cxProjCoef = cos(radians(beta))
+        cyProjCoef = (cos(radians(alpha)) - cos(radians(beta))*cos(radians(gamma)))/sin(radians(gamma))
+        vectors[2] = np.array((cxProjCoef, cyProjCoef, sqrt(1 - cxProjCoef**2 - cyProjCoef**2)))*abs(c)
+    return vectors
+
+"""
+Returns the bounds (low, high) of the fractional coordinate u_axis of the points of the generation volume, for each
+row of fixed fractional coordinates "fixed" (rows, axis) of the previous axes.
+Exact for the last axis (interval of the line along the last lattice vector) and for a sphere, bounds of the
+square volume on the first axes are the projection of the whole cube.
+lattice: (dims,dims) lattice vectors (rows)
+reciprocal: (dims,dims) reciprocal vectors (rows), u_i = p.g_i
+size: radius of the sphere ("round") or half edge of the cube ("square")
+"""
+def axisBounds(lattice, reciprocal, fixed, axis, size, genType):
+    if axis == len(lattice) - 1: # points q + u*c on a line
+        q = fixed @ lattice[:axis]
+        c = lattice[axis]
+        if genType == "round":
+            qc, cc = q @ c, c @ c
+            discriminant = qc**2 - cc*(np.einsum('ij,ij->i', q, q) - size**2)
+            root = np.sqrt(np.maximum(discriminant, 0))
+            empty = discriminant < 0
+            low, high = (-qc - root)/cc, (-qc + root)/cc
+        else:
+            low, high = np.full(len(q), -np.inf), np.full(len(q), np.inf)
+            empty = np.zeros(len(q), dtype=bool)
+            for k in range(len(c)):
+                if c[k] == 0:
+                    empty |= np.abs(q[:, k]) > size
+                else:
+                    bounds = np.sort(np.stack(((-size - q[:, k])/c[k], (size - q[:, k])/c[k])), axis=0)
+                    low, high = np.maximum(low, bounds[0]), np.minimum(high, bounds[1])
+        return np.where(empty, 1.0, low), np.where(empty, 0.0, high)
+    g = reciprocal[axis]
+    if genType != "round":
+        extent = size*np.sum(np.abs(g))
+        return np.full(len(fixed), -extent), np.full(len(fixed), extent)
+    if axis == 0:
+        extent = size*np.linalg.norm(g)
+        return np.full(len(fixed), -extent), np.full(len(fixed), extent)
+    previous = reciprocal[0] # axis 1 of a 3D cell: disk of the sphere in the plane u_0 = fixed
+    t = fixed[:, 0]
+    center = t*(previous @ g)/(previous @ previous)
+    radius2 = size**2 - t**2/(previous @ previous)
+    extent = np.sqrt(np.maximum(radius2, 0))*np.sqrt(max(g @ g - (previous @ g)**2/(previous @ previous), 0))
+    return np.where(radius2 < 0, 1.0, center - extent), np.where(radius2 < 0, 0.0, center + extent)
+
+"""
+Sites of a lattice inside a generation volume around the origin: sphere of radius maxDist ("round") or cube of half
+edge maxDist ("square"). Iterating yields (n,3) position blocks of exactly chunkSize sites (the last one may be
+smaller), only the index rows of the lattice (O(N^2/3)) and one chunk are held in memory.
+For each translation of the cell, index ranges are computed row by row from the reciprocal lattice: range of ia,
+then of ib for each ia, then the exact interval of ic for each (ia, ib), so only cells intersecting the volume are
+visited. Sites are ordered by translation, then ia, ib, ic.
+nbCandidates and nbKept count the sites generated and kept inside the volume by the last complete iteration.
+
+vectors: (3,3) lattice vectors (rows), c is zero for a 2D lattice (see latticeVectors())
+basis: (M,3) translations of the cell in fractional coordinates
+maxDist: size of the generation (float)
+genType: round or square (str)
+chunkSize: number of sites of each chunk (int)
+"""
+class LatticeStream:
+    def __init__(self, vectors, basis, maxDist, genType="round", chunkSize=2**20):
+        self.vectors = np.asarray(vectors, dtype=np.float64)
+        self.is2D = not np.any(self.vectors[2])
+        self.basis = np.asarray(basis, dtype=np.float64).reshape(-1, 3)
+        self.maxDist = maxDist
+        self.genType = genType
+        self.chunkSize = max(1, int(chunkSize))
+        self.nbCandidates = 0
+        self.nbKept = 0
+
+    """
+    Returns an estimate of the number of sites, from the volume of generation and of the cell.
+    """
+    def estimatedCount(self):
+        dims = 2 if self.is2D else 3
+        cellVolume = abs(np.linalg.det(self.vectors[:dims, :dims]))
+        volume = ((pi if dims == 2 else 4*pi/3)*abs(self.maxDist)**dims) if self.genType == "round" else (2*abs(self.maxDist))**dims
+        return int(volume/cellVolume*len(self.basis))
+
+    """
+    Yields for each translation of the cell the (rows, dims - 1) indices of the rows and their (start, count) along the last axis.
+    """
+    def _rows(self, size):
+        dims = 2 if self.is2D else 3
+        lattice = self.vectors[:dims, :dims] # a 2D cell is in the xy plane
+        reciprocal = np.linalg.inv(lattice).T
+        for fraction in self.basis[:, :dims]:
+            rows = np.zeros((1, 0), dtype=np.int64) # indices of the axes already fixed
+            for axis in range(dims):
+                low, high = axisBounds(lattice, reciprocal, rows + fraction[:axis], axis, size, self.genType)
+                starts = np.ceil(low - fraction[axis]).astype(np.int64)
+                counts = np.maximum(np.floor(high - fraction[axis]).astype(np.int64) - starts + 1, 0)
+                if axis == dims - 1:
+                    yield fraction, rows, starts, counts
+                else:
+                    rows = np.concatenate((np.repeat(rows, counts, axis=0), raggedRanges(starts, counts)[:, None]), axis=1)
+
+    def __iter__(self):
+        dims = 2 if self.is2D else 3
+        size = abs(self.maxDist)*(1 + 1e-12) # points on the boundary are kept despite rounding
+        nbCandidates, nbKept = 0, 0
+        pending, nbPending = [], 0
+        for fraction, rows, starts, counts in self._rows(size):
+            cumCounts = np.cumsum(counts)
+            first = 0
+            while first < len(rows): # groups of rows of about chunkSize candidates
+                last = max(first + 1, int(np.searchsorted(cumCounts, (cumCounts[first - 1] if first else 0) + self.chunkSize, 'right')))
+                groupCounts = counts[first:last]
+                indices = np.concatenate((np.repeat(rows[first:last], groupCounts, axis=0), raggedRanges(starts[first:last], groupCounts)[:, None]), axis=1)
+                points = (indices + fraction) @ self.vectors[:dims]
+                nbCandidates += len(points)
+                inside = np.einsum('ij,ij->i', points, points) <= size**2 if self.genType == "round" else np.all(np.abs(points) <= size, axis=1)
+                points = points[inside]
+                nbKept += len(points)
+                pending.append(points)
+                nbPending += len(points)
+                while nbPending >= self.chunkSize:
+                    block = np.concatenate(pending)
+                    yield block[:self.chunkSize]
+                    pending, nbPending = [block[self.chunkSize:]], len(block) - self.chunkSize
+                first = last
+        if nbPending:
+            yield np.concatenate(pending)
+        self.nbCandidates, self.nbKept = nbCandidates, nbKept
+
+    """
+    Returns all the sites in one (N,3) array.
+    """
+    def positions(self):
+        blocks = list(self)
+        return np.concatenate(blocks) if blocks else np.zeros((0, 3))
+
+    """
+    Yields the chunks as DipoleStore with random orientations (in plane for a 2D lattice unless lock2D is False).
+    Orientations of chunk k are drawn from default_rng([seed, k]): iterating again with the same seed gives the same dipoles.
+    """
+    def dipoleChunks(self, seed=0, intensities=None, lock2D=None):
+        lock2D = self.is2D if lock2D is None else lock2D
+        for index, positions in enumerate(self):
+            yield DipoleStore.withRandomAngles(positions, is2D=lock2D, rng=np.random.default_rng([seed, index]), intensities=intensities)
+
+######## RANDOM POSITIONS #########
+
+"""
+Returns the (n,2) pairs (i, j) of points of "pointsA" and "pointsB" closer than "radius" (zero distance included).
+Points of B are hashed in a grid of cubes of edge radius sorted by key, the neighbours of a point of A are then the
+points of the 27 cubes around it, found by binary search: O((nA + nB) log nB) for uniform densities.
+"""
+def closePairs(pointsA, pointsB, radius):
+    pointsA, pointsB = np.asarray(pointsA, dtype=np.float64).reshape(-1, 3), np.asarray(pointsB, dtype=np.float64).reshape(-1, 3)
+    if len(pointsA) == 0 or len(pointsB) == 0 or radius <= 0:
+        return np.zeros((0, 2), dtype=np.int64)
+    origin = np.minimum(pointsA.min(axis=0), pointsB.min(axis=0))
+    cellsA = np.floor((pointsA - origin)/radius).astype(np.int64) + 1 # margin of one cube for the neighbours
+    cellsB = np.floor((pointsB - origin)/radius).astype(np.int64) + 1
+    shape = np.maximum(cellsA.max(axis=0), cellsB.max(axis=0)) + 2
+    keysB = np.ravel_multi_index(cellsB.T, shape)
+    orderB = np.argsort(keysB, kind="stable")
+    sortedKeysB = keysB[orderB]
+    pairs = []
+    for offset in np.stack(np.meshgrid(*[(-1, 0, 1)]*3, indexing='ij'), axis=-1).reshape(-1, 3):
+        keys = np.ravel_multi_index((cellsA + offset).T, shape)
+        starts = np.searchsorted(sortedKeysB, keys, 'left')
+        counts = np.searchsorted(sortedKeysB, keys, 'right') - starts
+        indicesA = np.repeat(np.arange(len(pointsA)), counts)
+        indicesB = orderB[raggedRanges(starts, counts)]
+        distances2 = np.einsum('ij,ij->i', pointsA[indicesA] - pointsB[indicesB], pointsA[indicesA] - pointsB[indicesB])
+        close = distances2 < radius**2
+        pairs.append(np.stack((indicesA[close], indicesB[close]), axis=-1))
+    return np.concatenate(pairs)
+
+"""
+Returns (count,3) random positions uniformly distributed in a disk/ball of radius genSize ("round") or a
+square/cube of half edge genSize ("square"), in the xy plane if is2D. Positions are drawn in one call of "rng"
+(numpy Generator).
+If minSeparation > 0, positions are drawn by batches and candidates closer than minSeparation to a kept position
+(or to an earlier candidate of their batch) are rejected (see closePairs()). Fewer than count positions are returned
+if maxBatches batches are not enough (too dense).
+"""
+def randomPositions(count, genSize=5000.0, is2D=True, genType="round", rng=None, minSeparation=0.0, maxBatches=100):
+    rng = np.random.default_rng() if rng is None else rng
+    dims = 2 if is2D else 3
+    def draw(nbPoints):
+        points = np.zeros((nbPoints, 3))
+        if genType == "round": # direction uniform on the sphere and radius with a density in r^(dims-1)
+            directions = rng.standard_normal((nbPoints, dims))
+            directions /= np.maximum(np.linalg.norm(directions, axis=1), 1e-300)[:, None]
+            points[:, :dims] = directions*(genSize*rng.random(nbPoints)**(1/dims))[:, None]
+        elif genType == "square":
+            points[:, :dims] = rng.uniform(-genSize, genSize, (nbPoints, dims))
+        return points
+    if minSeparation <= 0:
+        return draw(count)
+    kept = np.zeros((0, 3))
+    for _ in range(maxBatches):
+        if len(kept) >= count:
+            break
+        candidates = draw(count - len(kept))
+        rejected = np.zeros(len(candidates), dtype=bool)
+        rejected[closePairs(candidates, kept, minSeparation)[:, 0]] = True
+        inBatch = closePairs(candidates, candidates, minSeparation)
+        rejected[inBatch[inBatch[:, 0] < inBatch[:, 1], 1]] = True
+        kept = np.concatenate((kept, candidates[~rejected]))
+    return kept[:count]
+
+######## CHUNKS CONSUMERS #########
+
+"""
+Writes the dipoles of "chunks" (iterable of DipoleStore) in a .csv file with the columns of the GUI export:
+x,y,z, phi, theta, moment. Returns the number of dipoles written. The file is written next to "filePath" then moved
+in place, so a failed export leaves the previous file untouched.
+"""
+def exportChunksToCSV(chunks, filePath):
+    nbDipoles = 0
+    temporaryPath = filePath + ".tmp"
+    try:
+        with open(temporaryPath, "w", encoding="utf-8") as file:
+            file.write("x,y,z,phi (°),theta (°),moment (mu_B)\n")
+            for chunk in chunks:
+                np.savetxt(file, np.column_stack((chunk.positions, np.degrees(chunk.angles), chunk.intensities)), delimiter=",", fmt="%.17g")
+                nbDipoles += len(chunk)
+        os.replace(temporaryPath, filePath)
+    except BaseException:
+        if os.path.exists(temporaryPath):
+            os.remove(temporaryPath)
+        raise
+    return nbDipoles
+
+"""
+Returns a DipoleStore of the dipoles of the .csv files "filePaths" (columns x,y,z, phi (°), theta (°), see
+exportChunksToCSV()), lines not starting with a number (headers) are skipped. The moment of the dipoles is 1 bohr
+magneton, as with Dipole.initByComposent().
+"""
+def readDipolesCSV(filePaths):
+    positions, angles = [], []
+    for filePath in filePaths:
+        try:
+            file = open(filePath, "r", encoding="utf-8")
+        except OSError as error:
+            print("impossible to open file \" " + filePath +" \", error is:" + str(error))
+            continue
+        with file:
+            for line in file:
+                lineCells = line.split(',')
+                try:
+                    float(lineCells[0])
+                except ValueError:
+                    continue
+                positions.append([float(lineCells[0]), float(lineCells[1]), float(lineCells[2])])
+                angles.append([float(lineCells[3]), float(lineCells[4])])
+    return DipoleStore(positions, normalizedAngles(np.radians(np.reshape(angles, (-1, 2)))), 1.0)
+
+"""
+Returns statistics of the dipoles of "chunks" (iterable of DipoleStore) in one pass: number of dipoles, bounding box,
+mean position and net moment (bohr magneton).
+"""
+def chunkStatistics(chunks):
+    nbDipoles = 0
+    lowCorner, highCorner = np.full(3, np.inf), np.full(3, -np.inf)
+    positionSum, netMoment = np.zeros(3), np.zeros(3)
+    for chunk in chunks:
+        if len(chunk) == 0:
+            continue
+        nbDipoles += len(chunk)
+        lowCorner = np.minimum(lowCorner, chunk.positions.min(axis=0))
+        highCorner = np.maximum(highCorner, chunk.positions.max(axis=0))
+        positionSum += chunk.positions.sum(axis=0)
+        netMoment += (chunk.moments()/MU_B).sum(axis=0)
+    return {"nbDipoles": nbDipoles, "lowCorner": lowCorner.tolist(), "highCorner": highCorner.tolist(),
+            "meanPosition": (positionSum/max(nbDipoles, 1)).tolist(), "netMoment": netMoment.tolist()}
+
+"""
+Returns the dipolar energy in J of the dipoles streamed by "chunksFactory", a callable returning a new iterable of
+the same DipoleStore chunks each time (ex: lambda : stream.dipoleChunks(seed)). Pairs of chunks are summed one at a
+time: memory is bounded by two chunks, time is O(N^2) with one pass over the chunks per chunk.
+distCoef: power of the distance unit, 0 is meter, -9 is nanometer (float)
+"""
+def streamedEnergy(chunksFactory, distCoef=0.0):
+    total = 0.0
+    for index, chunk in enumerate(chunksFactory()):
+        positions, moments = chunk.positions*10**distCoef, chunk.moments()
+        total += 0.5*crossPairEnergySum(positions, moments, positions, moments) # pairs inside the chunk
+        for otherIndex, other in enumerate(chunksFactory()):
+            if otherIndex > index:
+                total += crossPairEnergySum(positions, moments, other.positions*10**distCoef, other.moments())
+    return total*mu_0/(4*pi)
@@ -0,0 +1,225 @@
+# This Python file uses the following encoding: utf-8
+
+"""
+MIT License
+
+Copyright (c) 2020 Nils DEYBACH & Léo OUDART
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+"""
+Minimization of the dipolar energy with the nonlinear conjugate gradient of SciPy (optimize.fmin_cg) on the spherical
+angles, or with L-BFGS on unit vectors, on arrays (no Qt object): used by the WorkerMinEnergy thread of the GUI and by
+the headless runs.
+"""
+from scipy.constants import pi
+from scipy import optimize
+
+import numpy as np
+
+from .DipSimEnergy import MU_B, pairKernel, anglesToMoments, momentsGradientToAngles, J_TO_EV
+
+"""
+Minimization methods of MinEnergySolver:
+CG: nonlinear conjugate gradient on the spherical angles [phi, theta] of the moments
+L-BFGS: limited memory BFGS on the cartesian components of the moments, free of the singularities of the angles at
+the poles (theta = 0 or pi), which slow CG down for moments out of plane
+"""
+minimizers = ["CG", "L-BFGS"]
+
+"""
+Minimizer of the energy of dipoles, the energy is computed with the pair kernel of pairKernel().
+distCoef: power of the distance unit, 0 is meter, -9 is nanometer (float)
+kernelOptions: keyword arguments of pairKernel(), ex: cutoff (dict)
+cancelToken: SolverControl.CancelToken checked after each iteration, the minimization raises Cancelled once cancelled, can be None
+progress: SolverControl.ProgressReporter receiving the iteration and energy (J) after each iteration, can be None
+method: minimization method, one of minimizers (str)
+historySize: number of corrections kept by L-BFGS to approximate the hessian, memory is O(historySize*N) (int)
+"""
+class MinEnergySolver:
+    def __init__(self, distCoef=-9.0, kernelOptions=None, cancelToken=None, progress=None, method="CG", historySize=10):
+        self.distCoef = distCoef
+        self.unitCoef = 10**distCoef
+        self.kernelOptions = kernelOptions or {}
+        self.cancelToken = cancelToken
+        self.progress = progress
+        self.method = method
+        self.historySize = historySize
+
+    """
+    Return the configuration of moments that minimize the total energy(magnetic dipole-dipole interaction) of the dipoles
+    It take two argument: 
+    -dipoles: the dipoles (DipoleStore), a new snapshot with the minimized orientations is returned
+    -lock2D: boolean, if true the moments will be on a 2D plan (theta=0)
+    -rng: numpy Generator of the random start, a new unseeded one if None
+    """
+    def getMinEnergy(self, dipoles, lock2D, rng=None):
+        rng = np.random.default_rng() if rng is None else rng
+        phi = rng.random(len(dipoles))*2*pi # random start in plane
+        kernel = self.makeKernel(dipoles.positions) # pair tensors computed once for the whole minimization
+
+        if self.method == "L-BFGS":
+            return dipoles.withAngles(self.minimizeVectors(phi, kernel, lock2D, dipoles))
+        elif self.method != "CG":
+            raise ValueError("unknown minimization method: " + str(self.method))
+
+        #Find the minimum configuration in 3D
+        if lock2D == False:
+            angle = np.stack((phi, np.full(len(dipoles), pi/2)), axis=-1).ravel() # [phi1, theta1, phi2, theta2]
+            res1= optimize.fmin_cg(self.computeEnergy,angle,fprime=self.computeEnergyGradient,args=(kernel,),maxiter=10000,callback=self.iterationCallback(lambda angle: np.reshape(angle, (-1, 2)), dipoles, kernel)) #Minimize the computeEnergy function, variables are the orientation of the moments (in 3D) 
+            #res1 is a liste of angle : [phi1, theta1, phi2, theta2]
+            return dipoles.withAngles(np.reshape(res1, (-1, 2)))
+                
+        elif lock2D == True: #Find the minimum configuration in 2D
+            res1= optimize.fmin_cg(self.computeEnergy2D,phi,fprime=self.computeEnergyGradient2D,args=(kernel,),maxiter=10000,callback=self.iterationCallback(lambda phi: np.stack((phi, np.full(len(phi), pi/2)), axis=-1), dipoles, kernel))   #Minimize the computeEnergy function, variables are the orientation of the moments (in 2D)            
+            #res1 is a list of angle: [phi1, phi2, phi3]
+            return dipoles.withAngles(np.stack((res1, np.full(len(res1), pi/2)), axis=-1)) # moments in plane
+
+    """
+    Minimizes the energy with L-BFGS (optimize.minimize, L-BFGS-B without bounds) on the moments as cartesian vectors,
+    from the same start as CG, and returns the orientations found (N,2) [phi, theta] in radians.
+    The energy is evaluated on the normalized vectors: its gradient is projected on the plane tangent to each moment
+    (see computeEnergyVectors()) and vectors are renormalized at the end. Energy and gradient share one kernel call.
+    -phi: (N,) in plane start angles in radians
+    -kernel: pair kernel of the positions of each dipole (see pairKernel())
+    -lock2D: boolean, if true only the x, y components are optimized (moments on the plane)
+    -dipoles: the dipoles (DipoleStore) of the progress energy, None if no progress is reported
+    """
+    def minimizeVectors(self, phi, kernel, lock2D, dipoles=None):
+        nbComponents = 2 if lock2D else 3
+        vectors = anglesToMoments(phi, np.full(len(phi), pi/2))[:, :nbComponents].ravel()
+        energyScale = abs(self.computeEnergyVectors(vectors, kernel, nbComponents)[0]) or 1.0 # gtol of L-BFGS is absolute
+        res = optimize.minimize(lambda vectors: [value/energyScale for value in self.computeEnergyVectors(vectors, kernel, nbComponents)], vectors, method="L-BFGS-B", jac=True,
+                                callback=self.iterationCallback(lambda vectors: self.vectorsToAngles(vectors, nbComponents), dipoles, kernel),
+                                options={"maxcor": self.historySize, "maxiter": 10000, "ftol": 1e-12, "gtol": 1e-8})
+        return self.vectorsToAngles(res.x, nbComponents)
+
+    """
+    Returns the orientations (N,2) [phi, theta] in radians of moments given as vectors of any length.
+    -vectors: components of the moment of each dipole : [x1, y1, z1, x2, y2, z2] ([x1, y1, x2, y2] in 2D)
+    -nbComponents: 3, or 2 for moments on the plane
+    """
+    def vectorsToAngles(self, vectors, nbComponents=3):
+        vectors = np.reshape(vectors, (-1, nbComponents))
+        moments = np.zeros((len(vectors), 3))
+        moments[:, :nbComponents] = vectors
+        return np.stack((np.arctan2(moments[:, 1], moments[:, 0]), np.arccos(np.clip(moments[:, 2]/np.linalg.norm(moments, axis=-1), -1, 1))), axis=-1)
+
+    """
+    Returns the pair kernel of "positions" (see pairKernel()) and passes its description to kernelReport().
+    """
+    def makeKernel(self, positions):
+        kernel = pairKernel(positions, self.distCoef, **self.kernelOptions)
+        self.kernelReport(kernel.description())
+        return kernel
+
+    """
+    Called with the description of the pair kernel of each minimization (ex: tile size of TiledPairs), does nothing here.
+    """
+    def kernelReport(self, description):
+        pass
+
+    """
+    Returns the callback of the minimizer called after each iteration with the current variables: checks the cancel
+    token and reports the progress, the energy is only computed when a report is due. The energy reported is in J, with
+    the moments of "dipoles" as computeEnergyDipoles().
+    -toAngles: orientations (N,2) [phi, theta] of the variables, called as toAngles(variables)
+    -dipoles: the dipoles (DipoleStore) minimized
+    -kernel: pair kernel of the positions of each dipole (see pairKernel())
+    """
+    def iterationCallback(self, toAngles, dipoles, kernel):
+        iterations = [0]
+        def callback(variables):
+            iterations[0] += 1
+            if self.progress is not None and dipoles is not None and self.progress.isDue():
+                angles = toAngles(variables)
+                energy = kernel.energy(anglesToMoments(angles[:, 0], angles[:, 1], dipoles.intensities*MU_B))
+                self.progress.report(iterations[0], energy)
+            if self.cancelToken is not None:
+                self.cancelToken.check()
+        return callback
+
+    """
+    Compute the total energy (Magnetic dip to dip)
+    It take two argument:
+    -angle: list of angles of each dipole : [[phi1,theta1],[phi2,theta2]]
+    -kernel: pair kernel of the positions of each dipole (see pairKernel())
+    """
+    def computeEnergy(self, angle, kernel): 
+        moments = anglesToMoments(angle[0::2], angle[1::2]) # [[m1_x,m1,y,m1_z],[m2_x,m2_y,m2_z]]
+        return kernel.energy(moments)*self.unitCoef**3*10**18 # kernel is in 10**distCoef m, energy is kept in distance units
+    
+    """
+    Compute the total energy (Magnetic dip to dip) in J
+    It take two argument:
+    -angle: list of angles of each dipole (in polar coordinate) : [phi1,phi2,phi3] 
+    -kernel: pair kernel of the positions of each dipole (see pairKernel())
+    """
+    def computeEnergy2D(self, angle, kernel): 
+        moments = anglesToMoments(angle, np.full(len(angle), pi/2)) # [[m1_x,m1,y,m1_z],[m2_x,m2_y,m2_z]]
+        return kernel.energy(moments)*self.unitCoef**3*10**18
+
+    """
+    Analytic gradient of computeEnergy with respect to the angles: [dE/dphi1, dE/dtheta1, dE/dphi2, dE/dtheta2]
+    It take the same arguments as computeEnergy.
+    """
+    def computeEnergyGradient(self, angle, kernel):
+        phi, theta = angle[0::2], angle[1::2]
+        gradMoments = kernel.energyGradient(anglesToMoments(phi, theta))
+        return momentsGradientToAngles(gradMoments, phi, theta).ravel()*self.unitCoef**3*10**18
+
+    """
+    Analytic gradient of computeEnergy2D with respect to the angles: [dE/dphi1, dE/dphi2, dE/dphi3]
+    It take the same arguments as computeEnergy2D.
+    """
+    def computeEnergyGradient2D(self, angle, kernel):
+        theta = np.full(len(angle), pi/2)
+        gradMoments = kernel.energyGradient(anglesToMoments(angle, theta))
+        return momentsGradientToAngles(gradMoments, angle, theta)[:, 0]*self.unitCoef**3*10**18
+
+    """
+    Compute the total energy (Magnetic dip to dip) and its gradient of moments given as vectors of any length,
+    the moments are the normalized vectors. Returns [energy, gradient] with the gradient of the same shape as "vectors".
+    It take three arguments:
+    -vectors: components of the moment of each dipole : [x1, y1, z1, x2, y2, z2] ([x1, y1, x2, y2] in 2D)
+    -kernel: pair kernel of the positions of each dipole (see pairKernel())
+    -nbComponents: 3, or 2 for moments on the plane
+    """
+    def computeEnergyVectors(self, vectors, kernel, nbComponents=3):
+        vectors = np.reshape(vectors, (-1, nbComponents))
+        lengths = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        moments = np.zeros((len(vectors), 3))
+        moments[:, :nbComponents] = vectors/lengths
+        gradMoments = kernel.energyGradient(moments)
+        energy = 0.5*float(np.sum(moments*gradMoments)) # the energy is quadratic in the moments
+        gradMoments = gradMoments[:, :nbComponents] - moments[:, :nbComponents]*np.sum(moments*gradMoments, axis=-1, keepdims=True) # projection on the tangent plane
+        return [energy*self.unitCoef**3*10**18, (gradMoments/lengths).ravel()*self.unitCoef**3*10**18] # chain rule of the normalization
+
+
+    """
+    Compute the total energy (Magnetic dip to dip) of a dipole configuration in eV
+    It take one argument:
+    -dipol: all dipoles (DipoleStore)
+    """
+    def computeEnergyDipoles(self, dipol):
+        if len(dipol)>1: #if there is only one dipole, the energy is zero
+            return pairKernel(dipol.positions, self.distCoef, **self.kernelOptions).energy(dipol.moments())*J_TO_EV #convert E in J to eV (moments in J/T)
+        else:
+            return(0)
@@ -26,11 +26,12 @@ SOFTWARE.
 
 """
 This class file represent the compute of minimizing energy with the Monte-Carlo method, using the Metropolis algorithm
-There is two class:
--One wich use this algorithm in multiple thread to reduce computing time (actually not working)
--The other one using only one thread to compute in background
+The compute is made in a thread, in background. It either runs one chain in this thread or multiple independent
+chains (replicas) in a pool of processes and keeps the one of minimum energy.
+ParallelTempering runs a ladder of temperatures in a pool of processes and swaps configurations between them.
 """
-from copy import deepcopy
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait
 
 import numpy as np
 from scipy.constants import k as kb
@@ -41,248 +42,291 @@ from PySide2 import QtCore, QtGui
 from .DipSimUtilities import *
 from .DipSim import *
 from .DipSimComputor import *
+from .DipSimEnergy import *
+from .MonteCarloChain import MetropolisChain, runReplica, parallelTempering, simulatedAnnealing, ChainCheckpointer, loadChainCheckpoint
+from .SolverControl import CancelToken, Cancelled, ProgressReporter
+
+###############################################################
+### Method of Monte-Carlo running on one thread or replicas ###
+###############################################################
 
-#########################################################
-### Method of Monte-Carlo running on multpile threads ###
-############## /!\ Actually not working /!\ #############
-#########################################################
 """
-dipole: list of dipoles (DipModel)
+dipole: snapshot of the dipoles (DipoleStore, see DipModel.getDipolesCopy())
 nbIteration: number of iterations (int)
 temperature: temperature of the system (float)
 lock2D: compute on 3D or 2D (bool)
 unitCoef: power of the distance, 0 is meter, 10**-9 is nanometer (float)
-"""   
-class MonteCarloThreadWorker(QThread):
-    resultDips = Signal(list)
+kernelOptions: keyword arguments of DipSimEnergy.pairKernel(), ex: cutoff (dict)
+nbReplicas: number of independent chains run in parallel processes (int)
+temperatureEnd: if not None, simulated annealing from temperature to temperatureEnd (float), on one chain
+schedule: shape of the annealing temperature schedule: linear, geometric or adaptive (str)
+checkpointFile: file the state of the chain is saved to, None for no checkpoint (str), one chain only
+checkpointIterations, checkpointSeconds: interval between two checkpoints in iterations and/or seconds (0 disables)
+"""
+
+class MonteCarlo(QThread):
+    resultDips = Signal(object)
+    resultEnergy = Signal(float)
+    annealingStep = Signal(float, float, float) # iteration (float, runs may exceed 2^31 iterations), temperature (K), energy (eV)
+    progressReport = Signal(float, float, float, float, float) # iteration (float, see annealingStep), energy (eV), acceptance rate, remaining time (s), fraction done (-1 if unknown)
+    cancelled = Signal()
+    kernelInfo = Signal(str) # description of the pair kernel used, ex: tile size of TiledPairs
     error = Signal()
     def __init__(self, parent=None):
-        super(MonteCarloThreadWorker, self).__init__(parent=parent)
+        super(MonteCarlo, self).__init__(parent=parent)
         self.dipoles = None
         self.nbIteration = 1
         self.temperature = 1
         self.lock2D = False
+        self.distCoef = -11.0
         self.unitCoef=10**-11
 
-        self.nbIterMutex = None
-        self._currentNbIterations = None
+        self.nbReplicas = 1
+        self.temperatureEnd = None
+        self.schedule = "geometric"
+        self.kernelOptions = {}
+        self.checkpointFile = None
+        self.checkpointIterations = 0
+        self.checkpointSeconds = 0.0
+        self.resumeFile = None
+        self.cancelToken = CancelToken()
+        self.progress = None
 
-        self.id = -1
-    
-    def compute(self, nbIterMutex, dipoles, nbIteration, currentNbIterations, temperature, distCoef=0.0, lock2D=False, id = -1):
-        self.id = id
-        self.nbIterMutex = nbIterMutex
-        self._currentNbIterations = currentNbIterations
+    """Link between main program and qthread run fonction"""
+    @Slot()
+    def compute(self, dipoles, nbIteration, temperature, distCoef=0.0, lock2D=False, nbReplicas=1, temperatureEnd=None, schedule="geometric", kernelOptions=None, checkpointFile=None, checkpointIterations=0, checkpointSeconds=0.0):
         self.dipoles = dipoles
-        self.nbIteration = nbIteration
+        self.distCoef = distCoef
         self.unitCoef=10**distCoef
+        self.nbIteration = nbIteration
         self.temperature = temperature
         self.lock2D = lock2D
+        self.nbReplicas = max(1, nbReplicas)
+        self.temperatureEnd = temperatureEnd
+        self.schedule = schedule
+        self.kernelOptions = kernelOptions or {}
+        self.checkpointFile = checkpointFile
+        self.checkpointIterations = checkpointIterations
+        self.checkpointSeconds = checkpointSeconds
+        self.resumeFile = None
+        self.startControl(nbIteration)
         self.start()
+
+    """Continues in the QThread the one chain run saved in the checkpoint "checkpointFile" (see monteCarloResume())"""
+    @Slot()
+    def resume(self, checkpointFile, checkpointIterations=0, checkpointSeconds=0.0):
+        self.resumeFile = checkpointFile
+        self.checkpointFile = checkpointFile
+        self.checkpointIterations = checkpointIterations
+        self.checkpointSeconds = checkpointSeconds
+        self.startControl(None)
+        self.start()
+
+    """
+    New cancel token and progress reporter for a run of nbIteration iterations (None if unknown), reports are emitted
+    with the progressReport signal at most 4 times per second.
+    """
+    def startControl(self, nbIteration, startIteration=0):
+        self.cancelToken = CancelToken()
+        self.progress = ProgressReporter(lambda iteration, energy, acceptanceRate, remainingTime, fraction : self.progressReport.emit(iteration, energy*J_TO_EV, acceptanceRate, remainingTime, fraction), nbIteration, startIteration=startIteration)
+
+    """Returns the pair kernel of "positions" (see pairKernel()) and emits its description with the kernelInfo signal"""
+    def makeKernel(self, positions):
+        kernel = pairKernel(positions, self.distCoef, **self.kernelOptions)
+        self.kernelInfo.emit(kernel.description())
+        return kernel
+
+    """Asks the running compute to stop after its current block of iterations (thread safe)"""
+    @Slot()
+    def cancel(self):
+        self.cancelToken.cancel()
     
+    """Starts QThread and Mont-Carlo compute of the minimum energy of multiple dipoles"""
     def run(self):
         try:
-            resDips = self.monteCarloThread(self.dipoles, self.nbIteration, self.temperature, self.lock2D)
+            if self.resumeFile is not None:
+                resDips = self.monteCarloResume(self.resumeFile)
+            elif self.temperatureEnd is not None:
+                resDips = self.monteCarloAnnealing(self.dipoles, self.nbIteration, self.temperature, self.temperatureEnd, self.schedule, self.lock2D)
+            elif self.nbReplicas > 1:
+                resDips = self.monteCarloReplicas(self.dipoles, self.nbIteration, self.temperature, self.lock2D, self.nbReplicas)
+            else:
+                resDips = self.monteCarloOneThread(self.dipoles, self.nbIteration, self.temperature, self.lock2D)
+            resEn = self.computeEnergy(resDips)
             self.resultDips.emit(resDips)
+            self.resultEnergy.emit(resEn)
+        except Cancelled:
+            self.cancelled.emit()
         except:
             self.error.emit()
 
     """
-    Minimisation with Monte-Carlo working on multiple threads
-    Return the list of dipoles with new computed directions 
+    Minimisation with Monte-Carlo working on one thread
+    Return a snapshot of the dipoles with new computed directions 
 
-    dipoles: list of dipoles 
+    dipoles: dipoles (DipoleStore)
     N:number of iteration(int) 
     T: temperature(float)
     lock2D: compute on 2D or 3D (boolean)
     """
-    def monteCarloThread(self, dipoles, N, T, lock2D):
-        dipCopy = deepcopy(dipoles)
-        current_energy = self.computeEnergy(dipCopy)
-        while True:
-            moment_to_change_indice = np.random.randint(len(dipCopy))
-            moment_to_change = dipCopy[moment_to_change_indice].quaternion #moment i-1
-            dipCopy[moment_to_change_indice].quaternion = Dipole.rndQuaternionGenerator(is2D=lock2D) # we replace the moment i-1 by a new random one
-            new_energy = self.computeEnergy(dipCopy)
-            r = np.random.random()
-            numerator = new_energy - current_energy  # unit: eV
-            denominator = -(kb*T* 6.242 * 10**18)    # unit: eV
-
-            if r<min(1, np.exp( numerator/denominator)): #determine to add or not energy as new minimum
-                current_energy = new_energy
-            else:
-                dipCopy[moment_to_change_indice].quaternion = moment_to_change # we put moment_i = moment_i-1
-            #verify if max number of iteration (of all threads) rechead and/or add this one
-            self.nbIterMutex.lock()
-            if(self._currentNbIterations > self.nbIteration):
-                self.nbIterMutex.unlock()
-                dipCopy[moment_to_change_indice].quaternion = moment_to_change # disregard last changes and return
-                break
-            else:
-                self._currentNbIterations += 1
-            self.nbIterMutex.unlock()
-        return dipCopy
+    def monteCarloOneThread(self, dipoles, N, T, lock2D):
+        if len(dipoles) < 2:
+            return dipoles
+        kernel = self.makeKernel(dipoles.positions)
+        # each step only evaluates the energy change of one moment from its local field (see MonteCarloChain)
+        chain = MetropolisChain(kernel, dipoles.angles[:, 0], dipoles.angles[:, 1], dipoles.intensities*MU_B, lock2D)
+        checkpointer = None
+        if self.checkpointFile:
+            parameters = {"distCoef": self.distCoef, "kernelOptions": self.kernelOptions, "temperature": T, "nbIteration": N}
+            checkpointer = ChainCheckpointer(self.checkpointFile, dipoles.positions, parameters, self.checkpointIterations, self.checkpointSeconds)
+        chain.run(N, T, checkpointer, self.cancelToken, self.progress)
+        if checkpointer is not None:
+            checkpointer.remove() # finished, nothing left to resume
+        return dipoles.withAngles(np.stack((chain.phi, chain.theta), axis=-1))
+
+    """
+    Continues the one chain run saved in the checkpoint "checkpointFile" (see monteCarloOneThread()) for its remaining
+    iterations, with the same random draws as if it had not been interrupted, and keeps checkpointing to the same file
+(removed once the run finishes).
+    Return the dipoles of the checkpoint (DipoleStore) with new computed directions, colors are not saved.
+    """
+    def monteCarloResume(self, checkpointFile):
+        chain, positions, parameters = loadChainCheckpoint(checkpointFile)
+        self.distCoef = parameters["distCoef"]
+        self.unitCoef = 10**self.distCoef
+        self.kernelOptions = parameters["kernelOptions"]
+        self.kernelInfo.emit(chain.kernel.description())
+        checkpointer = ChainCheckpointer(checkpointFile, positions, parameters, self.checkpointIterations, self.checkpointSeconds)
+        checkpointer.lastIteration = chain.nbIterationsDone
+        self.progress.total, self.progress.startIteration = parameters["nbIteration"], chain.nbIterationsDone
+        chain.run(max(parameters["nbIteration"] - chain.nbIterationsDone, 0), parameters["temperature"], checkpointer, self.cancelToken, self.progress)
+        checkpointer.remove()
+        return DipoleStore(positions, np.stack((chain.phi, chain.theta), axis=-1), chain.intensities/MU_B)
+
+    """
+    Minimisation with Monte-Carlo and simulated annealing on one thread, the temperature goes from T0 to T1 following
+    "schedule". Energy of each annealing stage is streamed with the annealingStep signal.
+    Return a snapshot of the dipoles with new computed directions 
+
+    dipoles: dipoles (DipoleStore)
+    N: number of iteration (int) 
+    T0, T1: start and end temperatures (float)
+    schedule: linear, geometric or adaptive (str)
+    lock2D: compute on 2D or 3D (boolean)
+    """
+    def monteCarloAnnealing(self, dipoles, N, T0, T1, schedule, lock2D):
+        if len(dipoles) < 2:
+            return dipoles
+        chain = MetropolisChain(self.makeKernel(dipoles.positions), dipoles.angles[:, 0], dipoles.angles[:, 1], dipoles.intensities*MU_B, lock2D)
+        simulatedAnnealing(chain, N, T0, T1, schedule, stageCallback=lambda iteration, temperature, energy, acceptanceRate : self.annealingStep.emit(iteration, temperature, energy*J_TO_EV), cancelToken=self.cancelToken, progress=self.progress)
+        return dipoles.withAngles(np.stack((chain.phi, chain.theta), axis=-1))
+
+    """
+    Minimisation with Monte-Carlo running K independent chains, each with its own seed, in a pool of processes
+    (the chain is Python bound and would not run in parallel in threads because of the GIL).
+    Return a snapshot of the dipoles of the chain which ended with the minimum energy.
+    A cancel reaches the chains in the processes through a shared cancel token, they stop after their current block.
+
+    dipoles: dipoles (DipoleStore)
+    N:number of iteration of each chain (int) 
+    T: temperature(float)
+    lock2D: compute on 2D or 3D (boolean)
+    K: number of chains (int)
+    """
+    def monteCarloReplicas(self, dipoles, N, T, lock2D, K):
+        if len(dipoles) < 2:
+            return dipoles
+        seeds = np.random.SeedSequence().spawn(K)
+        self.progress.total = N*K
+        # "spawn" start method: forking a process running Qt threads is unsafe
+        context = multiprocessing.get_context("spawn")
+        with context.Manager() as manager, ProcessPoolExecutor(max_workers=K, mp_context=context) as executor:
+            replicasCancelToken = CancelToken.shared(manager)
+            try:
+                futures = [executor.submit(runReplica, dipoles.positions, self.distCoef, dipoles.angles[:, 0], dipoles.angles[:, 1], dipoles.intensities*MU_B, N, T, lock2D, seed, self.kernelOptions, replicasCancelToken) for seed in seeds]
+                pending = set(futures)
+                while pending: # waits for the chains, with a timeout to check the cancel token
+                    done, pending = wait(pending, timeout=0.25)
+                    self.cancelToken.check()
+                    if done:
+                        best = min((future.result() for future in futures if future.done()), key=lambda result: result[2])
+                        self.progress.report(N*(K - len(pending)), best[2], best[3]/max(N, 1))
+                results = [future.result() for future in futures]
+            finally:
+                replicasCancelToken.cancel() # stops the chains still running (cancel or error), the pool then waits for them
+        phi, theta, energy, nbAccepted = min(results, key=lambda result: result[2])
+        return dipoles.withAngles(np.stack((phi, theta), axis=-1))
 
     """
     Compute the total energy (Magnetic dipole-dipole interaction) of a dipole configuration /!\ in eV /!\ 
     It take one argument:
-    -dipol: list of all dipoles (DipModel)
+    -dipol: all dipoles (DipoleStore)
     """
     def computeEnergy(self, dipol):
-        positions = []
-        moment=[]
-        E=0
-        a=0
         if len(dipol)>1:
-            for i in dipol:
-                positions.append([i.position.x()*self.unitCoef,i.position.y()*self.unitCoef,i.position.z()*self.unitCoef])
-                angle = [anglesQuaternionToSph(i.quaternion)[0],anglesQuaternionToSph(i.quaternion)[1]]
-                MI = i.moment * 9.27 * 10**-24
-                phiI= angle[0]
-                thetaI= angle[1]
-                moment.append([cos(phiI)*sin(thetaI)*MI,sin(phiI)*sin(thetaI)*MI,cos(thetaI)*MI]) #create al list of all moment: [[m1_x,m1,y,m1_z],[m2_x,m2_y,m2_z]]
-            
-            """ Formula of energy of magnetic dipole–dipole interaction """
-            for i in range(len(positions)):
-                for j in range(len(positions)):
-                    if j != i:
-                        vectIJ= np.subtract(positions[j],positions[i])                    
-                        normIJ= np.linalg.norm(vectIJ)
-                        E+=(np.dot(moment[i],moment[j]))/(normIJ**3) - (3*np.dot(moment[i],vectIJ)*np.dot(moment[j],vectIJ))/(normIJ**5)
-            E=(E*mu_0/(8*pi)) # E in J
-            return (E * 6.242 * 10**18) # convert J to eV
+            return self.makeKernel(dipol.positions).energy(dipol.moments())*J_TO_EV # convert J to eV
         else:
             return(0)
 
-###################################################
-### Method of Monte-Carlo running on one thread ###
-###################################################
+################################################################
+### Parallel tempering (replica exchange) Monte-Carlo method ###
+################################################################
 
 """
-dipole: list of dipoles (DipModel)
-nbIteration: number of iterations (int)
-temperature: temperature of the system (float)
+dipole: snapshot of the dipoles (DipoleStore, see DipModel.getDipolesCopy())
+nbIteration: number of iterations of each replica (int)
+temperatures: ladder of temperatures, one replica each (list of float)
+swapInterval: number of iterations between two swaps attempts (int)
 lock2D: compute on 3D or 2D (bool)
-unitCoef: power of the distance, 0 is meter, 10**-9 is nanometer (float)
 """
 
-class MonteCarlo(QThread):
-    resultDips = Signal(list)
-    resultEnergy = Signal(float)
-    error = Signal()
+class ParallelTempering(MonteCarlo):
+    resultRates = Signal(list, list)
     def __init__(self, parent=None):
-        super(MonteCarlo, self).__init__(parent=parent)
-        self.dipoles = None
-        self.nbIteration = 1
-        self.temperature = 1
-        self.lock2D = False
-        self.unitCoef=10**-11
-
-        self._multiTreaded = False
-        self.nbIterMutex = QMutex()
-        self._currentNbIterations = 0
-        self.threadPool = None
-
-        self.allMinEnergies = []
+        super(ParallelTempering, self).__init__(parent=parent)
+        self.temperatures = [1.0]
+        self.swapInterval = 1000
 
     """Link between main program and qthread run fonction"""
     @Slot()
-    def compute(self, dipoles, nbIteration, temperature, distCoef=0.0, lock2D=False, multiTreaded = False):
-        # For the time beeing only one thread used because race condition happens. Some more debugging is necessary for a precise understanding. 
-        # QtCore.QThread.idealThreadCount() is maximum nb of threads supported by your system. When 2 or more threads are used
-        # only the last one execute the function. It may be a bug in qt or a bad implementation of the qthread API iin this file.
-
-        self.threadPool = [MonteCarloThreadWorker()]*1#*QtCore.QThread.idealThreadCount()
-        for thread in self.threadPool:
-            thread.resultDips.connect(lambda dips : self.minEnergiesDipolesList.append(dips))
+    def compute(self, dipoles, nbIteration, temperatures, swapInterval, distCoef=0.0, lock2D=False, kernelOptions=None):
         self.dipoles = dipoles
+        self.distCoef = distCoef
         self.unitCoef=10**distCoef
         self.nbIteration = nbIteration
-        self.temperature = temperature
+        self.temperatures = sorted(temperatures)
+        self.swapInterval = swapInterval
         self.lock2D = lock2D
-        
-        self._multiTreaded = multiTreaded
-        self.minEnergiesDipolesList = []
+        self.kernelOptions = kernelOptions or {}
+        self.startControl(nbIteration)
         self.start()
-    
-    """Starts QThread and Mont-Carlo compute of the minimum energy of multiple dipoles"""
+
+    """Starts QThread and parallel tempering compute, reports the lowest temperature replica"""
     def run(self):
-        self._currentNbIterations = 0
-        if(self._multiTreaded):
-            for index, thread in enumerate(self.threadPool): #start all threads compute
-                thread.compute(self.nbIterMutex, deepcopy(self.dipoles), self.nbIteration, self._currentNbIterations, self.temperature, self.lock2D, id=index)
-            for thread in self.threadPool: # rejoin all threads
-                while thread.isRunning():
-                    pass
-            allMinEnergies = [self.computeEnergy(dips) for dips in self.minEnergiesDipolesList]
-            indexMinEn = allMinEnergies.index(min(allMinEnergies))
-            minEnDips = self.minEnergiesDipolesList[indexMinEn]
-            resEn = self.computeEnergy(minEnDips)
-            self.resultDips.emit(minEnDips)
+        try:
+            resDips, acceptanceRates, swapRates = self.parallelTempering(self.dipoles, self.nbIteration, self.temperatures, self.swapInterval, self.lock2D)
+            resEn = self.computeEnergy(resDips)
+            self.resultRates.emit(acceptanceRates, swapRates)
+            self.resultDips.emit(resDips)
             self.resultEnergy.emit(resEn)
-        else:
-            try:
-                resDips = self.monteCarloOneThread(self.dipoles, self.nbIteration, self.temperature, self.lock2D)
-                resEn = self.computeEnergy(resDips)
-                self.resultDips.emit(resDips)
-                self.resultEnergy.emit(resEn)
-            except:
-                self.error.emit()
+        except Cancelled:
+            self.cancelled.emit()
+        except:
+            self.error.emit()
 
     """
-    Minimisation with Monte-Carlo working on multiple threads
-    Return the list of dipoles with new computed directions 
+    Return a snapshot of the dipoles of the lowest temperature replica, the acceptance rate of each temperature and
+    the swap rate of each pair of neighbouring temperatures.
 
-    dipoles: list of dipoles 
-    N:number of iteration(int) 
-    T: temperature(float)
+    dipoles: dipoles (DipoleStore)
+    N: number of iteration of each replica (int) 
+    temperatures: ladder of temperatures (list of float)
+    swapInterval: number of iterations between two swaps attempts (int)
     lock2D: compute on 2D or 3D (boolean)
     """
-    def monteCarloOneThread(self, dipoles, N, T, lock2D):
-        dipCopy = deepcopy(dipoles)
-        current_energy = self.computeEnergy(dipCopy)
-        
-        for i in range(N):
-            moment_to_change_indice = np.random.randint(len(dipCopy))
-            moment_to_change = dipCopy[moment_to_change_indice].quaternion #moment i-1
-            dipCopy[moment_to_change_indice].quaternion = Dipole.rndQuaternionGenerator(is2D=lock2D) # we replace the moment i-1 by a new random one
-            new_energy = self.computeEnergy(dipCopy)
-            r = np.random.random()  #take a number between 0 and 1
-            numerator = new_energy - current_energy  # unit: eV
-            denominator = -(kb*T* 6.242 * 10**18)    # unit: eV
-            if r<min(1, np.exp( numerator/denominator)):    #determine to add or not energy as new minimum
-                current_energy = new_energy     
-            else:
-                dipCopy[moment_to_change_indice].quaternion = moment_to_change # we put moment_i = moment_i-1
-        return dipCopy
-
-    """
-    Compute the total energy (Magnetic dipole-dipole interaction) of a dipole configuration /!\ in eV /!\ 
-    It take one argument:
-    -dipol: list of all dipoles (DipModel)
-    """
-    def computeEnergy(self, dipol):
-        positions = []
-        E=0
-        moment=[]
-        a=0
-        if len(dipol)>1:
-            for i in dipol:
-                positions.append([i.position.x()*self.unitCoef,i.position.y()*self.unitCoef,i.position.z()*self.unitCoef])
-                angle = [anglesQuaternionToSph(i.quaternion)[0],anglesQuaternionToSph(i.quaternion)[1]] 
-                MI = i.moment * 9.27 * 10**-24
-                phiI= angle[0]
-                thetaI= angle[1]
-                moment.append([cos(phiI)*sin(thetaI)*MI,sin(phiI)*sin(thetaI)*MI,cos(thetaI)*MI])   #create al list of all moment: [[m1_x,m1,y,m1_z],[m2_x,m2_y,m2_z]]
-
-            """ Formula of energy of magnetic dipole–dipole interaction """
-            for i in range(len(positions)):
-                for j in range(len(positions)):
-                    if j != i:
-                        vectIJ= np.subtract(positions[j],positions[i])                    
-                        normIJ= np.linalg.norm(vectIJ)
-                        E+=(np.dot(moment[i],moment[j]))/(normIJ**3) - (3*np.dot(moment[i],vectIJ)*np.dot(moment[j],vectIJ))/(normIJ**5)
-            E=(E*mu_0/(8*pi)) # E in J
-            return (E * 6.242 * 10**18) # convert J to eV
-        else:
-            return(0)
\ No newline at end of file
+    def parallelTempering(self, dipoles, N, temperatures, swapInterval, lock2D):
+        if len(dipoles) < 2:
+            return [dipoles, [0.0]*len(temperatures), [0.0]*(len(temperatures) - 1)]
+        with ProcessPoolExecutor(max_workers=len(temperatures), mp_context=multiprocessing.get_context("spawn")) as executor:
+            lowestState, acceptanceRates, swapRates = parallelTempering(dipoles.positions, self.distCoef, dipoles.angles[:, 0], dipoles.angles[:, 1], dipoles.intensities*MU_B, temperatures, N, swapInterval, lock2D, executor, kernelOptions=self.kernelOptions, cancelToken=self.cancelToken, progress=self.progress)
+        return [dipoles.withAngles(np.stack((lowestState[0], lowestState[1]), axis=-1)), acceptanceRates, swapRates]
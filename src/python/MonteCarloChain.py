@@ -0,0 +1,504 @@
+# This Python file uses the following encoding: utf-8
+
+"""
+MIT License
+
+Copyright (c) 2020 Nils DEYBACH & Léo OUDART
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+"""
+Metropolis chain working on arrays (no Qt object), used by the Monte-Carlo solvers.
+Each dipole keeps its local dipolar field so a single moment change costs O(1) to evaluate and O(N) to accept
+instead of a full O(N^2) energy compute.
+"""
+import json
+import multiprocessing
+import os
+import queue
+import time
+from math import cos, sin, exp, ceil
+
+import numpy as np
+from scipy.constants import k as kb, mu_0, pi
+
+from . import DipSimJit
+from .DipSimEnergy import anglesToMoments, pairKernel, DirectPairs, PairTensors, TruncatedPairs
+from .SolverControl import CancelToken, Cancelled
+
+"""
+State of a Metropolis chain on the moments orientations: angles, moments, local fields and energy.
+At each step one random moment is replaced by a random orientation (same draw as Dipole.rndQuaternionGenerator)
+and accepted with probability min(1, exp(-dE/(kb*T))).
+
+kernel: pair kernel of the dipoles positions in m (see DipSimEnergy.pairKernel())
+phi, theta: (N,) arrays of initial angles in radians (physics convention)
+intensities: moment intensity in J/T, scalar or (N,) array
+lock2D: moments are drawn on a 2D plan (theta=pi/2) or in 3D (bool)
+rng: numpy.random.Generator to draw from, a new unseeded one if None
+"""
+class MetropolisChain:
+    blockSize = 4096 # random numbers are drawn by blocks
+
+    def __init__(self, kernel, phi, theta, intensities, lock2D=False, rng=None):
+        self.kernel = kernel
+        self.rng = np.random.default_rng() if rng is None else rng
+        self.lock2D = lock2D
+        self.phi = np.array(phi, dtype=np.float64)
+        self.theta = np.array(theta, dtype=np.float64)
+        self.intensities = np.broadcast_to(np.asarray(intensities, dtype=np.float64), self.phi.shape)
+        self.moments = anglesToMoments(self.phi, self.theta, self.intensities)
+        self.fields = np.ascontiguousarray(kernel.pairFieldSum(self.moments), dtype=np.float64) # local dipolar field of each dipole (without -mu_0/(4pi))
+        self.energy = 0.5*float(np.sum(self.moments*self.fields))*mu_0/(4*pi) # J
+        self.nbIterationsDone = 0
+        self.nbAccepted = 0
+        self.energyMean = 0.0 # running mean and sum of squared deviations of the energy, sampled after each block
+        self.energyM2 = 0.0
+        self.nbSamples = 0
+
+    """
+    Runs "nbIteration" Metropolis steps at "temperature" (K) and returns the number of accepted moves.
+    Between two blocks of steps:
+    checkpointer: ChainCheckpointer saving the chain, can be None
+    cancelToken: SolverControl.CancelToken, raises Cancelled once cancelled (after a last checkpoint), can be None
+    progress: SolverControl.ProgressReporter receiving iteration, energy (J) and acceptance rate of the run, can be None
+    """
+    def run(self, nbIteration, temperature, checkpointer=None, cancelToken=None, progress=None):
+        rng = self.rng
+        energyCoef = mu_0/(4*pi)
+        kbT = kb*temperature
+        nbAccepted = 0
+        runBlock = self.jitBlock() or self.pythonBlock
+
+        for blockStart in range(0, nbIteration, self.blockSize):
+            nbSteps = min(self.blockSize, nbIteration - blockStart)
+            indices = rng.integers(len(self.phi), size=nbSteps)
+            newPhis = rng.random(nbSteps)*2*pi
+            newThetas = np.full(nbSteps, pi/2) if self.lock2D else rng.random(nbSteps)*pi
+            randoms = rng.random(nbSteps)
+            blockAccepted, energyChange = runBlock(indices, newPhis, newThetas, randoms, energyCoef, kbT)
+            nbAccepted += blockAccepted
+            self.energy += energyChange
+            self.nbIterationsDone += nbSteps
+            self.nbAccepted += blockAccepted
+            self.addEnergySample()
+            if checkpointer is not None:
+                checkpointer.update(self)
+            if progress is not None:
+                progress.report(self.nbIterationsDone, self.energy, nbAccepted/(blockStart + nbSteps))
+            if cancelToken is not None and cancelToken.isCancelled():
+                if checkpointer is not None:
+                    checkpointer.save(self)
+                raise Cancelled()
+        return nbAccepted
+
+    """
+    Runs the Metropolis steps of one block drawn beforehand: moves dipoles "indices" to [newPhis, newThetas] if
+    "randoms" < exp(-dE/kbT) and updates the local fields of the other dipoles. Returns [accepted moves, energy change in J].
+    """
+    def pythonBlock(self, indices, newPhis, newThetas, randoms, energyCoef, kbT):
+        kernel = self.kernel
+        selfTensors = kernel.selfTensors # periodic kernels: a dipole also interacts with its own images
+        phi, theta, moments, fields, intensities = self.phi, self.theta, self.moments, self.fields, self.intensities
+        nbAccepted, energyChange = 0, 0.0
+        for index, newPhi, newTheta, r in zip(indices.tolist(), newPhis.tolist(), newThetas.tolist(), randoms.tolist()):
+            intensity = intensities[index]
+            sinTheta = sin(newTheta)
+            newMoment = (cos(newPhi)*sinTheta*intensity, sin(newPhi)*sinTheta*intensity, cos(newTheta)*intensity)
+            oldMoment = moments[index]
+            fieldX, fieldY, fieldZ = fields[index]
+            deltaMoment = (newMoment[0] - oldMoment[0], newMoment[1] - oldMoment[1], newMoment[2] - oldMoment[2])
+            deltaEnergy = (deltaMoment[0]*fieldX + deltaMoment[1]*fieldY + deltaMoment[2]*fieldZ)*energyCoef # J
+            if selfTensors is not None:
+                deltaArray = np.array(deltaMoment)
+                deltaEnergy += 0.5*float(deltaArray @ selfTensors[index] @ deltaArray)*energyCoef
+            if deltaEnergy <= 0 or (kbT > 0 and r < exp(-deltaEnergy/kbT)): # r < min(1, exp(-dE/kbT))
+                kernel.addPairFieldFrom(fields, index, np.array(deltaMoment))
+                moments[index] = newMoment
+                phi[index] = newPhi
+                theta[index] = newTheta
+                energyChange += deltaEnergy
+                nbAccepted += 1
+        return nbAccepted, energyChange
+
+    """
+    Returns the compiled equivalent of pythonBlock() for the kernel (see DipSimJit), None if the kernel does not use
+    Numba or its local fields update is not compiled.
+    """
+    def jitBlock(self):
+        kernel = self.kernel
+        if not kernel.jit:
+            return None
+        if isinstance(kernel, PairTensors):
+            function, fieldArrays = DipSimJit.metropolisBlockMatrix, (np.ascontiguousarray(kernel.matrix),)
+        elif isinstance(kernel, TruncatedPairs):
+            function, fieldArrays = DipSimJit.metropolisBlockNeighbours, (kernel.indptr, kernel.target, kernel.vectIJ, kernel.coefI, kernel.coefR)
+        elif type(kernel).addPairFieldFrom is DirectPairs.addPairFieldFrom and type(kernel).pairFieldFrom is DirectPairs.pairFieldFrom:
+            function, fieldArrays = DipSimJit.metropolisBlockDirect, (kernel.positions,)
+        else:
+            return None
+        selfTensors = np.zeros((0, 3, 3)) if kernel.selfTensors is None else np.ascontiguousarray(kernel.selfTensors, dtype=np.float64)
+        intensities = np.ascontiguousarray(self.intensities, dtype=np.float64)
+        def runBlock(indices, newPhis, newThetas, randoms, energyCoef, kbT):
+            return function(self.phi, self.theta, self.moments, self.fields, intensities, selfTensors, indices, newPhis, newThetas, randoms, energyCoef, kbT, *fieldArrays)
+        return runBlock
+
+    """
+    Adds the current energy to the running statistics (Welford algorithm).
+    """
+    def addEnergySample(self):
+        self.nbSamples += 1
+        delta = self.energy - self.energyMean
+        self.energyMean += delta/self.nbSamples
+        self.energyM2 += delta*(self.energy - self.energyMean)
+
+    """
+    Returns the variance of the energy samples (J^2), 0 with less than two samples.
+    """
+    def energyVariance(self):
+        return self.energyM2/(self.nbSamples - 1) if self.nbSamples > 1 else 0.0
+
+######## CHECKPOINTS #########
+
+"""
+Saves the state of a MetropolisChain run to "filePath" every "everyIterations" iterations and/or every "everySeconds"
+seconds of wall time (0 disables the criterion), checked after each block of steps. The file is a .npz archive of
+the chain arrays (angles, moments, local fields), its energy, statistics and random generator state, with the
+positions and the parameters needed to rebuild the run (see loadChainCheckpoint()). Files are replaced atomically,
+a crash during a save keeps the previous checkpoint. The directory of the file is created at the first save.
+
+positions: (N,3) array of positions in distance units
+parameters: parameters of the run, JSON serializable (dict), ex: {"distCoef": -9, "temperature": 4, "nbIteration": 10**6}
+"""
+class ChainCheckpointer:
+    def __init__(self, filePath, positions, parameters, everyIterations=0, everySeconds=0.0):
+        self.filePath = filePath
+        self.positions = np.asarray(positions, dtype=np.float64)
+        self.parameters = dict(parameters)
+        self.everyIterations = everyIterations
+        self.everySeconds = everySeconds
+        self.lastIteration = 0 # iterations done by the chain at the last save
+        self.lastTime = time.monotonic()
+
+    """
+    Saves "chain" if an interval has elapsed since the last save.
+    """
+    def update(self, chain):
+        dueIterations = self.everyIterations > 0 and chain.nbIterationsDone - self.lastIteration >= self.everyIterations
+        dueTime = self.everySeconds > 0 and time.monotonic() - self.lastTime >= self.everySeconds
+        if dueIterations or dueTime:
+            self.save(chain)
+
+    """
+    Saves "chain" now.
+    """
+    def save(self, chain):
+        os.makedirs(os.path.dirname(os.path.abspath(self.filePath)), exist_ok=True)
+        temporaryPath = self.filePath + ".tmp"
+        with open(temporaryPath, "wb") as file:
+            np.savez(file, positions=self.positions, phi=chain.phi, theta=chain.theta, intensities=chain.intensities,
+                     moments=chain.moments, fields=chain.fields, lock2D=chain.lock2D, energy=chain.energy,
+                     nbIterationsDone=chain.nbIterationsDone, nbAccepted=chain.nbAccepted, energyMean=chain.energyMean,
+                     energyM2=chain.energyM2, nbSamples=chain.nbSamples, rngState=json.dumps(chain.rng.bit_generator.state),
+                     parameters=json.dumps(self.parameters))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporaryPath, self.filePath)
+        self.lastIteration = chain.nbIterationsDone
+        self.lastTime = time.monotonic()
+
+    """
+    Removes the checkpoint file, once the chain has finished there is nothing left to resume.
+    """
+    def remove(self):
+        for path in (self.filePath, self.filePath + ".tmp"):
+            if os.path.exists(path):
+                os.remove(path)
+
+"""
+Returns [chain, positions, parameters] of the checkpoint "filePath" saved by ChainCheckpointer: the MetropolisChain
+is rebuilt on the pair kernel of the positions (parameters "distCoef" and "kernelOptions") with the saved arrays and
+random generator state, running it for the remaining iterations gives the same chain as without interruption.
+"""
+def loadChainCheckpoint(filePath):
+    with np.load(filePath) as archive:
+        state = {key: archive[key] for key in archive.files}
+    parameters = json.loads(str(state["parameters"]))
+    kernel = pairKernel(state["positions"], parameters.get("distCoef", 0.0), **parameters.get("kernelOptions", {}))
+    rngState = json.loads(str(state["rngState"]))
+    rng = np.random.Generator(getattr(np.random, rngState["bit_generator"])())
+    rng.bit_generator.state = rngState
+    chain = MetropolisChain.__new__(MetropolisChain)
+    chain.kernel, chain.rng, chain.lock2D = kernel, rng, bool(state["lock2D"])
+    chain.phi, chain.theta = np.array(state["phi"]), np.array(state["theta"])
+    chain.intensities, chain.moments, chain.fields = np.array(state["intensities"]), np.array(state["moments"]), np.array(state["fields"])
+    chain.energy = float(state["energy"])
+    chain.nbIterationsDone, chain.nbAccepted = int(state["nbIterationsDone"]), int(state["nbAccepted"])
+    chain.energyMean, chain.energyM2, chain.nbSamples = float(state["energyMean"]), float(state["energyM2"]), int(state["nbSamples"])
+    return [chain, state["positions"], parameters]
+
+"""
+Runs "nbIteration" Metropolis steps on the moments orientations and returns [phi, theta, energy, nbAccepted].
+See MetropolisChain for the arguments, temperature is in K.
+cancelToken: SolverControl.CancelToken checked between blocks of steps, raises Cancelled once cancelled, can be None
+"""
+def metropolisChain(kernel, phi, theta, intensities, nbIteration, temperature, lock2D=False, rng=None, cancelToken=None):
+    chain = MetropolisChain(kernel, phi, theta, intensities, lock2D, rng)
+    nbAccepted = chain.run(nbIteration, temperature, cancelToken=cancelToken)
+    return [chain.phi, chain.theta, chain.energy, nbAccepted]
+
+######## SIMULATED ANNEALING #########
+
+annealingSchedules = ["linear", "geometric", "adaptive"]
+
+"""
+Runs a simulated annealing from "temperatureStart" to "temperatureEnd" on "chain" in "nbStages" stages of equal length
+and returns the number of accepted moves. The temperature of each stage follows "schedule":
+-linear: linear interpolation between temperatureStart and temperatureEnd
+-geometric: geometric interpolation (both temperatures must be strictly positive)
+-adaptive: geometric cooling whose ratio is squared when the last stage acceptance rate is above 0.6 (cool faster)
+ and square rooted below 0.2 (cool slower), never below temperatureEnd. The last stage is at temperatureEnd.
+
+chain: MetropolisChain to anneal
+nbIteration: total number of iterations (int)
+stageCallback: called after each stage with (iteration, temperature, energy in J, stage acceptance rate), can be None
+cancelToken, progress: see MetropolisChain.run()
+"""
+def simulatedAnnealing(chain, nbIteration, temperatureStart, temperatureEnd, schedule="geometric", nbStages=100, stageCallback=None, cancelToken=None, progress=None):
+    if schedule not in annealingSchedules:
+        raise ValueError("unknown annealing schedule: " + str(schedule))
+    if schedule != "linear" and (temperatureStart <= 0 or temperatureEnd <= 0):
+        raise ValueError(schedule + " annealing needs strictly positive temperatures")
+    nbStages = max(1, min(nbStages, nbIteration))
+    ratio = (temperatureEnd/temperatureStart)**(1/max(nbStages - 1, 1)) if schedule != "linear" else 1.0
+    temperature = temperatureStart
+    nbAccepted = 0
+    for stage in range(nbStages):
+        if stage == nbStages - 1:
+            temperature = temperatureEnd
+        elif schedule == "linear":
+            temperature = temperatureStart + (temperatureEnd - temperatureStart)*stage/(nbStages - 1)
+        elif schedule == "geometric":
+            temperature = temperatureStart*ratio**stage
+        stageIterations = nbIteration*(stage + 1)//nbStages - nbIteration*stage//nbStages
+        stageAccepted = chain.run(stageIterations, temperature, cancelToken=cancelToken, progress=progress)
+        nbAccepted += stageAccepted
+        acceptanceRate = stageAccepted/max(stageIterations, 1)
+        if stageCallback is not None:
+            stageCallback(chain.nbIterationsDone, temperature, chain.energy, acceptanceRate)
+        if schedule == "adaptive":
+            stageRatio = ratio**2 if acceptanceRate > 0.6 else (ratio**0.5 if acceptanceRate < 0.2 else ratio)
+            temperature = max(temperatureEnd, temperature*stageRatio) if temperatureEnd <= temperatureStart else min(temperatureEnd, temperature*stageRatio)
+    return nbAccepted
+
+"""
+Runs one independent Metropolis chain from arrays only, so it can be executed in another process.
+Pair kernel is built (or taken from the cache) inside the process running the chain.
+Returns [phi, theta, energy, nbAccepted] as metropolisChain().
+
+positions: (N,3) array of positions in distance units
+distCoef: power of the distance unit, 0 is meter, -9 is nanometer (float)
+seed: seed (int or numpy.random.SeedSequence) of the chain random generator
+kernelOptions: keyword arguments of DipSimEnergy.pairKernel() (dict), ex: {"cutoff": 1000}
+cancelToken: shared SolverControl.CancelToken (see CancelToken.shared()) stopping the chain from another process, can be None
+other arguments: see metropolisChain()
+"""
+def runReplica(positions, distCoef, phi, theta, intensities, nbIteration, temperature, lock2D=False, seed=None, kernelOptions=None, cancelToken=None):
+    kernel = pairKernel(positions, distCoef, **(kernelOptions or {}))
+    return metropolisChain(kernel, phi, theta, intensities, nbIteration, temperature, lock2D, np.random.default_rng(seed), cancelToken)
+
+"""
+Hosts one replica of parallelTempering() in a process of a pool: its pair kernel and MetropolisChain (local fields)
+are built once and kept between the swap rounds, only commands and energies go through the queues.
+Each command [nbIteration, temperature] of "commands" is answered in "results" by [energy, nbAccepted], or by the
+exception raised by the chain. None ends the replica, which then returns [phi, theta, energy].
+
+commands, results: queues of a multiprocessing manager
+cancelToken: shared SolverControl.CancelToken (see CancelToken.shared()) stopping the chain between blocks, can be None
+other arguments: see runReplica()
+"""
+def replicaServer(positions, distCoef, phi, theta, intensities, lock2D, seed, kernelOptions, commands, results, cancelToken=None):
+    try:
+        chain = MetropolisChain(pairKernel(positions, distCoef, **(kernelOptions or {})), phi, theta, intensities, lock2D, np.random.default_rng(seed))
+        command = commands.get()
+        while command is not None:
+            nbAccepted = chain.run(command[0], command[1], cancelToken=cancelToken)
+            results.put([chain.energy, nbAccepted])
+            command = commands.get()
+    except Exception as error:
+        results.put(error)
+        raise
+    return [chain.phi, chain.theta, chain.energy]
+
+"""
+Replicas of parallelTempering() run one after the other in the calling thread.
+"""
+class LocalReplicas:
+    def __init__(self, positions, distCoef, phi, theta, intensities, lock2D, seeds, kernelOptions):
+        kernel = pairKernel(positions, distCoef, **(kernelOptions or {}))
+        self.chains = [MetropolisChain(kernel, phi, theta, intensities, lock2D, np.random.default_rng(seed)) for seed in seeds]
+
+    """
+    Runs "nbIteration" steps of each replica at its temperature in "temperatures" and returns [energy, nbAccepted] of each.
+    """
+    def run(self, nbIteration, temperatures, cancelToken=None):
+        results = []
+        for chain, temperature in zip(self.chains, temperatures):
+            nbAccepted = chain.run(nbIteration, temperature, cancelToken=cancelToken)
+            results.append([chain.energy, nbAccepted])
+        return results
+
+    """
+    Returns [phi, theta, energy] of each replica, the replicas can not be run anymore.
+    """
+    def finish(self):
+        return [[chain.phi, chain.theta, chain.energy] for chain in self.chains]
+
+    def close(self):
+        pass
+
+"""
+Replicas of parallelTempering() each hosted by a replicaServer() task of "executor", which must have one worker per
+replica (all replicas run at the same time). A cancel reaches the replicas through a shared cancel token.
+"""
+class PoolReplicas:
+    def __init__(self, executor, positions, distCoef, phi, theta, intensities, lock2D, seeds, kernelOptions):
+        self.manager = multiprocessing.get_context("spawn").Manager()
+        self.cancelToken = CancelToken.shared(self.manager)
+        self.commands = [self.manager.Queue() for seed in seeds]
+        self.results = [self.manager.Queue() for seed in seeds]
+        self.futures = [executor.submit(replicaServer, positions, distCoef, phi, theta, intensities, lock2D, seed, kernelOptions, commands, results, self.cancelToken)
+                        for seed, commands, results in zip(seeds, self.commands, self.results)]
+
+    def run(self, nbIteration, temperatures, cancelToken=None):
+        for commands, temperature in zip(self.commands, temperatures):
+            commands.put([nbIteration, temperature])
+        return [self.result(index, cancelToken) for index in range(len(self.commands))]
+
+    """
+    Waits for the answer of replica "index", forwards "cancelToken" to the replicas while waiting and raises the
+    exception of a replica which failed.
+    """
+    def result(self, index, cancelToken=None):
+        while True:
+            try:
+                result = self.results[index].get(timeout=0.25)
+                break
+            except queue.Empty:
+                if cancelToken is not None and cancelToken.isCancelled():
+                    self.cancelToken.cancel()
+                if self.futures[index].done(): # died without answer
+                    self.futures[index].result()
+                    raise RuntimeError("parallel tempering replica " + str(index) + " stopped")
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def finish(self):
+        for commands in self.commands:
+            commands.put(None)
+        return [future.result() for future in self.futures]
+
+    """
+    Stops the replicas still running (cancel or error) and the manager.
+    """
+    def close(self):
+        self.cancelToken.cancel()
+        for commands in self.commands:
+            commands.put(None)
+        for future in self.futures:
+            try:
+                future.result()
+            except Exception:
+                pass
+        self.manager.shutdown()
+
+"""
+Parallel tempering (replica exchange): one replica per temperature of the ladder runs "swapInterval" Metropolis steps,
+then configurations of neighbouring temperatures are swapped with probability min(1, exp((1/kbT_i - 1/kbT_j)(E_i - E_j))).
+Even and odd neighbour pairs are tried alternately. The replicas keep their chain (and its local fields) for the whole
+run: a swap exchanges the temperatures of two replicas rather than their configurations. Returns [phi, theta, energy]
+of the replica at the lowest temperature, the acceptance rate of each temperature and the swap rate of each neighbour
+pair (temperatures[i], temperatures[i+1]).
+
+positions: (N,3) array of positions in distance units
+distCoef: power of the distance unit, 0 is meter, -9 is nanometer (float)
+phi, theta: (N,) arrays of initial angles in radians (physics convention), same start for every replica
+intensities: moment intensity in J/T, scalar or (N,) array
+temperatures: ladder of temperatures in K, all strictly positive
+nbIteration: number of iterations of each replica (int)
+swapInterval: number of iterations between two swap attempts (int)
+lock2D: moments are drawn on a 2D plan (theta=pi/2) or in 3D (bool)
+executor: concurrent.futures process pool with one worker per temperature running the replicas in parallel (see
+PoolReplicas), replicas run one after the other if None
+seed: seed of all random generators (int or numpy.random.SeedSequence)
+kernelOptions: keyword arguments of DipSimEnergy.pairKernel() (dict)
+cancelToken: SolverControl.CancelToken checked between two swap rounds, raises Cancelled once cancelled, can be None
+progress: SolverControl.ProgressReporter receiving the iteration, energy (J) and acceptance rate of the lowest
+temperature replica after each swap round, can be None
+"""
+def parallelTempering(positions, distCoef, phi, theta, intensities, temperatures, nbIteration, swapInterval, lock2D=False, executor=None, seed=None, kernelOptions=None, cancelToken=None, progress=None):
+    temperatures = sorted(temperatures)
+    if temperatures[0] <= 0:
+        raise ValueError("parallel tempering temperatures must be strictly positive")
+    nbReplicas = len(temperatures)
+    seedSequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    swapRng = np.random.default_rng(seedSequence.spawn(1)[0])
+    chainSeeds = seedSequence.spawn(nbReplicas)
+    phi, theta = np.array(phi, dtype=np.float64), np.array(theta, dtype=np.float64)
+    replicaAt = list(range(nbReplicas)) # replica at each temperature
+    energies = np.zeros(nbReplicas) # energy of each replica
+    nbAccepted = np.zeros(nbReplicas)
+    swapsTried = np.zeros(max(nbReplicas - 1, 0))
+    swapsAccepted = np.zeros(max(nbReplicas - 1, 0))
+    swapInterval = max(1, int(swapInterval))
+
+    replicaArgs = (positions, distCoef, phi, theta, intensities, lock2D, chainSeeds, kernelOptions)
+    replicas = LocalReplicas(*replicaArgs) if executor is None else PoolReplicas(executor, *replicaArgs)
+    try:
+        for roundIndex in range(int(ceil(nbIteration/swapInterval))):
+            nbSteps = min(swapInterval, nbIteration - roundIndex*swapInterval)
+            replicaTemperatures = np.empty(nbReplicas)
+            replicaTemperatures[replicaAt] = temperatures
+            results = replicas.run(nbSteps, replicaTemperatures.tolist(), cancelToken)
+            for index, replica in enumerate(replicaAt):
+                energies[replica] = results[replica][0]
+                nbAccepted[index] += results[replica][1]
+
+            for i in range(roundIndex % 2, nbReplicas - 1, 2): # swaps between neighbouring temperatures
+                swapsTried[i] += 1
+                delta = (1/(kb*temperatures[i]) - 1/(kb*temperatures[i + 1]))*(energies[replicaAt[i]] - energies[replicaAt[i + 1]])
+                if delta >= 0 or swapRng.random() < exp(delta):
+                    replicaAt[i], replicaAt[i + 1] = replicaAt[i + 1], replicaAt[i]
+                    swapsAccepted[i] += 1
+
+            iteration = roundIndex*swapInterval + nbSteps
+            if progress is not None:
+                progress.report(iteration, energies[replicaAt[0]], nbAccepted[0]/iteration)
+            if cancelToken is not None:
+                cancelToken.check()
+        states = replicas.finish()
+    finally:
+        replicas.close()
+
+    lowestState = states[replicaAt[0]]
+    acceptanceRates = (nbAccepted/max(nbIteration, 1)).tolist()
+    swapRates = np.divide(swapsAccepted, swapsTried, out=np.zeros_like(swapsAccepted), where=swapsTried > 0).tolist()
+    return [lowestState, acceptanceRates, swapRates]
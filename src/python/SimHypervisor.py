@@ -28,17 +28,23 @@ SOFTWARE.
 This class/file represent the hypervisor, i.e.: main manager, of all properties, interactions between UI/compute and manages all computes happening behind the scene.
 
 """
-from copy import deepcopy
-from math import cos, sin, radians, degrees, sqrt, ceil
+import os
 
-from .DipSim import Dipole, DipModel, LatticeModel
+from .DipSim import DipModel, LatticeModel
 from .BravaisCells import PrimCell, Mono2DCell, TriangleIso2DCell, Ortho2DCell, OrthoCentered2DCell, Tetra2DCell, Hex2DCell, Tri3DCell, Mono3DCell, Ortho3DCell, Tetra3DCell, HexRhomb3DCell, HexHex3DCell, Cube3DCell
-from .DipSimComputor import WorkerMinEnergy
+from .DipSimComputor import WorkerMinEnergy, WorkerEnergyCheck
 from .DipSimUtilities import *
-from .MonteCarlo import MonteCarlo, MonteCarloThreadWorker
+from .MonteCarlo import MonteCarlo, ParallelTempering
+from .MinEnergySolver import minimizers
+from .MonteCarloChain import annealingSchedules
+from .DipSimEnergy import truncations, energyBackends, precisions, pairKernel, supercell, precisionError
+from .DipSimJit import jitAvailable
+from .DipoleStore import DipoleStore, saveDipoles, loadDipoles
+from .LatticeGeneration import randomPositions, readDipolesCSV, exportChunksToCSV
 
-from PySide2.QtCore import QObject, QSettings, Signal, Slot, Property, QSaveFile, QIODevice, QByteArray, QUrl, QDir, QDate, Qt, QFile
-from PySide2.QtGui import QVector3D
+import numpy as np
+
+from PySide2.QtCore import QObject, QSettings, Signal, Slot, Property, QUrl, QDir, QDate, Qt, QThread, QStandardPaths
 
 class SimHypervisor(QObject):
     onLatticeGenerated = Signal()
@@ -47,14 +53,35 @@ class SimHypervisor(QObject):
         super(SimHypervisor, self).__init__(parent)
         self.settings = QSettings()
 
-        self._viewModeList = ["initial dipoles", "minEn dipoles", "minEn M.C. dipoles"]
+        self._viewModeList = ["initial dipoles", "minEn dipoles", "minEn M.C. dipoles", "minEn P.T. dipoles"]
         self._viewModeSelected = self._viewModeList[0]
         self._distCoef = self.settings.value("globalParams/simulation/distCoef", -9.0, float) # distance coef ex -9 indicates 10**-9 m or nm scale
+        self._cutoffRadius = self.settings.value("globalParams/simulation/cutoffRadius", 0.0, float) # 0 is no cutoff (exact sum over all pairs)
+        self._truncationList = list(truncations)
+        self._truncationSelected = self.settings.value("globalParams/simulation/truncationSelected", "shifted", str)
+        self._truncationError = -1.0
+        self._energyBackendList = list(energyBackends)
+        self._energyBackendSelected = self.settings.value("globalParams/simulation/energyBackendSelected", "pairs", str)
+        self._barnesHutTheta = self.settings.value("globalParams/simulation/barnesHutTheta", 0.5, float)
+        self._tileMemoryMB = self.settings.value("globalParams/simulation/tileMemoryMB", 4.0, float)
+        self._kernelInfo = ""
+        self._precisionList = list(precisions)
+        self._precisionSelected = self.settings.value("globalParams/simulation/precisionSelected", "float64", str)
+        self._precisionError = []
+        self._jitEnabled = self.settings.value("globalParams/simulation/jitEnabled", True, bool)
+        self._periodic = self.settings.value("genParams/lattice/periodic", False, bool)
+        self._maxPreviewDipoles = self.settings.value("genParams/lattice/maxPreviewDipoles", 500000, int)
+        self._supercellNa = self.settings.value("genParams/lattice/supercellNa", 4, int)
+        self._supercellNb = self.settings.value("genParams/lattice/supercellNb", 4, int)
+        self._supercellNc = self.settings.value("genParams/lattice/supercellNc", 4, int)
+        self._supercellVectors = None # cell vectors of the periodic supercell generated, None if dipoles are not periodic
 
         # random generation
         self._nbDipolesRdm = self.settings.value("genParams/random/nbDipoles", 500, int)
         self._randomGenModeList = ["round", "square"]
         self._randomGenModeSelected = self.settings.value("genParams/random/randomGenModeSelected", "round", str)
+        self._minSeparation = self.settings.value("genParams/random/minSeparation", 0.0, float)
+        self._seed = self.settings.value("genParams/seed", -1, int)
 
         # bravais cells type
         self.crystal3DTypes = ["tri", "mono", "ortho", "tetra", "hex_hex", "hex_rhomb", "cub", "custom"]
@@ -73,6 +100,8 @@ class SimHypervisor(QObject):
 
         # import generation
         self._importFileURLsStr = []  #self.settings.value("genParams/import/importFileURLsStr", [])
+        self._exportFormatList = ["csv", "npz"]
+        self._exportFormatSelected = self.settings.value("exportParams/exportFormatSelected", "csv", str)
 
         # bravais cells parameters
         self.onLatticeGenerated.connect(lambda : self.setViewModeSelected(self._viewModeList[0]))
@@ -105,20 +134,36 @@ class SimHypervisor(QObject):
         self.dipModelMinEnergy = DipModel([]) #strores last dipoles computed with min energy computed (at 0K)
         self._lastMinEnergy = None
         self._lock2DMinEnergy = self.settings.value("genParams/minEnergy/lock2D", False, bool)
+        self._minimizerList = list(minimizers)
+        self._minimizerSelected = self.settings.value("genParams/minEnergy/minimizerSelected", "CG", str)
+        self._historySizeLBFGS = self.settings.value("genParams/minEnergy/historySizeLBFGS", 10, int)
         self.energyCompute = WorkerMinEnergy(self)
         self.energyCompute.started.connect(self.minEnergyRunningChanged)
         self.energyCompute.finished.connect(self.minEnergyRunningChanged)
         self.energyCompute.finished.connect(lambda : self.setViewModeSelected(self._viewModeList[1]))
         self.energyCompute.resultEnergy.connect(self.setMinEnergy)
         self.energyCompute.resultDips.connect(lambda dips : self.dipModelMinEnergy.replaceAllDipoles(dips))
+        self.energyCompute.kernelInfo.connect(self.setKernelInfo)
+        self._progressMinEnergy = []
+        self.energyCompute.progressReport.connect(self.setProgressMinEnergy)
+        self.energyCompute.started.connect(lambda : self.setProgressMinEnergy())
 
         # energy compute with Monte Carlo
         self.dipModelMinEnergyMC = DipModel([])
-        self.threadPoolMC = [MonteCarloThreadWorker(self)]#*QtCore.QThread.idealThreadCount()
         self._lastMinEnergyMC = None
         self._lock2DMinEnergyMC = self.settings.value("genParams/minEnergyMC/lock2D", False, bool)
         self._nbIterationsMC = self.settings.value("genParams/minEnergyMC/nbIterationsMC", 10000, int)
+        self._nbReplicasMC = self.settings.value("genParams/minEnergyMC/nbReplicasMC", QThread.idealThreadCount(), int)
         self._temperatureMC = self.settings.value("genParams/minEnergyMC/temperatureMC", 4, float)
+        self._annealingMC = self.settings.value("genParams/minEnergyMC/annealingMC", False, bool)
+        self._temperatureStartMC = self.settings.value("genParams/minEnergyMC/temperatureStartMC", 50, float)
+        self._temperatureEndMC = self.settings.value("genParams/minEnergyMC/temperatureEndMC", 1, float)
+        self._annealingScheduleListMC = list(annealingSchedules)
+        self._annealingScheduleMC = self.settings.value("genParams/minEnergyMC/annealingScheduleMC", "geometric", str)
+        self._annealingTraceMC = []
+        self._checkpointMC = self.settings.value("genParams/minEnergyMC/checkpointMC", False, bool)
+        self._checkpointIterationsMC = self.settings.value("genParams/minEnergyMC/checkpointIterationsMC", 0, int)
+        self._checkpointSecondsMC = self.settings.value("genParams/minEnergyMC/checkpointSecondsMC", 600, float)
 
         self.energyComputeMC = MonteCarlo(self)
         self.energyComputeMC.started.connect(self.minEnergyMCRunningChanged)
@@ -126,6 +171,55 @@ class SimHypervisor(QObject):
         self.energyComputeMC.finished.connect(lambda : self.setViewModeSelected(self._viewModeList[2]))
         self.energyComputeMC.resultEnergy.connect(self.setMinEnergyMC)
         self.energyComputeMC.resultDips.connect(lambda dips : self.dipModelMinEnergyMC.replaceAllDipoles(dips))
+        self.energyComputeMC.kernelInfo.connect(self.setKernelInfo)
+        self.energyComputeMC.annealingStep.connect(self.addAnnealingStepMC)
+        self.energyComputeMC.finished.connect(self.checkpointAvailableMCChanged)
+        self._progressMC = []
+        self.energyComputeMC.progressReport.connect(self.setProgressMC)
+        self.energyComputeMC.started.connect(lambda : self.setProgressMC())
+
+        # energy compute with parallel tempering Monte Carlo (lowest temperature replica is kept)
+        self.dipModelMinEnergyPT = DipModel([])
+        self._lastMinEnergyPT = None
+        self._nbIterationsPT = self.settings.value("genParams/minEnergyPT/nbIterationsPT", 10000, int)
+        self._temperatureMinPT = max(self.settings.value("genParams/minEnergyPT/temperatureMinPT", 1, float), self.lowestTemperaturePT)
+        self._temperatureMaxPT = max(self.settings.value("genParams/minEnergyPT/temperatureMaxPT", 50, float), self.lowestTemperaturePT)
+        self._nbTemperaturesPT = self.settings.value("genParams/minEnergyPT/nbTemperaturesPT", max(2, QThread.idealThreadCount()), int)
+        self._swapIntervalPT = self.settings.value("genParams/minEnergyPT/swapIntervalPT", 1000, int)
+        self._acceptanceRatesPT = []
+        self._swapRatesPT = []
+
+        self.temperatureMinPTChanged.connect(self.temperaturesPTChanged)
+        self.temperatureMaxPTChanged.connect(self.temperaturesPTChanged)
+        self.nbTemperaturesPTChanged.connect(self.temperaturesPTChanged)
+
+        self.energyComputePT = ParallelTempering(self)
+        self.energyComputePT.started.connect(self.minEnergyPTRunningChanged)
+        self.energyComputePT.finished.connect(self.minEnergyPTRunningChanged)
+        self.energyComputePT.finished.connect(lambda : self.setViewModeSelected(self._viewModeList[3]))
+        self.energyComputePT.resultEnergy.connect(self.setMinEnergyPT)
+        self.energyComputePT.resultRates.connect(self.setRatesPT)
+        self.energyComputePT.resultDips.connect(lambda dips : self.dipModelMinEnergyPT.replaceAllDipoles(dips))
+        self.energyComputePT.kernelInfo.connect(self.setKernelInfo)
+        self._progressPT = []
+        self.energyComputePT.progressReport.connect(self.setProgressPT)
+        self.energyComputePT.started.connect(lambda : self.setProgressPT())
+
+        # checks of the energy kernels against exact sums, O(N^2) so out of the GUI thread
+        self.truncationCheck = WorkerEnergyCheck(self)
+        self.truncationCheck.started.connect(self.truncationErrorRunningChanged)
+        self.truncationCheck.finished.connect(self.truncationErrorRunningChanged)
+        self.truncationCheck.result.connect(lambda result : self.setTruncationError(result[2]))
+        self._progressTruncationError = []
+        self.truncationCheck.progressReport.connect(self.setProgressTruncationError)
+        self.truncationCheck.started.connect(lambda : self.setProgressTruncationError())
+        self.precisionCheck = WorkerEnergyCheck(self)
+        self.precisionCheck.started.connect(self.precisionErrorRunningChanged)
+        self.precisionCheck.finished.connect(self.precisionErrorRunningChanged)
+        self.precisionCheck.result.connect(self.setPrecisionError)
+        self._progressPrecisionError = []
+        self.precisionCheck.progressReport.connect(self.setProgressPrecisionError)
+        self.precisionCheck.started.connect(lambda : self.setProgressPrecisionError())
 
     ################################################
     ################## PROPERTIES ##################
@@ -182,6 +276,33 @@ class SimHypervisor(QObject):
 
     ############ RANDOM GENERATION ############
 
+    """
+    Qt Property: seed of the random generator of the generations (positions and orientations), the same seed and
+    parameters give the same dipoles. Negative for a new random generation each time.
+    """
+    def getSeed(self):
+        return self._seed
+    def setSeed(self, seed):
+        if seed != self._seed:
+            self._seed = seed
+            self.settings.setValue("genParams/seed", self._seed)
+            self.seedChanged.emit()
+    seedChanged = Signal()
+    seed = Property(int, getSeed, setSeed, notify=seedChanged)
+
+    """
+    Qt Property: minimum distance between random dipoles (0 for no constraint).
+    """
+    def getMinSeparation(self):
+        return self._minSeparation
+    def setMinSeparation(self, minSeparation):
+        if minSeparation != self._minSeparation:
+            self._minSeparation = minSeparation
+            self.settings.setValue("genParams/random/minSeparation", self._minSeparation)
+            self.minSeparationChanged.emit()
+    minSeparationChanged = Signal()
+    minSeparation = Property(float, getMinSeparation, setMinSeparation, notify=minSeparationChanged)
+
     """
     Qt Property: number of random dipoles to generate.
     """
@@ -426,6 +547,82 @@ class SimHypervisor(QObject):
     primCellBetaLockedChanged = Signal()
     primCellBetaLocked = Property(bool, getPrimCellBetaLocked, notify=primCellBetaLockedChanged)
 
+    """
+    Qt Properties: number of lattice points generated (candidates) and kept inside the generation radius by the last
+    lattice generation, shows the efficiency of the index ranges.
+    """
+    def getLatticeCandidates(self):
+        return self.primCell.nbCandidates
+    latticeStatsChanged = Signal()
+    latticeCandidates = Property(int, getLatticeCandidates, notify=latticeStatsChanged)
+
+    def getLatticeKept(self):
+        return self.primCell.nbKept
+    latticeKept = Property(int, getLatticeKept, notify=latticeStatsChanged)
+
+    """
+    Qt Property: maximum number of lattice sites shown in the GUI, larger lattices are previewed on a smaller radius
+    (use PrimCell.latticeStream() to export or compute them in chunks).
+    """
+    def getMaxPreviewDipoles(self):
+        return self._maxPreviewDipoles
+    def setMaxPreviewDipoles(self, maxPreviewDipoles):
+        if maxPreviewDipoles != self._maxPreviewDipoles:
+            self._maxPreviewDipoles = maxPreviewDipoles
+            self.settings.setValue("genParams/lattice/maxPreviewDipoles", self._maxPreviewDipoles)
+            self.maxPreviewDipolesChanged.emit()
+    maxPreviewDipolesChanged = Signal()
+    maxPreviewDipoles = Property(int, getMaxPreviewDipoles, setMaxPreviewDipoles, notify=maxPreviewDipolesChanged)
+
+    ############ PERIODIC SUPERCELL ############
+
+    """
+    Qt Property: lattice is generated as a periodic supercell of supercellNa x supercellNb x supercellNc primitive cells
+    instead of a cluster of radius genSize. Energies are then computed with Ewald summation (per supercell).
+    """
+    def getPeriodic(self):
+        return self._periodic
+    def setPeriodic(self, periodic):
+        if periodic != self._periodic:
+            self._periodic = periodic
+            self.settings.setValue("genParams/lattice/periodic", self._periodic)
+            self.periodicChanged.emit()
+    periodicChanged = Signal()
+    periodic = Property(bool, getPeriodic, setPeriodic, notify=periodicChanged)
+
+    """
+    Qt Properties: number of primitive cells of the periodic supercell along a, b and c (c is ignored in 2D).
+    """
+    def getSupercellNa(self):
+        return self._supercellNa
+    def setSupercellNa(self, supercellNa):
+        if supercellNa != self._supercellNa:
+            self._supercellNa = supercellNa
+            self.settings.setValue("genParams/lattice/supercellNa", self._supercellNa)
+            self.supercellNaChanged.emit()
+    supercellNaChanged = Signal()
+    supercellNa = Property(int, getSupercellNa, setSupercellNa, notify=supercellNaChanged)
+
+    def getSupercellNb(self):
+        return self._supercellNb
+    def setSupercellNb(self, supercellNb):
+        if supercellNb != self._supercellNb:
+            self._supercellNb = supercellNb
+            self.settings.setValue("genParams/lattice/supercellNb", self._supercellNb)
+            self.supercellNbChanged.emit()
+    supercellNbChanged = Signal()
+    supercellNb = Property(int, getSupercellNb, setSupercellNb, notify=supercellNbChanged)
+
+    def getSupercellNc(self):
+        return self._supercellNc
+    def setSupercellNc(self, supercellNc):
+        if supercellNc != self._supercellNc:
+            self._supercellNc = supercellNc
+            self.settings.setValue("genParams/lattice/supercellNc", self._supercellNc)
+            self.supercellNcChanged.emit()
+    supercellNcChanged = Signal()
+    supercellNc = Property(int, getSupercellNc, setSupercellNc, notify=supercellNcChanged)
+
     ############ ENERGY COMPUTE ############
 
     """
@@ -437,17 +634,29 @@ class SimHypervisor(QObject):
         if(not self.energyCompute.isRunning()):
             self.viewModeSelected = self.viewModeList[0]
             self.dipModelMinEnergy.reset()
-            self.energyCompute.compute(deepcopy(self.dipModel.dipoles), self._distCoef, self.lock2DMinEnergy)
+            self.energyCompute.compute(self.dipModel.getDipolesCopy(), self._distCoef, self.lock2DMinEnergy, self.getKernelOptions(), self._minimizerSelected, self._historySizeLBFGS)
             self.energyCompute.start()
 
     """
-    To implement.
-    Cancels minEnergy compute
+    Cancels minEnergy compute: the minimization stops after its current iteration (terminate() of the thread crashes
+    on kubuntu 20.04 with pyside 5.15), no result is kept.
     """
     @Slot()
     def cancelMinEnergyCompute(self):
-        #self.energyCompute.terminate() # crash on kubuntu 20.04 with pyside 5.15 
-        pass
+        self.energyCompute.cancel()
+
+    """
+    Qt Property: last progress report of the minEnergy compute [iteration, energy (eV), acceptance rate, remaining time (s),
+    fraction done], -1 for values unknown, empty before the first report. Reports are throttled to 4 per second.
+    """
+    @Slot(float, float, float, float, float)
+    def setProgressMinEnergy(self, *report):
+        self._progressMinEnergy = list(report)
+        self.progressMinEnergyChanged.emit()
+    def getProgressMinEnergy(self):
+        return list(self._progressMinEnergy)
+    progressMinEnergyChanged = Signal()
+    progressMinEnergy = Property('QVariantList', getProgressMinEnergy, notify=progressMinEnergyChanged)
     
     """
     Qt Property : represent if moments are locked in plane on compute of minimum energy.
@@ -461,6 +670,41 @@ class SimHypervisor(QObject):
             self.lock2DMinEnergyChanged.emit()
     lock2DMinEnergyChanged = Signal()
     lock2DMinEnergy = Property(bool, getLock2DMinEnergy, setLock2DMinEnergy, notify=lock2DMinEnergyChanged)
+
+    """
+    Qt Property: list of minimization methods of the min energy compute (see MinEnergySolver).
+    """
+    def getMinimizerList(self):
+        return list(self._minimizerList)
+    minimizerListChanged = Signal()
+    minimizerList = Property('QVariantList', getMinimizerList, notify=minimizerListChanged)
+
+    """
+    Qt Property: minimization method of the min energy compute, CG (conjugate gradient on the angles) or L-BFGS
+    (on the moments as unit vectors, converges in fewer iterations when moments leave the plane).
+    """
+    def getMinimizerSelected(self):
+        return self._minimizerSelected
+    def setMinimizerSelected(self, minimizerSelected):
+        if minimizerSelected != self._minimizerSelected:
+            self._minimizerSelected = minimizerSelected
+            self.settings.setValue("genParams/minEnergy/minimizerSelected", self._minimizerSelected)
+            self.minimizerSelectedChanged.emit()
+    minimizerSelectedChanged = Signal()
+    minimizerSelected = Property(str, getMinimizerSelected, setMinimizerSelected, notify=minimizerSelectedChanged)
+
+    """
+    Qt Property: number of corrections kept by L-BFGS to approximate the hessian (memory of O(historySize*N)).
+    """
+    def getHistorySizeLBFGS(self):
+        return self._historySizeLBFGS
+    def setHistorySizeLBFGS(self, historySizeLBFGS):
+        if historySizeLBFGS != self._historySizeLBFGS:
+            self._historySizeLBFGS = historySizeLBFGS
+            self.settings.setValue("genParams/minEnergy/historySizeLBFGS", self._historySizeLBFGS)
+            self.historySizeLBFGSChanged.emit()
+    historySizeLBFGSChanged = Signal()
+    historySizeLBFGS = Property(int, getHistorySizeLBFGS, setHistorySizeLBFGS, notify=historySizeLBFGSChanged)
     
     """
     Qt Property: return if min energy MC beeing computed at the time.
@@ -493,17 +737,99 @@ class SimHypervisor(QObject):
         if(not self.energyComputeMC.isRunning()):
             self.viewModeSelected = self.viewModeList[0]
             self.dipModelMinEnergyMC.reset()
-            self.energyComputeMC.compute(deepcopy(self.dipModel.dipoles), self.nbIterationsMC, self.temperatureMC, self._distCoef, self.lock2DMinEnergyMC)
+            self._annealingTraceMC = []
+            self.annealingTraceMCChanged.emit()
+            if self.annealingMC:
+                self.energyComputeMC.compute(self.dipModel.getDipolesCopy(), self.nbIterationsMC, self.temperatureStartMC, self._distCoef, self.lock2DMinEnergyMC, 1, self.temperatureEndMC, self.annealingScheduleMC, self.getKernelOptions())
+            else:
+                checkpointFile = self.getCheckpointFileMC() if self._checkpointMC and self.nbReplicasMC <= 1 else None
+                self.energyComputeMC.compute(self.dipModel.getDipolesCopy(), self.nbIterationsMC, self.temperatureMC, self._distCoef, self.lock2DMinEnergyMC, self.nbReplicasMC, kernelOptions=self.getKernelOptions(),
+                                             checkpointFile=checkpointFile, checkpointIterations=self._checkpointIterationsMC, checkpointSeconds=self._checkpointSecondsMC)
             self.energyComputeMC.start()
 
     """
-    To implement. 
-    Cancels compute of min energy by energyComputeMC.
+    Continues the Monte Carlo run of the last checkpoint (see checkpointMC) where it stopped, results are shown as
+    the ones of computeMinEnergyMC().
+    """
+    @Slot()
+    def resumeMinEnergyComputeMC(self):
+        if not self.energyComputeMC.isRunning() and self.getCheckpointAvailableMC():
+            self.viewModeSelected = self.viewModeList[0]
+            self.dipModelMinEnergyMC.reset()
+            self.energyComputeMC.resume(self.getCheckpointFileMC(), self._checkpointIterationsMC, self._checkpointSecondsMC)
+
+    """
+    Returns the checkpoint file of the Monte Carlo runs, in the application data directory (created by the
+    checkpointer when it first writes).
+    """
+    def getCheckpointFileMC(self):
+        directory = QStandardPaths.writableLocation(QStandardPaths.AppDataLocation)
+        return os.path.join(directory, "monteCarloCheckpoint.npz")
+
+    """
+    Qt Property: state of one chain Monte Carlo runs (fixed temperature, one replica) is saved periodically to a
+    checkpoint file, an interrupted run can be resumed with resumeMinEnergyComputeMC().
+    """
+    def getCheckpointMC(self):
+        return self._checkpointMC
+    def setCheckpointMC(self, checkpointMC):
+        if checkpointMC != self._checkpointMC:
+            self._checkpointMC = checkpointMC
+            self.settings.setValue("genParams/minEnergyMC/checkpointMC", self._checkpointMC)
+            self.checkpointMCChanged.emit()
+    checkpointMCChanged = Signal()
+    checkpointMC = Property(bool, getCheckpointMC, setCheckpointMC, notify=checkpointMCChanged)
+
+    """
+    Qt Properties: interval between two checkpoints in iterations and in seconds of wall time (0 disables the criterion).
+    """
+    def getCheckpointIterationsMC(self):
+        return self._checkpointIterationsMC
+    def setCheckpointIterationsMC(self, checkpointIterationsMC):
+        if checkpointIterationsMC != self._checkpointIterationsMC:
+            self._checkpointIterationsMC = checkpointIterationsMC
+            self.settings.setValue("genParams/minEnergyMC/checkpointIterationsMC", self._checkpointIterationsMC)
+            self.checkpointIterationsMCChanged.emit()
+    checkpointIterationsMCChanged = Signal()
+    checkpointIterationsMC = Property(int, getCheckpointIterationsMC, setCheckpointIterationsMC, notify=checkpointIterationsMCChanged)
+
+    def getCheckpointSecondsMC(self):
+        return self._checkpointSecondsMC
+    def setCheckpointSecondsMC(self, checkpointSecondsMC):
+        if checkpointSecondsMC != self._checkpointSecondsMC:
+            self._checkpointSecondsMC = checkpointSecondsMC
+            self.settings.setValue("genParams/minEnergyMC/checkpointSecondsMC", self._checkpointSecondsMC)
+            self.checkpointSecondsMCChanged.emit()
+    checkpointSecondsMCChanged = Signal()
+    checkpointSecondsMC = Property(float, getCheckpointSecondsMC, setCheckpointSecondsMC, notify=checkpointSecondsMCChanged)
+
+    """
+    Qt Property: a Monte Carlo checkpoint exists and can be resumed.
+    """
+    def getCheckpointAvailableMC(self):
+        return os.path.exists(self.getCheckpointFileMC())
+    checkpointAvailableMCChanged = Signal()
+    checkpointAvailableMC = Property(bool, getCheckpointAvailableMC, notify=checkpointAvailableMCChanged)
+
+    """
+    Cancels compute of min energy by energyComputeMC: the chain stops after its current block of iterations (a
+    checkpointed run saves its state first and can be resumed), no result is kept.
     """
     @Slot()
     def cancelMinEnergyComputeMC(self):
-        #self.energyComputeMC.terminate()
-        pass
+        self.energyComputeMC.cancel()
+
+    """
+    Qt Property: last progress report of the Monte Carlo compute (see progressMinEnergy).
+    """
+    @Slot(float, float, float, float, float)
+    def setProgressMC(self, *report):
+        self._progressMC = list(report)
+        self.progressMCChanged.emit()
+    def getProgressMC(self):
+        return list(self._progressMC)
+    progressMCChanged = Signal()
+    progressMC = Property('QVariantList', getProgressMC, notify=progressMCChanged)
     
     """
     Qt Property : represent if moments are locked in plane on compute of minimum energy with Monte Carlo.
@@ -551,6 +877,20 @@ class SimHypervisor(QObject):
     nbIterationsMCChanged = Signal()
     nbIterationsMC = Property(int, getNbIterationsMC, setNbIterationsMC, notify=nbIterationsMCChanged)
 
+    """
+    Qt Property: number of independent Monte Carlo chains (replicas) run in parallel processes, each one doing nbIterationsMC
+    iterations. The configuration of minimum energy is kept. 1 runs a single chain in the compute thread.
+    """
+    def getNbReplicasMC(self):
+        return self._nbReplicasMC
+    def setNbReplicasMC(self, nbReplicasMC):
+        if nbReplicasMC != self._nbReplicasMC:
+            self._nbReplicasMC = nbReplicasMC
+            self.settings.setValue("genParams/minEnergyMC/nbReplicasMC", self._nbReplicasMC)
+            self.nbReplicasMCChanged.emit()
+    nbReplicasMCChanged = Signal()
+    nbReplicasMC = Property(int, getNbReplicasMC, setNbReplicasMC, notify=nbReplicasMCChanged)
+
     """
     Qt Property: temperature to compute with in Monte Carlo approach. Determines the probability of a non minimizing
     state beeing choosen in a Monte Carlo iteration.
@@ -565,6 +905,229 @@ class SimHypervisor(QObject):
     temperatureMCChanged = Signal()
     temperatureMC = Property(float, getTemperatureMC, setTemperatureMC, notify=temperatureMCChanged)
 
+    """
+    Qt Property: if true, Monte Carlo is a simulated annealing from temperatureStartMC to temperatureEndMC (on one chain)
+    instead of a run at the fixed temperatureMC.
+    """
+    def getAnnealingMC(self):
+        return self._annealingMC
+    def setAnnealingMC(self, annealingMC):
+        if annealingMC != self._annealingMC:
+            self._annealingMC = annealingMC
+            self.settings.setValue("genParams/minEnergyMC/annealingMC", self._annealingMC)
+            self.annealingMCChanged.emit()
+    annealingMCChanged = Signal()
+    annealingMC = Property(bool, getAnnealingMC, setAnnealingMC, notify=annealingMCChanged)
+
+    """
+    Qt Property: start temperature of the simulated annealing.
+    """
+    def getTemperatureStartMC(self):
+        return self._temperatureStartMC
+    def setTemperatureStartMC(self, temperatureStartMC):
+        if temperatureStartMC != self._temperatureStartMC:
+            self._temperatureStartMC = temperatureStartMC
+            self.settings.setValue("genParams/minEnergyMC/temperatureStartMC", self._temperatureStartMC)
+            self.temperatureStartMCChanged.emit()
+    temperatureStartMCChanged = Signal()
+    temperatureStartMC = Property(float, getTemperatureStartMC, setTemperatureStartMC, notify=temperatureStartMCChanged)
+
+    """
+    Qt Property: end temperature of the simulated annealing.
+    """
+    def getTemperatureEndMC(self):
+        return self._temperatureEndMC
+    def setTemperatureEndMC(self, temperatureEndMC):
+        if temperatureEndMC != self._temperatureEndMC:
+            self._temperatureEndMC = temperatureEndMC
+            self.settings.setValue("genParams/minEnergyMC/temperatureEndMC", self._temperatureEndMC)
+            self.temperatureEndMCChanged.emit()
+    temperatureEndMCChanged = Signal()
+    temperatureEndMC = Property(float, getTemperatureEndMC, setTemperatureEndMC, notify=temperatureEndMCChanged)
+
+    """
+    Qt Property: list of annealing schedules shapes available.
+    """
+    def getAnnealingScheduleListMC(self):
+        return list(self._annealingScheduleListMC)
+    annealingScheduleListMCChanged = Signal()
+    annealingScheduleListMC = Property('QVariantList', getAnnealingScheduleListMC, notify=annealingScheduleListMCChanged)
+
+    """
+    Qt Property: shape of the annealing schedule currently selected (linear, geometric or adaptive on acceptance rate).
+    """
+    def getAnnealingScheduleMC(self):
+        return self._annealingScheduleMC
+    def setAnnealingScheduleMC(self, annealingScheduleMC):
+        if annealingScheduleMC != self._annealingScheduleMC:
+            self._annealingScheduleMC = annealingScheduleMC
+            self.settings.setValue("genParams/minEnergyMC/annealingScheduleMC", self._annealingScheduleMC)
+            self.annealingScheduleMCChanged.emit()
+    annealingScheduleMCChanged = Signal()
+    annealingScheduleMC = Property(str, getAnnealingScheduleMC, setAnnealingScheduleMC, notify=annealingScheduleMCChanged)
+
+    """
+    Qt Property: energy versus iteration of the running (or last) annealing, as a list of [iteration, temperature (K), energy (eV)].
+    Filled while the annealing runs, one point per stage.
+    """
+    @Slot(float, float, float)
+    def addAnnealingStepMC(self, iteration, temperature, energy):
+        self._annealingTraceMC.append([iteration, temperature, energy])
+        self.annealingTraceMCChanged.emit()
+    def getAnnealingTraceMC(self):
+        return list(self._annealingTraceMC)
+    annealingTraceMCChanged = Signal()
+    annealingTraceMC = Property('QVariantList', getAnnealingTraceMC, notify=annealingTraceMCChanged)
+
+    ############ ENERGY COMPUTE PARALLEL TEMPERING ############
+
+    """
+    Starts compute of min energy by energyComputePT with parallel tempering (replica exchange) by passing a copy of current
+    initial dipoles. Moments are locked in plane with the same option as Monte Carlo (lock2DMinEnergyMC).
+    """
+    @Slot()
+    def computeMinEnergyPT(self):
+        if(not self.energyComputePT.isRunning()):
+            self.viewModeSelected = self.viewModeList[0]
+            self.dipModelMinEnergyPT.reset()
+            self.energyComputePT.compute(self.dipModel.getDipolesCopy(), self.nbIterationsPT, self.temperaturesPT, self.swapIntervalPT, self._distCoef, self.lock2DMinEnergyMC, self.getKernelOptions())
+
+    """
+    Cancels compute of min energy by energyComputePT after its current swap round, no result is kept.
+    """
+    @Slot()
+    def cancelMinEnergyComputePT(self):
+        self.energyComputePT.cancel()
+
+    """
+    Qt Property: last progress report of the parallel tempering compute, lowest temperature replica (see progressMinEnergy).
+    """
+    @Slot(float, float, float, float, float)
+    def setProgressPT(self, *report):
+        self._progressPT = list(report)
+        self.progressPTChanged.emit()
+    def getProgressPT(self):
+        return list(self._progressPT)
+    progressPTChanged = Signal()
+    progressPT = Property('QVariantList', getProgressPT, notify=progressPTChanged)
+
+    """
+    Qt Property : return if min energy with parallel tempering beeing computed at the time.
+    """
+    def getMinEnergyPTRunning(self):
+        return self.energyComputePT.isRunning()
+    minEnergyPTRunningChanged = Signal()
+    minEnergyPTRunning = Property(bool, getMinEnergyPTRunning, notify=minEnergyPTRunningChanged)
+
+    """
+    Qt Property: last computed minimum energy of the lowest temperature replica of parallel tempering.
+    """
+    def getMinEnergyPT(self):
+        return self._lastMinEnergyPT
+    def setMinEnergyPT(self, minEnergyPT):
+        if minEnergyPT != self._lastMinEnergyPT:
+            self._lastMinEnergyPT = minEnergyPT
+            self.minEnergyPTChanged.emit()
+    minEnergyPTChanged = Signal()
+    minEnergyPT = Property(float, getMinEnergyPT, setMinEnergyPT, notify=minEnergyPTChanged)
+
+    """
+    Qt Property: number of iteration done by each replica of parallel tempering.
+    """
+    def getNbIterationsPT(self):
+        return self._nbIterationsPT
+    def setNbIterationsPT(self, nbIterationsPT):
+        if nbIterationsPT != self._nbIterationsPT:
+            self._nbIterationsPT = nbIterationsPT
+            self.settings.setValue("genParams/minEnergyPT/nbIterationsPT", self._nbIterationsPT)
+            self.nbIterationsPTChanged.emit()
+    nbIterationsPTChanged = Signal()
+    nbIterationsPT = Property(int, getNbIterationsPT, setNbIterationsPT, notify=nbIterationsPTChanged)
+
+    """
+    Qt Property: lowest temperature of the parallel tempering ladder (the one reported), at least lowestTemperaturePT
+    (the ladder is geometric, a temperature of 0 K has no ratio).
+    """
+    lowestTemperaturePT = 0.01 # K
+    def getTemperatureMinPT(self):
+        return self._temperatureMinPT
+    def setTemperatureMinPT(self, temperatureMinPT):
+        temperatureMinPT = max(temperatureMinPT, self.lowestTemperaturePT)
+        if temperatureMinPT != self._temperatureMinPT:
+            self._temperatureMinPT = temperatureMinPT
+            self.settings.setValue("genParams/minEnergyPT/temperatureMinPT", self._temperatureMinPT)
+            self.temperatureMinPTChanged.emit()
+    temperatureMinPTChanged = Signal()
+    temperatureMinPT = Property(float, getTemperatureMinPT, setTemperatureMinPT, notify=temperatureMinPTChanged)
+
+    """
+    Qt Property: highest temperature of the parallel tempering ladder, at least lowestTemperaturePT.
+    """
+    def getTemperatureMaxPT(self):
+        return self._temperatureMaxPT
+    def setTemperatureMaxPT(self, temperatureMaxPT):
+        temperatureMaxPT = max(temperatureMaxPT, self.lowestTemperaturePT)
+        if temperatureMaxPT != self._temperatureMaxPT:
+            self._temperatureMaxPT = temperatureMaxPT
+            self.settings.setValue("genParams/minEnergyPT/temperatureMaxPT", self._temperatureMaxPT)
+            self.temperatureMaxPTChanged.emit()
+    temperatureMaxPTChanged = Signal()
+    temperatureMaxPT = Property(float, getTemperatureMaxPT, setTemperatureMaxPT, notify=temperatureMaxPTChanged)
+
+    """
+    Qt Property: number of temperatures (and replicas, run in parallel processes) of the parallel tempering ladder.
+    """
+    def getNbTemperaturesPT(self):
+        return self._nbTemperaturesPT
+    def setNbTemperaturesPT(self, nbTemperaturesPT):
+        if nbTemperaturesPT != self._nbTemperaturesPT:
+            self._nbTemperaturesPT = nbTemperaturesPT
+            self.settings.setValue("genParams/minEnergyPT/nbTemperaturesPT", self._nbTemperaturesPT)
+            self.nbTemperaturesPTChanged.emit()
+    nbTemperaturesPTChanged = Signal()
+    nbTemperaturesPT = Property(int, getNbTemperaturesPT, setNbTemperaturesPT, notify=nbTemperaturesPTChanged)
+
+    """
+    Qt Property: number of iterations between two swaps attempts between neighbouring temperatures.
+    """
+    def getSwapIntervalPT(self):
+        return self._swapIntervalPT
+    def setSwapIntervalPT(self, swapIntervalPT):
+        if swapIntervalPT != self._swapIntervalPT:
+            self._swapIntervalPT = swapIntervalPT
+            self.settings.setValue("genParams/minEnergyPT/swapIntervalPT", self._swapIntervalPT)
+            self.swapIntervalPTChanged.emit()
+    swapIntervalPTChanged = Signal()
+    swapIntervalPT = Property(int, getSwapIntervalPT, setSwapIntervalPT, notify=swapIntervalPTChanged)
+
+    """
+    Qt Property: temperatures of the ladder, geometrically spaced between temperatureMinPT and temperatureMaxPT.
+    """
+    def getTemperaturesPT(self):
+        nbTemperatures = max(2, self._nbTemperaturesPT)
+        temperatureMin = max(self._temperatureMinPT, self.lowestTemperaturePT)
+        ratio = (max(self._temperatureMaxPT, self.lowestTemperaturePT)/temperatureMin)**(1/(nbTemperatures - 1))
+        return [temperatureMin*ratio**i for i in range(nbTemperatures)]
+    temperaturesPTChanged = Signal()
+    temperaturesPT = Property('QVariantList', getTemperaturesPT, notify=temperaturesPTChanged)
+
+    """
+    Qt Properties: acceptance rate of each temperature and swap rate of each pair of neighbouring temperatures
+    of the last parallel tempering compute. Used to tune the ladder.
+    """
+    @Slot(list, list)
+    def setRatesPT(self, acceptanceRatesPT, swapRatesPT):
+        self._acceptanceRatesPT = acceptanceRatesPT
+        self._swapRatesPT = swapRatesPT
+        self.ratesPTChanged.emit()
+    ratesPTChanged = Signal()
+    def getAcceptanceRatesPT(self):
+        return list(self._acceptanceRatesPT)
+    acceptanceRatesPT = Property('QVariantList', getAcceptanceRatesPT, notify=ratesPTChanged)
+    def getSwapRatesPT(self):
+        return list(self._swapRatesPT)
+    swapRatesPT = Property('QVariantList', getSwapRatesPT, notify=ratesPTChanged)
+
     ############ IMPORT/EXPORT ############
 
     """
@@ -581,31 +1144,76 @@ class SimHypervisor(QObject):
             self.exportDipsToURL(self.dipModelMinEnergy.getDipolesCopy(), directoryURL, self.viewModeList[1], addDateToExport)
         if boolListToExport[2]: # exports minEn M.C. dipoles
             self.exportDipsToURL(self.dipModelMinEnergyMC.getDipolesCopy(), directoryURL, self.viewModeList[2], addDateToExport)
+        if len(boolListToExport) > 3 and boolListToExport[3]: # exports minEn P.T. dipoles
+            self.exportDipsToURL(self.dipModelMinEnergyPT.getDipolesCopy(), directoryURL, self.viewModeList[3], addDateToExport)
     
     """
-    Export dipoles in .csv file.
-    Columns order is : x,y,z, phi, theta, moment.
-    dipoles : dipoles to export
+    Export dipoles in a .csv file (columns order is : x,y,z, phi, theta, moment) or in a binary .npz file with the
+    metadata of the simulation (see DipoleStore.saveDipoles()), with respect to exportFormatSelected.
+    dipoles : dipoles to export (DipoleStore)
     directoryURL : directory to export dipoles to.
     fileName : file name to save dipoles to.
     addDateToExport : specify if date and time should be added to export file name.
     """
     def exportDipsToURL(self, dipoles, directoryURL, fileName, addDateToExport = True):
         dateStr = ("-" + QDate.currentDate().toString(Qt.ISODate)) if addDateToExport else ""
-        filename = QUrl(directoryURL).toLocalFile() + (QDir.separator() + fileName + dateStr + ".csv").replace(" ", "_")
-        file = QSaveFile(filename)
-        file.open(QIODevice.WriteOnly)
-        file.write(QByteArray(bytearray("x,y,z,phi (°),theta (°),moment (mu_B)\n", 'utf-8')))
-        for dip in dipoles:
-            angles = anglesQuaternionToSph(dip.quaternion)
-            line = str(dip.position.x()) + "," + str(dip.position.y()) + "," + str(dip.position.z()) + "," + str(degrees(angles[0])) + "," + str(degrees(angles[1])) + "," + str(dip.moment) + "\n"
-            line = QByteArray(bytearray(line, 'utf-8'))
-            file.write(line)
-        file.commit()
-        if(file.errorString() == "Unknown error"):
-            return True
-        else:
+        filename = QUrl(directoryURL).toLocalFile() + (QDir.separator() + fileName + dateStr + "." + self._exportFormatSelected).replace(" ", "_")
+        try:
+            if self._exportFormatSelected == "npz":
+                saveDipoles(dipoles, filename, self.exportMetadata(fileName))
+            else:
+                exportChunksToCSV([dipoles], filename)
+        except OSError as error:
+            print("impossible to export to \" " + filename + " \", error is:" + str(error))
             return False
+        return True
+
+    """
+    Returns the metadata saved with dipoles of view "viewMode" (one of self.viewModeList) in binary exports:
+    simulation parameters, generation (lattice) parameters and parameters of the solver which computed them.
+    """
+    def exportMetadata(self, viewMode):
+        metadata = {"viewMode": viewMode, "distCoef": self._distCoef,
+                    "simulation": {"cutoffRadius": self._cutoffRadius, "truncation": self._truncationSelected, "energyBackend": self._energyBackendSelected}}
+        lattice = {"generateMode": self._generateMode, "genSize": self._genSize, "is2D": self._is2D, "seed": self._seed}
+        if self._generateMode == "Lattice":
+            lattice.update({"crystalType": self.primCell.crystalType, "crystalFamily": self.primCell.crystalFamily,
+                            "a": self.primCell.a, "b": self.primCell.b, "c": self.primCell.c,
+                            "alpha": self.primCell.alpha, "beta": self.primCell.beta, "gamma": self.primCell.gamma})
+        if self._supercellVectors is not None:
+            lattice["cellVectors"] = np.asarray(self._supercellVectors).tolist()
+        metadata["lattice"] = lattice
+        if viewMode == self._viewModeList[1]:
+            metadata["solver"] = {"method": self._minimizerSelected, "lock2D": self._lock2DMinEnergy, "energy": self._lastMinEnergy}
+        elif viewMode == self._viewModeList[2]:
+            metadata["solver"] = {"method": "annealing" if self._annealingMC else "MC", "lock2D": self._lock2DMinEnergyMC, "energy": self._lastMinEnergyMC,
+                                  "nbIterations": self._nbIterationsMC, "nbReplicas": self._nbReplicasMC, "temperature": self._temperatureMC,
+                                  "temperatureStart": self._temperatureStartMC, "temperatureEnd": self._temperatureEndMC, "schedule": self._annealingScheduleMC}
+        elif viewMode == self._viewModeList[3]:
+            metadata["solver"] = {"method": "PT", "energy": self._lastMinEnergyPT, "nbIterations": self._nbIterationsPT,
+                                  "temperatures": self.getTemperaturesPT(), "swapInterval": self._swapIntervalPT}
+        return metadata
+
+    """
+    Qt Property: list of export file formats (csv: text table, npz: binary arrays with metadata, memory mapped on import).
+    """
+    def getExportFormatList(self):
+        return list(self._exportFormatList)
+    exportFormatListChanged = Signal()
+    exportFormatList = Property('QVariantList', getExportFormatList, notify=exportFormatListChanged)
+
+    """
+    Qt Property: export file format currently selected.
+    """
+    def getExportFormatSelected(self):
+        return self._exportFormatSelected
+    def setExportFormatSelected(self, exportFormatSelected):
+        if exportFormatSelected != self._exportFormatSelected:
+            self._exportFormatSelected = exportFormatSelected
+            self.settings.setValue("exportParams/exportFormatSelected", self._exportFormatSelected)
+            self.exportFormatSelectedChanged.emit()
+    exportFormatSelectedChanged = Signal()
+    exportFormatSelected = Property(str, getExportFormatSelected, setExportFormatSelected, notify=exportFormatSelectedChanged)
 
     """
     Qt Property: all imports URLs to import dipoles from.
@@ -623,26 +1231,33 @@ class SimHypervisor(QObject):
     importFileURLsStr = Property('QStringList', getImportFileURLsStr, setImportFileURLsStr, notify=importFileURLsStrChanged)
 
     """
-    Import dipoles from .csv file and places them in intial dipoles.
-    Columns order is : x,y,z, phi, theta, moment.
+    Import dipoles from .csv files (columns order is : x,y,z, phi, theta, moment) and binary .npz files (see
+    DipoleStore.loadDipoles()) and places them in intial dipoles. A single .npz file is memory mapped and restores
+    the periodic cell vectors it was exported with.
     fileURLsStr: string of url of file to import.
     """
     def importDips(self, fileURLsStr):
-        self.dipModel.reset()
-        for filePath in fileURLsStr:
-            file = QFile(QUrl(filePath).toLocalFile())
-            if (not file.open(QIODevice.ReadOnly)):
-                print("impossible to open file \" " + filePath +" \", error is:" + file.errorString())
+        filePaths = [QUrl(filePath).toLocalFile() for filePath in fileURLsStr]
+        csvPaths = [filePath for filePath in filePaths if not filePath.lower().endswith(".npz")]
+        dipoles = readDipolesCSV(csvPaths) if csvPaths else None
+        self._supercellVectors = None
+        for filePath in filePaths:
+            if filePath in csvPaths:
+                continue
+            try:
+                fileDipoles, metadata = loadDipoles(filePath)
+            except (OSError, ValueError, KeyError) as error:
+                print("impossible to import file \" " + filePath +" \", error is:" + str(error))
                 continue
-            while not file.atEnd():
-                line = str(file.readLine(), encoding='utf-8')
-                lineCells = line.split(',')
-                try:
-                    float(lineCells[0])
-                except ValueError:
-                    continue
-                dip = Dipole.initByComposent(xPos=float(lineCells[0]), yPos=float(lineCells[1]), zPos=float(lineCells[2]), quaternion=anglesSphToQuaternion(float(lineCells[3]), float(lineCells[4])), parent=self.dipModel)
-                self.dipModel.append(dip)
+            if metadata.get("distCoef", self._distCoef) != self._distCoef:
+                print("\"" + filePath + "\" was exported with distCoef " + str(metadata["distCoef"]) + ", current is " + str(self._distCoef))
+            if dipoles is None:
+                dipoles = fileDipoles
+                cellVectors = metadata.get("lattice", {}).get("cellVectors")
+                self._supercellVectors = None if cellVectors is None or len(filePaths) > 1 else np.array(cellVectors, dtype=np.float64)
+            else:
+                dipoles.extend(fileDipoles)
+        self.dipModel.replaceAllDipoles(DipoleStore() if dipoles is None else dipoles)
 
 
     ############ GLOBAL PARAMS ############
@@ -660,6 +1275,276 @@ class SimHypervisor(QObject):
     distCoefChanged = Signal()
     distCoef = Property(float, getDistCoef, setDistCoef, notify=distCoefChanged)
 
+    """
+    Qt Property: cutoff radius of the dipole-dipole interaction in distance units (same as positions). Pairs further apart
+    are neglected and the remaining ones are found with a k-d tree. 0 computes the exact sum over all pairs.
+    """
+    def getCutoffRadius(self):
+        return self._cutoffRadius
+    def setCutoffRadius(self, cutoffRadius):
+        if cutoffRadius != self._cutoffRadius:
+            self._cutoffRadius = cutoffRadius
+            self.settings.setValue("globalParams/simulation/cutoffRadius", self._cutoffRadius)
+            self.cutoffRadiusChanged.emit()
+    cutoffRadiusChanged = Signal()
+    cutoffRadius = Property(float, getCutoffRadius, setCutoffRadius, notify=cutoffRadiusChanged)
+
+    """
+    Qt Property: list of truncations available at the cutoff radius.
+    """
+    def getTruncationList(self):
+        return list(self._truncationList)
+    truncationListChanged = Signal()
+    truncationList = Property('QVariantList', getTruncationList, notify=truncationListChanged)
+
+    """
+    Qt Property: truncation of the interaction at the cutoff radius (shifted or smooth).
+    """
+    def getTruncationSelected(self):
+        return self._truncationSelected
+    def setTruncationSelected(self, truncationSelected):
+        if truncationSelected != self._truncationSelected:
+            self._truncationSelected = truncationSelected
+            self.settings.setValue("globalParams/simulation/truncationSelected", self._truncationSelected)
+            self.truncationSelectedChanged.emit()
+    truncationSelectedChanged = Signal()
+    truncationSelected = Property(str, getTruncationSelected, setTruncationSelected, notify=truncationSelectedChanged)
+
+    """
+    Qt Property: relative error of the truncated energy against the exact sum over all pairs, for the dipoles currently
+    viewed. -1 if not computed yet, see computeTruncationError().
+    """
+    def getTruncationError(self):
+        return self._truncationError
+    @Slot(float)
+    def setTruncationError(self, truncationError):
+        self._truncationError = truncationError
+        self.truncationErrorChanged.emit()
+    truncationErrorChanged = Signal()
+    truncationError = Property(float, getTruncationError, notify=truncationErrorChanged)
+
+    """
+    Computes truncationError for the dipoles currently viewed in the truncationCheck thread. The exact sum is O(N^2)
+    in time, it is summed by tiles of tileMemoryMB (see TiledPairs) and can be cancelled between two tiles.
+    """
+    @Slot()
+    def computeTruncationError(self):
+        if self.truncationCheck.isRunning():
+            return
+        dipoles = [self.dipModel, self.dipModelMinEnergy, self.dipModelMinEnergyMC, self.dipModelMinEnergyPT][self._viewModeList.index(self._viewModeSelected)].getDipolesCopy()
+        if len(dipoles) < 2 or self._cutoffRadius <= 0:
+            self.setTruncationError(0.0)
+            return
+        distCoef, cutoff, truncation, jit = self._distCoef, self._cutoffRadius, self._truncationSelected, self._jitEnabled
+        memoryBudget = int(self._tileMemoryMB*1024**2)
+        self.truncationCheck.compute(lambda cancelToken, progress : pairKernel(dipoles.positions, distCoef, cutoff=cutoff, truncation=truncation, jit=jit).truncationError(dipoles.moments(), memoryBudget, cancelToken, progress))
+
+    """
+    Cancels the truncationError compute before its next tile of pairs, the last value is kept.
+    """
+    @Slot()
+    def cancelTruncationError(self):
+        self.truncationCheck.cancel()
+
+    """
+    Qt Property: return if truncationError is being computed.
+    """
+    def getTruncationErrorRunning(self):
+        return self.truncationCheck.isRunning()
+    truncationErrorRunningChanged = Signal()
+    truncationErrorRunning = Property(bool, getTruncationErrorRunning, notify=truncationErrorRunningChanged)
+
+    """
+    Qt Property: last progress report of the truncationError compute, see progressMinEnergy (fraction of the tiles done).
+    """
+    @Slot(float, float, float, float, float)
+    def setProgressTruncationError(self, *report):
+        self._progressTruncationError = list(report)
+        self.progressTruncationErrorChanged.emit()
+    def getProgressTruncationError(self):
+        return list(self._progressTruncationError)
+    progressTruncationErrorChanged = Signal()
+    progressTruncationError = Property('QVariantList', getProgressTruncationError, notify=progressTruncationErrorChanged)
+
+    """
+    Qt Property: list of backends available to compute the dipole-dipole interaction.
+    """
+    def getEnergyBackendList(self):
+        return list(self._energyBackendList)
+    energyBackendListChanged = Signal()
+    energyBackendList = Property('QVariantList', getEnergyBackendList, notify=energyBackendListChanged)
+
+    """
+    Qt Property: backend of the dipole-dipole interaction, pairs (exact or with cutoff), barnesHut (approximate, for large systems)
+    or tiled (exact, in bounded memory, for large systems).
+    """
+    def getEnergyBackendSelected(self):
+        return self._energyBackendSelected
+    def setEnergyBackendSelected(self, energyBackendSelected):
+        if energyBackendSelected != self._energyBackendSelected:
+            self._energyBackendSelected = energyBackendSelected
+            self.settings.setValue("globalParams/simulation/energyBackendSelected", self._energyBackendSelected)
+            self.energyBackendSelectedChanged.emit()
+    energyBackendSelectedChanged = Signal()
+    energyBackendSelected = Property(str, getEnergyBackendSelected, setEnergyBackendSelected, notify=energyBackendSelectedChanged)
+
+    """
+    Qt Property: opening angle of the Barnes-Hut backend (cell size / distance). Smaller is more accurate and slower.
+    """
+    def getBarnesHutTheta(self):
+        return self._barnesHutTheta
+    def setBarnesHutTheta(self, barnesHutTheta):
+        if barnesHutTheta != self._barnesHutTheta:
+            self._barnesHutTheta = barnesHutTheta
+            self.settings.setValue("globalParams/simulation/barnesHutTheta", self._barnesHutTheta)
+            self.barnesHutThetaChanged.emit()
+    barnesHutThetaChanged = Signal()
+    barnesHutTheta = Property(float, getBarnesHutTheta, setBarnesHutTheta, notify=barnesHutThetaChanged)
+
+    """
+    Qt Property: memory of a tile of the tiled pair kernel in MB (used by the tiled backend and by the pairs backend
+    when the interaction tensors do not fit in the cache). A few MB keeps the tiles in the CPU caches.
+    """
+    def getTileMemoryMB(self):
+        return self._tileMemoryMB
+    def setTileMemoryMB(self, tileMemoryMB):
+        if tileMemoryMB != self._tileMemoryMB and tileMemoryMB > 0:
+            self._tileMemoryMB = tileMemoryMB
+            self.settings.setValue("globalParams/simulation/tileMemoryMB", self._tileMemoryMB)
+            self.tileMemoryMBChanged.emit()
+    tileMemoryMBChanged = Signal()
+    tileMemoryMB = Property(float, getTileMemoryMB, setTileMemoryMB, notify=tileMemoryMBChanged)
+
+    """
+    Qt Property: list of precisions of the exact pair sum.
+    """
+    def getPrecisionList(self):
+        return list(self._precisionList)
+    precisionListChanged = Signal()
+    precisionList = Property('QVariantList', getPrecisionList, notify=precisionListChanged)
+
+    """
+    Qt Property: precision of the exact pair sum (pairs backend without cutoff and tiled backend). float32 evaluates
+    the pairs of each tile in single precision (faster, half the memory traffic) and accumulates the tiles in float64,
+    see DipSimEnergy.TiledPairs.relativeErrorBound(). The conjugate gradient may stop earlier at the float32 noise.
+    """
+    def getPrecisionSelected(self):
+        return self._precisionSelected
+    def setPrecisionSelected(self, precisionSelected):
+        if precisionSelected != self._precisionSelected:
+            self._precisionSelected = precisionSelected
+            self.settings.setValue("globalParams/simulation/precisionSelected", self._precisionSelected)
+            self.precisionSelectedChanged.emit()
+    precisionSelectedChanged = Signal()
+    precisionSelected = Property(str, getPrecisionSelected, setPrecisionSelected, notify=precisionSelectedChanged)
+
+    """
+    Qt Property: [measured, bound] relative errors of the float32 energy against float64 for the dipoles currently
+    viewed, empty if not computed yet, see computePrecisionError().
+    """
+    def getPrecisionError(self):
+        return list(self._precisionError)
+    @Slot(list)
+    def setPrecisionError(self, precisionError):
+        self._precisionError = list(precisionError)
+        self.precisionErrorChanged.emit()
+    precisionErrorChanged = Signal()
+    precisionError = Property('QVariantList', getPrecisionError, notify=precisionErrorChanged)
+
+    """
+    Computes precisionError for the dipoles currently viewed in the precisionCheck thread: the float64 and float32
+    energies and the scale of the bound are O(N^2) in time, summed by tiles of tileMemoryMB (see TiledPairs).
+    """
+    @Slot()
+    def computePrecisionError(self):
+        if self.precisionCheck.isRunning():
+            return
+        dipoles = [self.dipModel, self.dipModelMinEnergy, self.dipModelMinEnergyMC, self.dipModelMinEnergyPT][self._viewModeList.index(self._viewModeSelected)].getDipolesCopy()
+        if len(dipoles) < 2:
+            self.setPrecisionError([0.0, 0.0])
+            return
+        distCoef, memoryBudget, jit = self._distCoef, int(self._tileMemoryMB*1024**2), self._jitEnabled
+        self.precisionCheck.compute(lambda cancelToken, progress : precisionError(dipoles.positions, dipoles.moments(), distCoef, memoryBudget, jit, cancelToken, progress))
+
+    """
+    Cancels the precisionError compute before its next tile of pairs, the last value is kept.
+    """
+    @Slot()
+    def cancelPrecisionError(self):
+        self.precisionCheck.cancel()
+
+    """
+    Qt Property: return if precisionError is being computed.
+    """
+    def getPrecisionErrorRunning(self):
+        return self.precisionCheck.isRunning()
+    precisionErrorRunningChanged = Signal()
+    precisionErrorRunning = Property(bool, getPrecisionErrorRunning, notify=precisionErrorRunningChanged)
+
+    """
+    Qt Property: last progress report of the precisionError compute, see progressMinEnergy (fraction of the tiles of
+    the current sum done).
+    """
+    @Slot(float, float, float, float, float)
+    def setProgressPrecisionError(self, *report):
+        self._progressPrecisionError = list(report)
+        self.progressPrecisionErrorChanged.emit()
+    def getProgressPrecisionError(self):
+        return list(self._progressPrecisionError)
+    progressPrecisionErrorChanged = Signal()
+    progressPrecisionError = Property('QVariantList', getProgressPrecisionError, notify=progressPrecisionErrorChanged)
+
+    """
+    Qt Property: Numba is installed and the compiled kernels can be used (see DipSimJit).
+    """
+    def getJitAvailable(self):
+        return jitAvailable
+    jitAvailableChanged = Signal()
+    jitAvailable = Property(bool, getJitAvailable, notify=jitAvailableChanged)
+
+    """
+    Qt Property: use the compiled kernels of DipSimJit (Monte-Carlo steps, exact pair sums) when Numba is installed.
+    """
+    def getJitEnabled(self):
+        return self._jitEnabled
+    def setJitEnabled(self, jitEnabled):
+        if jitEnabled != self._jitEnabled:
+            self._jitEnabled = jitEnabled
+            self.settings.setValue("globalParams/simulation/jitEnabled", self._jitEnabled)
+            self.jitEnabledChanged.emit()
+    jitEnabledChanged = Signal()
+    jitEnabled = Property(bool, getJitEnabled, setJitEnabled, notify=jitEnabledChanged)
+
+    """
+    Qt Property: description of the pair kernel of the last compute (ex: tile size picked by the tiled kernel).
+    """
+    def getKernelInfo(self):
+        return self._kernelInfo
+    @Slot(str)
+    def setKernelInfo(self, kernelInfo):
+        if kernelInfo != self._kernelInfo:
+            self._kernelInfo = kernelInfo
+            self.kernelInfoChanged.emit()
+    kernelInfoChanged = Signal()
+    kernelInfo = Property(str, getKernelInfo, notify=kernelInfoChanged)
+
+    """
+    Returns keyword arguments of DipSimEnergy.pairKernel() passed to all computes, from the global simulation params.
+    """
+    def getKernelOptions(self):
+        if self._supercellVectors is not None:
+            options = {"cellVectors": self._supercellVectors.tolist()}
+        elif self._energyBackendSelected == "barnesHut":
+            options = {"backend": "barnesHut", "theta": self._barnesHutTheta}
+        elif self._energyBackendSelected == "tiled":
+            options = {"backend": "tiled", "memoryBudget": int(self._tileMemoryMB*1024**2), "precision": self._precisionSelected}
+        elif self._cutoffRadius > 0:
+            options = {"cutoff": self._cutoffRadius, "truncation": self._truncationSelected}
+        else:
+            options = {"memoryBudget": int(self._tileMemoryMB*1024**2), "precision": self._precisionSelected}
+        options["jit"] = self._jitEnabled
+        return options
+
 
     ################################################
     ################## FUNCTIONS ###################
@@ -671,6 +1556,7 @@ class SimHypervisor(QObject):
     @Slot()
     def generate(self):
         self.primCell.is2D = self._is2D
+        rng = np.random.default_rng(None if self._seed < 0 else self._seed)
         if(self._generateMode == "Lattice"):
             self.primCell.a = None if self.primCellA <= 0 else self.primCellA
             self.primCell.b = None if self.primCellB <= 0 else self.primCellB
@@ -688,80 +1574,57 @@ class SimHypervisor(QObject):
             self.primCellAlpha = self.primCell.alpha
             self.primCellBeta = self.primCell.beta
 
-            self.dipModel.replaceAllDipoles(self.generateLatticeDipoles(self._genSize))
+            if self._periodic:
+                self.dipModel.replaceAllDipoles(self.generateSupercellDipoles(rng))
+            else:
+                self._supercellVectors = None
+                self.dipModel.replaceAllDipoles(self.generateLatticeDipoles(self._genSize, rng))
         elif self._generateMode == "Random":
-            self.dipModel.replaceAllDipoles(self.getRandomDipoles(initNumber=self.nbDipolesRdm, genSize=self._genSize, is2D=self.primCell.is2D, genType=self.randomGenModeSelected))
+            self.dipModel.replaceAllDipoles(self.getRandomDipoles(initNumber=self.nbDipolesRdm, genSize=self._genSize, is2D=self.primCell.is2D, genType=self.randomGenModeSelected, rng=rng, minSeparation=self._minSeparation))
         elif self._generateMode == "Import":
             self.importDips(self.importFileURLsStr)
+        if self._generateMode == "Random":
+            self._supercellVectors = None
         self.onLatticeGenerated.emit()
 
     """
-    generate list of random dipoles.
+    generate a store of random dipoles, positions and orientations are drawn in bulk (see randomPositions()).
     initNumber: number of dipoles to generate.
     genSize: size of generation
     is2D: generate on plane (2D) or in 3D space
-    positionVector: if specified will set all dipoles to have this exact position
-    quaternion: if specified will set all dipoles to have this exact quaternion
-    parent: qObject's parent
-    """
-    def getRandomDipoles(self, initNumber=50, genSize=500, is2D=True, genType="round", positionVector=None, quaternion=None, parent=None):
-        return [Dipole.rndDipoleGenerator(genSize=genSize, is2D=is2D, genType=genType, positionVector=positionVector, quaternion=quaternion) for i in range(initNumber)]
-
-    """
-    Add all dipoles of ONE primitive cell to dipoles with ia ib ic the translations indices
-    on each respective translation axis of the point(0,0,0) of the prim cell to add.
-    (i) Intermediate function for "generateLatticeDipoles()".
-    """
-    def addPointFromTranslations(self, dipoles, pCell, ia, ib, ic, maxDist, quaternion=None):
-        aBasePointVector = QVector3D(ia*pCell.a, 0, 0)
-        bxProjCoef = cos(radians(pCell.gamma))
-        byProjCoef = sin(radians(pCell.gamma))
-        bBasePointVector = QVector3D(ib*pCell.b*bxProjCoef, ib*pCell.b*byProjCoef, 0)
-        cxProjCoef = 0.
-        cyProjCoef = 0.
-        if(not pCell.is2D):
-            cxProjCoef = cos(radians(pCell.beta))
-            cyProjCoef = (cos(radians(pCell.alpha)) - cos(radians(pCell.beta))*cos(radians(pCell.gamma)))/sin(radians(pCell.gamma))
-            czBaseComp = ic*abs(pCell.c)*sqrt(1 - (cxProjCoef)**2 - (cyProjCoef)**2)
-            cBasePointVector = QVector3D(0, 0, 0) if pCell.is2D else QVector3D(ic*pCell.c*cxProjCoef, ic*pCell.c*cyProjCoef, czBaseComp) #QVector3D(ic*pCell.c*cos(pCell.gamma)*cos(pCell.alpha), ib*pCell.b*sin(pCell.gamma), 0)
-            basePoint = aBasePointVector + bBasePointVector + cBasePointVector
-        else:
-            basePoint = aBasePointVector + bBasePointVector
-        
-        if(basePoint.length() > maxDist): # if outside radius of simulation
-            pass
-        for points in pCell.translations:
-            aPointVector = QVector3D(pCell.a*points.x(), 0, 0)
-            bPointVector = QVector3D(pCell.b*points.y()*bxProjCoef, pCell.b*byProjCoef*points.y(), 0)
-            if(not pCell.is2D):
-                cPointVector = QVector3D(0, 0, 0) if pCell.is2D else QVector3D(cxProjCoef, cyProjCoef, sqrt(1 - (cxProjCoef)**2 - (cyProjCoef)**2))*abs(pCell.c)*points.z()
-                pointVect = aPointVector + bPointVector + cPointVector
-            else: 
-                pointVect = aPointVector + bPointVector
-            pointVect += basePoint
-            if(pointVect.length() <= maxDist): # if inside radius of simulation
-                if(quaternion is None):
-                    dipoles.append(Dipole(pointVect, Dipole.rndQuaternionGenerator(is2D=pCell.is2D)))
-                else:
-                    dipoles.append(Dipole(pointVect, quaternion))
+    genType: round or square
+    rng: numpy Generator of the draws
+    minSeparation: minimum distance between dipoles, 0 for no constraint
+    """
+    def getRandomDipoles(self, initNumber=50, genSize=500, is2D=True, genType="round", rng=None, minSeparation=0.0):
+        rng = np.random.default_rng() if rng is None else rng
+        positions = randomPositions(initNumber, genSize, is2D, genType, rng, minSeparation)
+        if len(positions) < initNumber:
+            print("only " + str(len(positions)) + " dipoles placed with a minimum separation of " + str(minSeparation))
+        return DipoleStore.withRandomAngles(positions, is2D=is2D, rng=rng)
 
     """
-    Generate dipoles with current hypervisor lattice params with maximum generation  distance specified with "maxDist".
+    Generate dipoles of a periodic supercell of supercellNa x supercellNb x supercellNc primitive cells with current
+    hypervisor lattice params. Keeps the supercell vectors for the Ewald summation of the computes.
     """
-    def generateLatticeDipoles(self, maxDist=500):
-        dipoles = []
-        pCell = self.primCell # deepcopy(self.primCell) to implement/debug
-        for i in range(len(pCell.translations)-1, -1, -1): #eliminate points on outer planes/lines to avoir doubling on generation
-            if any(((pCell.translations[i].x() == 1), (pCell.translations[i].y() == 1), (pCell.translations[i].z() == 1))):
-                del pCell.translations[i]
-        cxProjCoef = cos(radians(pCell.beta))
-        cyProjCoef =  1.0 if pCell.is2D else (cos(radians(pCell.alpha)) - cos(radians(pCell.beta))*cos(radians(pCell.gamma)))/sin(radians(pCell.gamma))
-        aMaxR = int(ceil(abs(maxDist)/(sin(radians(pCell.gamma))))//pCell.a)+1
-        bMaxR = int(ceil(abs(maxDist)/(sin(radians(pCell.gamma))))//pCell.b)+1
-        cMaxR = 0 if pCell.is2D else int(ceil(abs(maxDist)/1)//pCell.c)+1
-        for ia in range(-aMaxR, aMaxR+1):
-            for ib in range(-bMaxR, bMaxR+1):
-                for ic in range(-cMaxR, cMaxR+1):
-                    self.addPointFromTranslations(dipoles, pCell, ia, ib, ic, maxDist)
-
-        return dipoles
+    def generateSupercellDipoles(self, rng=None):
+        positions, self._supercellVectors = supercell(self.primCell.latticeVectors(), self.primCell.basisTranslations(), [self._supercellNa, self._supercellNb, self._supercellNc])
+        return DipoleStore.withRandomAngles(positions, is2D=self.primCell.is2D, rng=rng)
+
+    """
+    Generate dipoles with current hypervisor lattice params with maximum generation  distance specified with "maxDist".
+    Positions are generated in bulk by the primitive cell (see PrimCell.latticePositions()), orientations are random.
+    At most maxPreviewDipoles sites are kept: above, the radius is reduced from the estimated count and the sites
+    nearest to the origin are kept.
+    """
+    def generateLatticeDipoles(self, maxDist=500, rng=None):
+        maxPreview = max(1, self._maxPreviewDipoles)
+        estimatedCount = self.primCell.latticeStream(maxDist).estimatedCount()
+        if estimatedCount > maxPreview:
+            maxDist *= (maxPreview/estimatedCount)**(1/(2 if self.primCell.is2D else 3))
+        positions = self.primCell.latticePositions(maxDist)
+        if len(positions) > maxPreview:
+            nearest = np.argpartition(np.einsum('ij,ij->i', positions, positions), maxPreview - 1)[:maxPreview]
+            positions = positions[np.sort(nearest)]
+        self.latticeStatsChanged.emit()
+        return DipoleStore.withRandomAngles(positions, is2D=self.primCell.is2D, rng=rng)
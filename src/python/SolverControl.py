@@ -0,0 +1,105 @@
+# This Python file uses the following encoding: utf-8
+
+"""
+MIT License
+
+Copyright (c) 2020 Nils DEYBACH & Léo OUDART
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+"""
+Control of the solvers loops without Qt: cooperative cancellation and throttled progress reports. Loops check
+them between blocks of work (Monte-Carlo blocks, conjugate gradient iterations), never inside the inner loop.
+"""
+import threading
+import time
+
+"""
+Raised by a solver loop stopped by its CancelToken.
+"""
+class Cancelled(Exception):
+    pass
+
+"""
+Cancellation flag shared between the thread asking for the cancel (GUI) and the thread running a solver.
+event: event holding the flag, a new threading.Event if None. An event of a multiprocessing manager (see shared())
+also reaches solvers running in other processes.
+"""
+class CancelToken:
+    def __init__(self, event=None):
+        self._event = threading.Event() if event is None else event
+
+    """
+    Returns a token whose flag lives in "manager" (multiprocessing Manager), it can be passed to a process pool.
+    """
+    @classmethod
+    def shared(cls, manager):
+        return cls(manager.Event())
+
+    def cancel(self):
+        self._event.set()
+
+    def isCancelled(self):
+        return self._event.is_set()
+
+    """
+    Raises Cancelled if the token was cancelled.
+    """
+    def check(self):
+        if self._event.is_set():
+            raise Cancelled()
+
+"""
+Calls callback(iteration, energy, acceptanceRate, remainingTime, fraction) at most once every minInterval seconds.
+The remaining time (s) is estimated from the mean speed since the start, fraction is iteration/total, both are -1
+if unknown (no total).
+callback: function receiving the report (in the solver thread)
+total: total number of iterations of the run, None if unknown
+startIteration: iterations already done when the run starts (resumed runs)
+"""
+class ProgressReporter:
+    def __init__(self, callback, total=None, minInterval=0.25, startIteration=0):
+        self.callback = callback
+        self.total = total
+        self.minInterval = minInterval
+        self.startIteration = startIteration
+        self.startTime = time.monotonic()
+        self.nextTime = self.startTime + minInterval
+
+    """
+    Returns if a report would be emitted now (to skip computing its values otherwise).
+    """
+    def isDue(self):
+        return time.monotonic() >= self.nextTime
+
+    """
+    Reports the state of the run if minInterval elapsed since the last report, or if force.
+    """
+    def report(self, iteration, energy, acceptanceRate=-1.0, force=False):
+        now = time.monotonic()
+        if not force and now < self.nextTime:
+            return
+        remainingTime, fraction = -1.0, -1.0
+        if self.total:
+            fraction = min(iteration/self.total, 1.0)
+            if iteration > self.startIteration:
+                remainingTime = (now - self.startTime)/(iteration - self.startIteration)*max(self.total - iteration, 0)
+        self.callback(iteration, energy, acceptanceRate, remainingTime, fraction)
+        self.nextTime = now + self.minInterval
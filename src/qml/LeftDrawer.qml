@@ -138,7 +138,7 @@ Drawer {
                         folder: shortcuts.home
                         selectMultiple: true
                         selectFolder: false
-                        nameFilters: ["CSV data files (*.csv)", "All files (*)"]
+                        nameFilters: ["Dipoles files (*.csv *.npz)", "CSV data files (*.csv)", "Binary dipoles files (*.npz)", "All files (*)"]
                         onAccepted: {
                             var urlList = []
                             for (let i = 0; i < fileImportDialog.fileUrls.length; i++){
@@ -257,6 +257,66 @@ Drawer {
                         }
                     }
                 }
+                RowLayout{
+                    Layout.fillWidth: true
+                    Text {
+                        text: "Min separation:"
+                        fontSizeMode: Text.Fit
+                        elide: Text.ElideRight
+                        minimumPointSize: 6
+                        font.pointSize: 10
+                        wrapMode: Text.Wrap
+                        color: textColor
+                        horizontalAlignment: Text.AlignLeft
+                        verticalAlignment: Text.AlignVCenter
+                        Layout.fillHeight: true
+                        Layout.preferredWidth: contentWidth
+                    }
+                    Item{Layout.preferredWidth: 16}
+                    TextInput {
+                        text: hypervisor.minSeparation
+                        Layout.fillWidth: true
+                        Layout.fillHeight: true
+                        selectByMouse: true
+                        color: textColor
+                        verticalAlignment: TextEdit.AlignVCenter
+                        wrapMode: TextEdit.Wrap
+                        validator: RegExpValidator{regExp: /[0-9.]+/}
+                        onEditingFinished:{
+                            hypervisor.minSeparation = parseFloat(text)
+                        }
+                    }
+                }
+                RowLayout{
+                    Layout.fillWidth: true
+                    Text {
+                        text: "Seed (-1 random):"
+                        fontSizeMode: Text.Fit
+                        elide: Text.ElideRight
+                        minimumPointSize: 6
+                        font.pointSize: 10
+                        wrapMode: Text.Wrap
+                        color: textColor
+                        horizontalAlignment: Text.AlignLeft
+                        verticalAlignment: Text.AlignVCenter
+                        Layout.fillHeight: true
+                        Layout.preferredWidth: contentWidth
+                    }
+                    Item{Layout.preferredWidth: 16}
+                    TextInput {
+                        text: hypervisor.seed
+                        Layout.fillWidth: true
+                        Layout.fillHeight: true
+                        selectByMouse: true
+                        color: textColor
+                        verticalAlignment: TextEdit.AlignVCenter
+                        wrapMode: TextEdit.Wrap
+                        validator: RegExpValidator{regExp: /-?[0-9]+/}
+                        onEditingFinished:{
+                            hypervisor.seed = parseInt(text)
+                        }
+                    }
+                }
             }
         }
     }
@@ -506,6 +566,78 @@ Drawer {
 
                     }
                 }
+                TextContainer{
+                    Layout.fillWidth: true
+                    visible: !hypervisor.periodic
+                    text: "Sites kept: " + hypervisor.latticeKept + " / " + hypervisor.latticeCandidates + " generated"
+                }
+                RowLayout{
+                    Layout.fillWidth: true
+                    visible: !hypervisor.periodic
+                    TextContainer{
+                        text: "Preview limit:"
+                        Layout.fillHeight: true
+                        Layout.preferredWidth: contentWidth
+                    }
+                    Item{Layout.preferredWidth: 16}
+                    TextInput {
+                        text: hypervisor.maxPreviewDipoles
+                        Layout.fillWidth: true
+                        Layout.fillHeight: true
+                        selectByMouse: true
+                        color: textColor
+                        verticalAlignment: TextEdit.AlignVCenter
+                        wrapMode: TextEdit.Wrap
+                        validator: RegExpValidator{regExp: /[0-9]+/}
+                        onEditingFinished:{
+                            hypervisor.maxPreviewDipoles = parseInt(text)
+                        }
+                    }
+                }
+                RowLayout{
+                    Layout.fillWidth: true
+                    CheckBox {
+                        padding: 2
+                        checked: hypervisor.periodic
+                        onCheckStateChanged: hypervisor.periodic = checked
+                    }
+                    TextContainer{
+                        Layout.fillWidth: true
+                        text: "Periodic supercell (Ewald)"
+                        Layout.fillHeight: true
+                    }
+                }
+                RowLayout{
+                    Layout.fillWidth: true
+                    enabled: hypervisor.periodic
+                    TextContainer{
+                        text: "Cells:"
+                        Layout.fillHeight: true
+                        Layout.preferredWidth: contentWidth
+                    }
+                    SpinBox{
+                        Layout.fillWidth: true
+                        from: 1
+                        to: 64
+                        value: hypervisor.supercellNa
+                        onValueModified: hypervisor.supercellNa = value
+                    }
+                    SpinBox{
+                        Layout.fillWidth: true
+                        from: 1
+                        to: 64
+                        value: hypervisor.supercellNb
+                        onValueModified: hypervisor.supercellNb = value
+                    }
+                    SpinBox{
+                        Layout.fillWidth: true
+                        enabled: !hypervisor.is2D
+                        from: 1
+                        to: 64
+                        value: hypervisor.supercellNc
+                        onValueModified: hypervisor.supercellNc = value
+                    }
+                }
                 
             }
         }
@@ -690,6 +822,33 @@ Drawer {
                                     checked: hypervisor.lock2DMinEnergy
                                     onToggled: position == 0 ? hypervisor.lock2DMinEnergy = false : hypervisor.lock2DMinEnergy = true
                                 }
+                                TextContainer{
+                                    text: "Minimization method:"
+                                    Layout.fillWidth: true
+                                }
+                                ComboBox{
+                                    enabled: !hypervisor.minEnergyRunning
+                                    Layout.fillWidth: true
+                                    model: hypervisor.minimizerList
+                                    onActivated: hypervisor.minimizerSelected = textAt(currentIndex)
+                                    Component.onCompleted: currentIndex = indexOfValue(hypervisor.minimizerSelected)
+                                }
+                                RowLayout{
+                                    visible: hypervisor.minimizerSelected == "L-BFGS"
+                                    Layout.fillWidth: true
+                                    TextContainer{
+                                        text: "History size:"
+                                        Layout.preferredWidth: contentWidth
+                                    }
+                                    SpinBox{
+                                        Layout.fillWidth: true
+                                        enabled: !hypervisor.minEnergyRunning
+                                        from: 1
+                                        to: 100
+                                        value: hypervisor.historySizeLBFGS
+                                        onValueModified: hypervisor.historySizeLBFGS = value
+                                    }
+                                }
                             }
                         }
 
@@ -775,10 +934,17 @@ Drawer {
                                 padding: 0
                                 Layout.preferredHeight: 10
                                 Layout.fillWidth: true
-                                value: 0.0
-                                indeterminate: hypervisor.minEnergyRunning
+                                value: hypervisor.progressMinEnergy.length > 0 ? Math.max(hypervisor.progressMinEnergy[4], 0) : 0.0
+                                indeterminate: hypervisor.minEnergyRunning && (hypervisor.progressMinEnergy.length == 0 || hypervisor.progressMinEnergy[4] < 0)
                             }
                         }
+                        TextContainer{
+                            visible: hypervisor.minEnergyRunning && hypervisor.progressMinEnergy.length > 0
+                            Layout.fillWidth: true
+                            wrapMode: Text.WrapAnywhere
+                            property var report: hypervisor.progressMinEnergy.length > 0 ? hypervisor.progressMinEnergy : [0, 0, -1, -1, -1]
+                            text: "it. " + report[0] + " | E=" + report[1].toExponential(4) + " eV" + (report[2] >= 0 ? " | acc. " + report[2].toFixed(2) : "") + (report[3] >= 0 ? " | " + Math.round(report[3]) + " s left" : "")
+                        }
                     }
                 }
                 GroupBox{
@@ -838,6 +1004,19 @@ Drawer {
                                     color: textColor
                                     onEditingFinished: hypervisor.nbIterationsMC = parseInt(text)
                                 }
+                                TextContainer{
+                                    text: "Parallel replicas: "
+                                    Layout.preferredWidth: contentWidth
+                                }
+                                InputContainer{
+                                    Layout.alignment: Qt.AlignRight
+                                    Layout.fillWidth: true
+                                    enabled: !hypervisor.minEnergyMCRunning
+                                    validator: RegExpValidator{regExp: /[0-9]+/}
+                                    text: hypervisor.nbReplicasMC
+                                    color: textColor
+                                    onEditingFinished: hypervisor.nbReplicasMC = parseInt(text)
+                                }
                                 TextContainer{
                                     text: "Temperature (K): "
                                     Layout.preferredWidth: contentWidth
@@ -851,24 +1030,110 @@ Drawer {
                                     color: textColor
                                     onEditingFinished: hypervisor.temperatureMC = parseFloat(text)
                                 }
+                                Switch{
+                                    text: hypervisor.annealingMC ? "simulated annealing" : "fixed temperature"
+                                    enabled: !hypervisor.minEnergyMCRunning
+                                    checked: hypervisor.annealingMC
+                                    onToggled: hypervisor.annealingMC = (position != 0)
+                                }
+                                TextContainer{
+                                    visible: hypervisor.annealingMC
+                                    text: "Annealing start / end temperatures (K): "
+                                    Layout.preferredWidth: contentWidth
+                                }
+                                RowLayout{
+                                    visible: hypervisor.annealingMC
+                                    Layout.fillWidth: true
+                                    InputContainer{
+                                        Layout.fillWidth: true
+                                        enabled: !hypervisor.minEnergyMCRunning
+                                        validator: RegExpValidator{regExp: /[0-9.]+/}
+                                        text: hypervisor.temperatureStartMC
+                                        color: textColor
+                                        onEditingFinished: hypervisor.temperatureStartMC = parseFloat(text)
+                                    }
+                                    InputContainer{
+                                        Layout.fillWidth: true
+                                        enabled: !hypervisor.minEnergyMCRunning
+                                        validator: RegExpValidator{regExp: /[0-9.]+/}
+                                        text: hypervisor.temperatureEndMC
+                                        color: textColor
+                                        onEditingFinished: hypervisor.temperatureEndMC = parseFloat(text)
+                                    }
+                                }
+                                ComboBox{
+                                    visible: hypervisor.annealingMC
+                                    enabled: !hypervisor.minEnergyMCRunning
+                                    Layout.fillWidth: true
+                                    model: hypervisor.annealingScheduleListMC
+                                    onActivated: hypervisor.annealingScheduleMC = textAt(currentIndex)
+                                    Component.onCompleted: currentIndex = indexOfValue(hypervisor.annealingScheduleMC)
+                                }
+                                TextContainer{
+                                    visible: hypervisor.annealingMC && hypervisor.annealingTraceMC.length > 0
+                                    Layout.fillWidth: true
+                                    wrapMode: Text.WrapAnywhere
+                                    property var lastStep: hypervisor.annealingTraceMC.length > 0 ? hypervisor.annealingTraceMC[hypervisor.annealingTraceMC.length - 1] : [0, 0, 0]
+                                    text: "it. " + lastStep[0] + " | T=" + lastStep[1].toPrecision(3) + " K | E=" + lastStep[2].toExponential(4) + " eV"
+                                }
+                                TextContainer{
+                                    visible: !hypervisor.annealingMC && hypervisor.nbReplicasMC > 1
+                                    Layout.fillWidth: true
+                                    wrapMode: Text.WordWrap
+                                    text: "Checkpoints are only saved with 1 replica"
+                                }
+                                Switch{
+                                    visible: !hypervisor.annealingMC && hypervisor.nbReplicasMC <= 1
+                                    text: hypervisor.checkpointMC ? "checkpoints saved" : "no checkpoints"
+                                    enabled: !hypervisor.minEnergyMCRunning
+                                    checked: hypervisor.checkpointMC
+                                    onToggled: hypervisor.checkpointMC = (position != 0)
+                                }
+                                TextContainer{
+                                    visible: !hypervisor.annealingMC && hypervisor.nbReplicasMC <= 1 && hypervisor.checkpointMC
+                                    text: "Checkpoint every (iterations / s, 0 = off): "
+                                    Layout.preferredWidth: contentWidth
+                                }
+                                RowLayout{
+                                    visible: !hypervisor.annealingMC && hypervisor.nbReplicasMC <= 1 && hypervisor.checkpointMC
+                                    Layout.fillWidth: true
+                                    InputContainer{
+                                        Layout.fillWidth: true
+                                        enabled: !hypervisor.minEnergyMCRunning
+                                        validator: RegExpValidator{regExp: /[0-9]+/}
+                                        text: hypervisor.checkpointIterationsMC
+                                        color: textColor
+                                        onEditingFinished: hypervisor.checkpointIterationsMC = parseInt(text)
+                                    }
+                                    InputContainer{
+                                        Layout.fillWidth: true
+                                        enabled: !hypervisor.minEnergyMCRunning
+                                        validator: RegExpValidator{regExp: /[0-9.]+/}
+                                        text: hypervisor.checkpointSecondsMC
+                                        color: textColor
+                                        onEditingFinished: hypervisor.checkpointSecondsMC = parseFloat(text)
+                                    }
+                                }
                             }
                         }
 
                         RowLayout{
                             id: minimiseEnergyMCBuild
                             Layout.fillWidth: true
-                            // RoundButton{
-                            //     Material.elevation: 1
-                            //     Layout.alignment: Qt.AlignHCenter
-                            //     Layout.preferredWidth: height
-                            //     icon{
-                            //         source: "qrc:/icons/delete"
-                            //         color: iconsColor
-                            //         height: 19
-                            //         width: 19
-                            //     }
-                            //     onClicked: hypervisor.cancelMinEnergyCompute()
-                            // }
+                            RoundButton{
+                                Material.elevation: 1
+                                Layout.alignment: Qt.AlignHCenter
+                                Layout.preferredWidth: height
+                                enabled: hypervisor.minEnergyMCRunning
+                                icon{
+                                    source: "qrc:/icons/delete"
+                                    color: iconsColor
+                                    height: 19
+                                    width: 19
+                                }
+                                onClicked: hypervisor.cancelMinEnergyComputeMC()
+                            }
+                            Item{Layout.preferredWidth: 16}
                             RoundButton {
                                 enabled: !hypervisor.minEnergyMCRunning
                                 Layout.fillWidth: true
@@ -882,6 +1147,15 @@ Drawer {
                                 text: "Compute Monte Carlo"
                                 onClicked: hypervisor.computeMinEnergyMC()
                             }
+                            RoundButton {
+                                visible: hypervisor.checkpointAvailableMC
+                                enabled: !hypervisor.minEnergyMCRunning
+                                Material.elevation: 1
+                                Layout.alignment: Qt.AlignHCenter
+                                padding: 10
+                                text: "Resume"
+                                onClicked: hypervisor.resumeMinEnergyComputeMC()
+                            }
                         }
                         RowLayout{
                             id: minimiseEnergyMCProgress
@@ -935,10 +1209,169 @@ Drawer {
                                 padding: 0
                                 Layout.preferredHeight: 10
                                 Layout.fillWidth: true
-                                value: 0.0
-                                indeterminate: hypervisor.minEnergyMCRunning
+                                value: hypervisor.progressMC.length > 0 ? Math.max(hypervisor.progressMC[4], 0) : 0.0
+                                indeterminate: hypervisor.minEnergyMCRunning && (hypervisor.progressMC.length == 0 || hypervisor.progressMC[4] < 0)
+                            }
+                        }
+                        TextContainer{
+                            visible: hypervisor.minEnergyMCRunning && hypervisor.progressMC.length > 0
+                            Layout.fillWidth: true
+                            wrapMode: Text.WrapAnywhere
+                            property var report: hypervisor.progressMC.length > 0 ? hypervisor.progressMC : [0, 0, -1, -1, -1]
+                            text: "it. " + report[0] + " | E=" + report[1].toExponential(4) + " eV" + (report[2] >= 0 ? " | acc. " + report[2].toFixed(2) : "") + (report[3] >= 0 ? " | " + Math.round(report[3]) + " s left" : "")
+                        }
+                    }
+                }
+                GroupBox{
+                    Layout.fillWidth: true
+                    title: qsTr("Min Energy Parallel Tempering")
+                    padding: 8
+                    ColumnLayout{
+                        anchors.fill: parent
+                        spacing: 0
+                        RowLayout{
+                            id: minimiseEnergyPTDisplay
+                            Layout.fillWidth: true
+                            Layout.preferredHeight: 36
+                            TextContainer{
+                                text: "Minimum Energy:"
+                                Layout.minimumWidth: contentWidth
+                                Layout.fillWidth: true
+                            }
+                            TextInput {
+                                Layout.alignment: Qt.AlignLeft
+                                text: hypervisor.minEnergyPT.toExponential(5) + " (eV)"
+                                Layout.fillWidth: true
+                                Layout.fillHeight: true
+                                selectByMouse: true
+                                readOnly: true
+                                color: textColor
+                                verticalAlignment: TextEdit.AlignVCenter
+                                wrapMode: TextEdit.WrapAnywhere
                             }
                         }
+
+                        Frame {
+                            Layout.fillWidth: true
+                            padding: 9
+                            ColumnLayout{
+                                anchors.fill: parent
+                                spacing: 2
+                                TextContainer{
+                                    text: "Iterations per replica: "
+                                    Layout.preferredWidth: contentWidth
+                                }
+                                InputContainer{
+                                    Layout.alignment: Qt.AlignRight
+                                    Layout.fillWidth: true
+                                    enabled: !hypervisor.minEnergyPTRunning
+                                    validator: RegExpValidator{regExp: /[0-9]+/}
+                                    text: hypervisor.nbIterationsPT
+                                    color: textColor
+                                    onEditingFinished: hypervisor.nbIterationsPT = parseInt(text)
+                                }
+                                TextContainer{
+                                    text: "Temperatures min / max (K): "
+                                    Layout.preferredWidth: contentWidth
+                                }
+                                RowLayout{
+                                    Layout.fillWidth: true
+                                    InputContainer{
+                                        Layout.fillWidth: true
+                                        enabled: !hypervisor.minEnergyPTRunning
+                                        validator: RegExpValidator{regExp: /[0-9.]+/}
+                                        text: hypervisor.temperatureMinPT
+                                        color: textColor
+                                        onEditingFinished: hypervisor.temperatureMinPT = parseFloat(text)
+                                    }
+                                    InputContainer{
+                                        Layout.fillWidth: true
+                                        enabled: !hypervisor.minEnergyPTRunning
+                                        validator: RegExpValidator{regExp: /[0-9.]+/}
+                                        text: hypervisor.temperatureMaxPT
+                                        color: textColor
+                                        onEditingFinished: hypervisor.temperatureMaxPT = parseFloat(text)
+                                    }
+                                }
+                                TextContainer{
+                                    text: "Number of temperatures: "
+                                    Layout.preferredWidth: contentWidth
+                                }
+                                InputContainer{
+                                    Layout.alignment: Qt.AlignRight
+                                    Layout.fillWidth: true
+                                    enabled: !hypervisor.minEnergyPTRunning
+                                    validator: RegExpValidator{regExp: /[0-9]+/}
+                                    text: hypervisor.nbTemperaturesPT
+                                    color: textColor
+                                    onEditingFinished: hypervisor.nbTemperaturesPT = parseInt(text)
+                                }
+                                TextContainer{
+                                    text: "Swap interval (iterations): "
+                                    Layout.preferredWidth: contentWidth
+                                }
+                                InputContainer{
+                                    Layout.alignment: Qt.AlignRight
+                                    Layout.fillWidth: true
+                                    enabled: !hypervisor.minEnergyPTRunning
+                                    validator: RegExpValidator{regExp: /[0-9]+/}
+                                    text: hypervisor.swapIntervalPT
+                                    color: textColor
+                                    onEditingFinished: hypervisor.swapIntervalPT = parseInt(text)
+                                }
+                                TextContainer{
+                                    Layout.fillWidth: true
+                                    wrapMode: Text.WrapAnywhere
+                                    text: "Acceptance: " + hypervisor.acceptanceRatesPT.map(function(rate){ return rate.toFixed(2) }).join(" ")
+                                }
+                                TextContainer{
+                                    Layout.fillWidth: true
+                                    wrapMode: Text.WrapAnywhere
+                                    text: "Swaps: " + hypervisor.swapRatesPT.map(function(rate){ return rate.toFixed(2) }).join(" ")
+                                }
+                            }
+                        }
+
+                        RoundButton{
+                            Material.elevation: 1
+                            Layout.alignment: Qt.AlignHCenter
+                            Layout.preferredWidth: height
+                            enabled: hypervisor.minEnergyPTRunning
+                            icon{
+                                source: "qrc:/icons/delete"
+                                color: iconsColor
+                                height: 19
+                                width: 19
+                            }
+                            onClicked: hypervisor.cancelMinEnergyComputePT()
+                        }
+                        RoundButton {
+                            enabled: !hypervisor.minEnergyPTRunning
+                            Layout.fillWidth: true
+                            Material.elevation: 1
+                            Layout.alignment: Qt.AlignHCenter
+                            padding: 10
+                            icon{
+                                source: "qrc:/icons/build"
+                                color: setColorAlpha(accentColor, 0.7)
+                            }
+                            text: "Compute Parallel Tempering"
+                            onClicked: hypervisor.computeMinEnergyPT()
+                        }
+                        ProgressBar{
+                            padding: 0
+                            Layout.preferredHeight: 10
+                            Layout.fillWidth: true
+                            value: hypervisor.progressPT.length > 0 ? Math.max(hypervisor.progressPT[4], 0) : 0.0
+                            indeterminate: hypervisor.minEnergyPTRunning && (hypervisor.progressPT.length == 0 || hypervisor.progressPT[4] < 0)
+                        }
+                        TextContainer{
+                            visible: hypervisor.minEnergyPTRunning && hypervisor.progressPT.length > 0
+                            Layout.fillWidth: true
+                            wrapMode: Text.WrapAnywhere
+                            property var report: hypervisor.progressPT.length > 0 ? hypervisor.progressPT : [0, 0, -1, -1, -1]
+                            text: "it. " + report[0] + " | E=" + report[1].toExponential(4) + " eV" + (report[2] >= 0 ? " | acc. " + report[2].toFixed(2) : "") + (report[3] >= 0 ? " | " + Math.round(report[3]) + " s left" : "")
+                        }
                     }
                 }
             }
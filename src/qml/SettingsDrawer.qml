@@ -174,6 +174,134 @@ Drawer {
                         }
                     }  
                 }
+                GroupBox{
+                    title: qsTr("Interaction backend")
+                    Layout.fillWidth: true
+                    ColumnLayout{
+                        anchors.fill: parent
+                        ComboBox{
+                            Layout.fillWidth: true
+                            model: hypervisor.energyBackendList
+                            onActivated: hypervisor.energyBackendSelected = textAt(currentIndex)
+                            Component.onCompleted: currentIndex = indexOfValue(hypervisor.energyBackendSelected)
+                        }
+                        TextContainer{
+                            Layout.preferredWidth: contentWidth
+                            text: qsTr("Barnes-Hut opening angle (smaller is more accurate):")
+                        }
+                        TextField{
+                            Layout.fillWidth: true
+                            enabled: hypervisor.energyBackendSelected == "barnesHut"
+                            validator: RegExpValidator{regExp: /[0-9.]+/}
+                            text: hypervisor.barnesHutTheta
+                            selectByMouse: true
+                            onEditingFinished: hypervisor.barnesHutTheta = parseFloat(text)
+                        }
+                        TextContainer{
+                            Layout.preferredWidth: contentWidth
+                            text: qsTr("Tile memory of the tiled kernel (MB):")
+                        }
+                        TextField{
+                            Layout.fillWidth: true
+                            enabled: hypervisor.energyBackendSelected != "barnesHut"
+                            validator: RegExpValidator{regExp: /[0-9.]+/}
+                            text: hypervisor.tileMemoryMB
+                            selectByMouse: true
+                            onEditingFinished: hypervisor.tileMemoryMB = parseFloat(text)
+                        }
+                        TextContainer{
+                            Layout.preferredWidth: contentWidth
+                            text: qsTr("Precision of the exact sum:")
+                        }
+                        ComboBox{
+                            Layout.fillWidth: true
+                            enabled: hypervisor.energyBackendSelected == "tiled" || (hypervisor.energyBackendSelected == "pairs" && hypervisor.cutoffRadius <= 0)
+                            model: hypervisor.precisionList
+                            onActivated: hypervisor.precisionSelected = textAt(currentIndex)
+                            Component.onCompleted: currentIndex = indexOfValue(hypervisor.precisionSelected)
+                        }
+                        RowLayout{
+                            Layout.fillWidth: true
+                            Button{
+                                text: hypervisor.precisionErrorRunning ? qsTr("Cancel") : qsTr("float32 error")
+                                onClicked: hypervisor.precisionErrorRunning ? hypervisor.cancelPrecisionError() : hypervisor.computePrecisionError()
+                            }
+                            TextContainer{
+                                Layout.fillWidth: true
+                                text: hypervisor.precisionError.length < 2 ? "-" : (hypervisor.precisionError[0]*100).toExponential(2) + " % (bound " + (hypervisor.precisionError[1]*100).toExponential(2) + " %)"
+                            }
+                        }
+                        ProgressBar{
+                            Layout.fillWidth: true
+                            visible: hypervisor.precisionErrorRunning
+                            value: hypervisor.progressPrecisionError.length > 0 ? Math.max(hypervisor.progressPrecisionError[4], 0) : 0.0
+                            indeterminate: hypervisor.progressPrecisionError.length == 0 || hypervisor.progressPrecisionError[4] < 0
+                        }
+                        TextContainer{
+                            Layout.fillWidth: true
+                            visible: hypervisor.kernelInfo != ""
+                            wrapMode: Text.WordWrap
+                            text: qsTr("Last kernel: ") + hypervisor.kernelInfo
+                        }
+                    }
+                }
+                GroupBox{
+                    title: qsTr("Compiled kernels (Numba)")
+                    Layout.fillWidth: true
+                    ColumnLayout{
+                        anchors.fill: parent
+                        Switch{
+                            enabled: hypervisor.jitAvailable
+                            checked: hypervisor.jitEnabled && hypervisor.jitAvailable
+                            text: hypervisor.jitAvailable ? qsTr("Compile Monte-Carlo steps and exact sums") : qsTr("Numba is not installed")
+                            onToggled: hypervisor.jitEnabled = checked
+                        }
+                    }
+                }
+                GroupBox{
+                    title: qsTr("Interaction cutoff")
+                    Layout.fillWidth: true
+                    enabled: hypervisor.energyBackendSelected == "pairs"
+                    ColumnLayout{
+                        anchors.fill: parent
+                        TextContainer{
+                            Layout.preferredWidth: contentWidth
+                            text: qsTr("Cutoff radius (0 is exact sum):")
+                        }
+                        TextField{
+                            Layout.fillWidth: true
+                            validator: RegExpValidator{regExp: /[0-9.]+/}
+                            text: hypervisor.cutoffRadius
+                            selectByMouse: true
+                            onEditingFinished: hypervisor.cutoffRadius = parseFloat(text)
+                        }
+                        ComboBox{
+                            Layout.fillWidth: true
+                            enabled: hypervisor.cutoffRadius > 0
+                            model: hypervisor.truncationList
+                            onActivated: hypervisor.truncationSelected = textAt(currentIndex)
+                            Component.onCompleted: currentIndex = indexOfValue(hypervisor.truncationSelected)
+                        }
+                        RowLayout{
+                            Layout.fillWidth: true
+                            Button{
+                                enabled: hypervisor.cutoffRadius > 0 || hypervisor.truncationErrorRunning
+                                text: hypervisor.truncationErrorRunning ? qsTr("Cancel") : qsTr("Truncation error")
+                                onClicked: hypervisor.truncationErrorRunning ? hypervisor.cancelTruncationError() : hypervisor.computeTruncationError()
+                            }
+                            TextContainer{
+                                Layout.fillWidth: true
+                                text: hypervisor.truncationError < 0 ? "" : (hypervisor.truncationError*100).toPrecision(3) + " %"
+                            }
+                        }
+                        ProgressBar{
+                            Layout.fillWidth: true
+                            visible: hypervisor.truncationErrorRunning
+                            value: hypervisor.progressTruncationError.length > 0 ? Math.max(hypervisor.progressTruncationError[4], 0) : 0.0
+                            indeterminate: hypervisor.progressTruncationError.length == 0 || hypervisor.progressTruncationError[4] < 0
+                        }
+                    }
+                }
             }
             FoldablePanel{
                 title: "UI"
@@ -112,7 +112,7 @@ View3D{
         }
 
         Repeater3D{
-            model: hypervisor.viewModeSelected === hypervisor.viewModeList[0] ? dipModel : (hypervisor.viewModeSelected === hypervisor.viewModeList[1] ? dipModelMinEnergy : dipModelMinEnergyMC)
+            model: hypervisor.viewModeSelected === hypervisor.viewModeList[0] ? dipModel : (hypervisor.viewModeSelected === hypervisor.viewModeList[1] ? dipModelMinEnergy : (hypervisor.viewModeSelected === hypervisor.viewModeList[2] ? dipModelMinEnergyMC : dipModelMinEnergyPT))
             delegate: Loader3D {
                 source: "mycomponent.qml"
                 asynchronous: true
@@ -0,0 +1,29 @@
+"""
+The progress energy reported during a minimization matches the energy of the result (computeEnergyDipoles()).
+"""
+import numpy as np
+import pytest
+
+pytest.importorskip("scipy")
+
+from src.python.DipoleStore import DipoleStore
+from src.python.DipSimEnergy import J_TO_EV
+from src.python.MinEnergySolver import MinEnergySolver, minimizers
+from src.python.SolverControl import ProgressReporter
+
+
+def squareLattice(size=9):
+    x, y = np.meshgrid(np.arange(size, dtype=np.float64), np.arange(size, dtype=np.float64))
+    positions = np.stack((x.ravel(), y.ravel(), np.zeros(size*size)), axis=-1)
+    return DipoleStore(positions, np.zeros((size*size, 2)), 1.0)
+
+
+@pytest.mark.parametrize("method", minimizers)
+@pytest.mark.parametrize("lock2D", [False, True])
+def test_progress_energy_matches_result(method, lock2D):
+    reports = []
+    progress = ProgressReporter(lambda iteration, energy, acceptanceRate, remainingTime, fraction: reports.append(energy*J_TO_EV), minInterval=0.0)
+    solver = MinEnergySolver(distCoef=-9.0, progress=progress, method=method)
+    result = solver.getMinEnergy(squareLattice(), lock2D, rng=np.random.default_rng(0))
+    assert reports
+    assert reports[-1] == pytest.approx(solver.computeEnergyDipoles(result), rel=1e-6)